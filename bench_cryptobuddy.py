@@ -0,0 +1,938 @@
+"""Offline benchmarks for CryptoBuddy Pro+.
+
+Kept out of cryptobuddy_pro_plus_v1.py so the shipped CLI carries only the
+fixture hooks these drive (RecordingSession, ReplaySession, FixtureServer
+and --startup-probe). Run one benchmark by name:
+
+    python bench_cryptobuddy.py scoring
+    python bench_cryptobuddy.py e2e --save bench-baseline.json
+    python bench_cryptobuddy.py e2e --baseline bench-baseline.json
+"""
+import argparse
+import importlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cryptobuddy_pro_plus_v1
+from cryptobuddy_pro_plus_v1 import (
+    FIXTURE_PREFIX, CoinRegistry, CryptoAdvisor, DataClient, DiskCache, FixtureResponse, Portfolio,
+    PriceHistoryStore, RecordingSession, RegistryIndex, ReplaySession, RollingRisk, ScoreColumns,
+    _stdlib_dumps, coin_projection, heuristic_sustainability, iter_json_array, json_codec, market_fields,
+    optional_import, project_coin, score_columns,
+)
+
+
+# -----------------------------
+# Benchmarks
+# -----------------------------
+
+def summarize_timings(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in microseconds (p50/p95/p99/mean/max)."""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))] * 1e6
+
+    return {
+        "n": len(ordered),
+        "p50_us": round(pct(50), 2),
+        "p95_us": round(pct(95), 2),
+        "p99_us": round(pct(99), 2),
+        "mean_us": round(sum(ordered) / len(ordered) * 1e6, 2),
+        "max_us": round(ordered[-1] * 1e6, 2),
+    }
+
+
+def synthetic_coins_list(n: int = 15000, seed: int = 7) -> List[Dict[str, Any]]:
+    """Deterministic /coins/list-shaped payload for offline benchmarks."""
+    rng = random.Random(seed)
+    syllables = ["bit", "eth", "car", "da", "no", "sol", "la", "pol", "ka", "dot", "ste",
+                 "lar", "moon", "doge", "shi", "ba", "chain", "link", "uni", "swap", "ave",
+                 "ter", "ra", "lu", "na", "ava", "lan", "che", "tron", "fi", "lo", "xen"]
+    suffixes = ["", "", "", " Token", " Finance", " Protocol", " Inu", " Network", " Swap"]
+    coins = [
+        {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"},
+        {"id": "ethereum", "symbol": "eth", "name": "Ethereum"},
+        {"id": "cardano", "symbol": "ada", "name": "Cardano"},
+        {"id": "solana", "symbol": "sol", "name": "Solana"},
+    ]
+    seen = {c["id"] for c in coins}
+    while len(coins) < n:
+        stem = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 3)))
+        name = stem.capitalize() + rng.choice(suffixes)
+        cid = name.lower().replace(" ", "-")
+        if cid in seen:
+            cid = f"{cid}-{len(coins)}"
+        seen.add(cid)
+        coins.append({"id": cid, "symbol": stem[:rng.randint(3, 5)], "name": name})
+    return coins
+
+
+def _linear_find_id(registry: CoinRegistry, query: str) -> Optional[str]:
+    """Pre-index find_id fallback (two linear name scans), kept for comparison."""
+    q = query.strip().lower()
+    d = registry._data
+    if q in d.row_by_id:
+        return q
+    rows = d.rows_for_symbol(q)
+    if rows:
+        return d.ids[rows[0]]
+    for cid, name in zip(d.ids, d.names):
+        if q == name.lower():
+            return cid
+    for cid, name in zip(d.ids, d.names):
+        if q in name.lower():
+            return cid
+    return None
+
+
+def bench_resolve(n_coins: int = 15000, queries_per_kind: int = 200, seed: int = 11) -> Dict[str, Any]:
+    """Micro-benchmark CoinRegistry.find_id for hits and misses vs a linear scan."""
+    coins = synthetic_coins_list(n_coins)
+    t0 = time.perf_counter()
+    registry = CoinRegistry(None, coins=coins)
+    load_sec = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    registry._data.trigram_index()
+    trigram_sec = time.perf_counter() - t0
+
+    # Snapshot round trip: what a warm CLI start pays instead of /coins/list
+    snapshot = registry._data.to_bytes()
+    t0 = time.perf_counter()
+    RegistryIndex.from_bytes(snapshot)
+    snapshot_load_sec = time.perf_counter() - t0
+    json_blob = json.dumps(coins)
+    t0 = time.perf_counter()
+    RegistryIndex.from_coins(json.loads(json_blob))
+    json_load_sec = time.perf_counter() - t0
+
+    rng = random.Random(seed)
+    sample = [rng.choice(coins) for _ in range(queries_per_kind)]
+    kinds = {
+        "id": [c["id"] for c in sample],
+        "symbol": [c["symbol"] for c in sample],
+        "name": [c["name"] for c in sample],
+        "prefix": [c["name"][:6] for c in sample],
+        "substring": [c["name"][2:8] for c in sample],
+        "miss": ["".join(rng.choice("qxzjvw") for _ in range(7)) for _ in sample],
+    }
+    report: Dict[str, Any] = {"coins": n_coins, "load_ms": round(load_sec * 1e3, 2),
+                              "trigram_build_ms": round(trigram_sec * 1e3, 2),
+                              "snapshot_bytes": len(snapshot), "json_bytes": len(json_blob),
+                              "snapshot_load_ms": round(snapshot_load_sec * 1e3, 2),
+                              "json_parse_and_index_ms": round(json_load_sec * 1e3, 2),
+                              "kinds": {}}
+    for kind, queries in kinds.items():
+        row = {}
+        for label, fn in (("indexed", registry.find_id),
+                          ("linear", lambda q: _linear_find_id(registry, q))):
+            samples = []
+            for q in queries:
+                t0 = time.perf_counter()
+                fn(q)
+                samples.append(time.perf_counter() - t0)
+            row[label] = summarize_timings(samples)
+        report["kinds"][kind] = row
+    return report
+
+
+def print_resolve_report(report: Dict[str, Any]):
+    print(f"🔬 Registry: {report['coins']} coins, load {report['load_ms']} ms, "
+          f"trigram index {report['trigram_build_ms']} ms")
+    print(f"💾 Snapshot: {report['snapshot_bytes']} bytes, load {report['snapshot_load_ms']} ms "
+          f"(JSON {report['json_bytes']} bytes, parse+index {report['json_parse_and_index_ms']} ms)")
+    print(f"{'query kind':<12}{'indexed p50':>14}{'indexed p95':>14}{'linear p50':>14}{'linear p95':>14}  (µs)")
+    for kind, row in report["kinds"].items():
+        print(f"{kind:<12}{row['indexed']['p50_us']:>14}{row['indexed']['p95_us']:>14}"
+              f"{row['linear']['p50_us']:>14}{row['linear']['p95_us']:>14}")
+
+
+def synthetic_market_columns(n: int = 5000, seed: int = 5) -> Dict[str, List[float]]:
+    """Random but realistic-looking market columns (log-uniform caps, heavy-tailed moves)."""
+    rng = random.Random(seed)
+    cap = [10 ** rng.uniform(4, 12) for _ in range(n)]
+    cols = {
+        "change_24h": [rng.gauss(0, 6) * (3 if rng.random() < 0.05 else 1) for _ in range(n)],
+        "market_cap": cap,
+        "volume": [c * rng.uniform(0, 0.5) for c in cap],
+        "sustainability": [rng.choice((0.2, 0.5, 0.75, 0.8)) for _ in range(n)],
+    }
+    # Edge cases the scalar code handles specially (zero/negative/infinite caps, NaNs)
+    edges = [("market_cap", 0.0), ("market_cap", -0.5), ("market_cap", -5.0), ("market_cap", float("inf")),
+             ("change_24h", float("nan")), ("volume", float("nan")), ("volume", float("inf"))]
+    for i, (column, value) in enumerate(edges[:n]):
+        cols[column][i] = value
+    return cols
+
+
+def bench_scoring(n_coins: int = 5000, runs: int = 20) -> Dict[str, Any]:
+    """Scalar vs columnar scoring of ``n_coins`` rows, plus a parity check."""
+    cols = synthetic_market_columns(n_coins)
+    args = (cols["change_24h"], cols["market_cap"], cols["volume"], cols["sustainability"])
+
+    def timed(**kwargs) -> Tuple[Dict[str, float], ScoreColumns]:
+        samples = []
+        result = None
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            result = score_columns(*args, **kwargs)
+            samples.append(time.perf_counter() - t0)
+        return summarize_timings(samples), result
+
+    scalar_timings, scalar = timed(vectorize=False)
+    report: Dict[str, Any] = {"coins": n_coins, "timings": {"scalar": scalar_timings}, "parity": {}}
+    if optional_import("numpy") is None:
+        return report
+    for label, exact in (("numpy", True), ("numpy-simd", False)):
+        report["timings"][label], vector = timed(vectorize=True, exact=exact)
+        parity = {}
+        for name in ScoreColumns._fields:
+            expected = getattr(scalar, name)
+            got = getattr(vector, name).tolist()
+            same = [a == b or (a != a and b != b) for a, b in zip(expected, got)]  # NaN matches NaN
+            parity[name] = {"identical": sum(same),
+                            "max_abs_diff": max((abs(a - b) for a, b, ok in zip(expected, got, same) if not ok),
+                                                default=0.0)}
+        report["parity"][label] = parity
+    return report
+
+
+def print_scoring_report(report: Dict[str, Any]):
+    print(f"🧮 Scoring {report['coins']} coins (µs per full pass)")
+    for label, row in report["timings"].items():
+        print(f"   {label:<11} p50 {row['p50_us']:>10}  p95 {row['p95_us']:>10}")
+    if len(report["timings"]) == 1:
+        print("   NumPy not installed: scalar path only")
+    for label, parity in report["parity"].items():
+        for name, row in parity.items():
+            print(f"   {label:<11} {name:<9} {row['identical']}/{report['coins']} identical to scalar, "
+                  f"max |diff| {row['max_abs_diff']:.3g}")
+
+
+CURRENCIES = ("usd", "eur", "gbp", "jpy", "cny", "krw", "inr", "aud", "cad", "chf", "brl", "rub", "try", "mxn",
+              "sgd", "hkd", "nzd", "sek", "nok", "dkk", "pln", "czk", "huf", "ils", "zar", "thb", "twd", "php",
+              "idr", "myr", "vnd", "aed", "sar", "kwd", "bhd", "clp", "ars", "ngn", "pkr", "uah", "bdt", "lkr",
+              "mmk", "gel", "vef", "btc", "eth", "ltc", "bch", "bnb", "eos", "xrp", "xlm", "link", "dot", "yfi",
+              "bits", "sats", "xdr", "xag", "xau")
+
+
+def synthetic_coin_document(coin_id: str, seed: int = 3) -> dict:
+    """A /coins/{id} document with the shape and rough size of a real one."""
+    rng = random.Random(f"{seed}:{coin_id}")
+    price = 10 ** rng.uniform(-3, 4)
+
+    def per_currency(base: float) -> Dict[str, float]:
+        return {c: base * rng.uniform(0.5, 2.0) for c in CURRENCIES}
+
+    words = ("decentralized", "protocol", "network", "validators", "proof-of-stake", "ecosystem", "token",
+             "governance", "liquidity", "smart", "contracts", "layer", "scalable", "foundation", "community")
+    description = " ".join(rng.choice(words) for _ in range(rng.randint(150, 900)))
+    market_data = {key: per_currency(price * scale) for key, scale in (
+        ("current_price", 1), ("ath", 3), ("ath_change_percentage", 1e-2), ("atl", 0.1),
+        ("atl_change_percentage", 1e-1), ("market_cap", 1e8), ("fully_diluted_valuation", 1.2e8),
+        ("total_volume", 1e6), ("high_24h", 1.05), ("low_24h", 0.95), ("price_change_24h_in_currency", 0.01),
+        ("price_change_percentage_1h_in_currency", 1e-3), ("price_change_percentage_24h_in_currency", 1e-2),
+        ("price_change_percentage_7d_in_currency", 1e-2), ("market_cap_change_24h_in_currency", 1e6),
+    )}
+    market_data.update(price_change_percentage_24h=rng.gauss(0, 5), market_cap_rank=rng.randint(1, 5000),
+                       total_supply=rng.uniform(1e6, 1e10), circulating_supply=rng.uniform(1e6, 1e10),
+                       last_updated="2024-01-01T00:00:00.000Z")
+    return {
+        "id": coin_id, "symbol": coin_id[:4], "name": coin_id.title(), "hashing_algorithm": None,
+        "categories": ["Layer 1 (L1)", "Smart Contract Platform"], "platforms": {"": ""},
+        "description": {"en": description, "de": description[: len(description) // 2]},
+        "links": {"homepage": [f"https://{coin_id}.org", "", ""], "blockchain_site": [f"https://scan.{coin_id}.io"] * 8,
+                  "official_forum_url": [""] * 3, "repos_url": {"github": [f"https://github.com/{coin_id}"]}},
+        "image": {k: f"https://assets.coingecko.com/coins/images/1/{k}/{coin_id}.png" for k in ("thumb", "small", "large")},
+        "genesis_date": None, "sentiment_votes_up_percentage": 80.0, "market_cap_rank": market_data["market_cap_rank"],
+        "market_data": market_data, "last_updated": "2024-01-01T00:00:00.000Z",
+    }
+
+
+def bench_projection(n_coins: int = 200) -> Dict[str, Any]:
+    """Memory and read cost of caching full coin documents vs projected records."""
+    import tracemalloc
+
+    blobs = [json.dumps(synthetic_coin_document(f"coin-{i}")) for i in range(n_coins)]
+    report: Dict[str, Any] = {"coins": n_coins}
+    for label, shape in (("full", lambda d: d), ("projected", project_coin)):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        held = [shape(json.loads(b)) for b in blobs]  # what the memory cache would keep
+        retained = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        t0 = time.perf_counter()
+        for d in held:
+            market_fields(d)
+            heuristic_sustainability(d)
+        read_sec = time.perf_counter() - t0
+        report[label] = {
+            "retained_bytes": retained,
+            "json_bytes": sum(len(json.dumps(d, separators=(",", ":"))) for d in held),
+            "read_us_per_coin": round(read_sec / n_coins * 1e6, 2),
+        }
+        del held
+    return report
+
+
+def print_projection_report(report: Dict[str, Any]):
+    full, proj = report["full"], report["projected"]
+    print(f"🗜️  Caching {report['coins']} coin documents")
+    print(f"   {'':<12}{'heap KiB':>12}{'JSON KiB':>12}{'read µs/coin':>15}")
+    for label, row in (("full", full), ("projected", proj)):
+        print(f"   {label:<12}{row['retained_bytes'] / 1024:>12.0f}{row['json_bytes'] / 1024:>12.0f}"
+              f"{row['read_us_per_coin']:>15}")
+    print(f"   heap saved: {1 - proj['retained_bytes'] / full['retained_bytes']:.0%}")
+
+
+def bench_json(payload_dir: Optional[str] = None, runs: int = 15) -> Dict[str, Any]:
+    """Decode cost per JSON backend, streamed vs whole /coins/list parsing, and cache key cost.
+
+    Uses every ``*.json`` file in ``payload_dir`` (recorded responses) when
+    given, else synthetic payloads shaped like /coins/list, a coin document
+    and a /coins/markets page.
+    """
+    import tracemalloc
+
+    payloads: Dict[str, bytes] = {}
+    if payload_dir:
+        for fname in sorted(os.listdir(payload_dir)):
+            if fname.endswith(".json"):
+                with open(os.path.join(payload_dir, fname), "rb") as f:
+                    payloads[fname] = f.read()
+    if not payloads:
+        cols = synthetic_market_columns(260)
+        # skip the leading NaN/inf edge-case rows: real responses are valid JSON
+        page = [{"id": f"coin-{i}", "symbol": f"c{i}", "name": f"Coin {i}", "current_price": 1.0,
+                 "market_cap": cols["market_cap"][i], "total_volume": cols["volume"][i],
+                 "price_change_percentage_24h": cols["change_24h"][i]} for i in range(10, 260)]
+        payloads = {
+            "coins_list": _stdlib_dumps(synthetic_coins_list()),
+            "coin_document": _stdlib_dumps(synthetic_coin_document("bitcoin")),
+            "markets_page": _stdlib_dumps(page),
+        }
+
+    backends = [json_codec(name) for name in ("orjson", "stdlib")]
+    backends = [c for i, c in enumerate(backends) if c.name not in {b.name for b in backends[:i]}]
+    decode: Dict[str, Dict[str, Any]] = {}
+    for label, body in payloads.items():
+        row: Dict[str, Any] = {"bytes": len(body)}
+        for codec in backends:
+            samples = []
+            for _ in range(runs):
+                t0 = time.perf_counter()
+                codec.loads(body)
+                samples.append(time.perf_counter() - t0)
+            row[codec.name] = summarize_timings(samples)["p50_us"]
+        decode[label] = row
+
+    # Registry build from /coins/list: whole-body decode vs streamed parse (64 KiB chunks)
+    coins_body = payloads.get("coins_list") or max(payloads.values(), key=len)
+    chunks = [coins_body[i:i + 64 * 1024] for i in range(0, len(coins_body), 64 * 1024)]
+    registry: Dict[str, Any] = {}
+    for label, build in (("whole", lambda: RegistryIndex.from_coins(json_codec().loads(b"".join(chunks)))),
+                         ("streamed", lambda: RegistryIndex.from_coins(iter_json_array(chunks)))):
+        t0 = time.perf_counter()
+        build()
+        elapsed = time.perf_counter() - t0
+        tracemalloc.start()  # separate pass: tracing slows allocation-heavy code a lot
+        build()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        registry[label] = {"ms": round(elapsed * 1e3, 2), "peak_kib": round(peak / 1024)}
+
+    # Cache keys for a 250-id markets page: old json.dumps key vs memoized hash
+    params = DataClient.markets_pages([f"coin-{i}" for i in range(250)])[0]
+    url = DataClient.BASE + "/coins/markets"
+    keys = {}
+    for label, make in (("json_dumps", lambda: url + json.dumps(params, sort_keys=True)),
+                        ("hashed", lambda: DataClient._cache_key(url, params))):
+        make()
+        t0 = time.perf_counter()
+        for _ in range(1000):
+            key = make()
+        keys[label] = {"us": round((time.perf_counter() - t0) * 1e3, 2), "key_bytes": len(key)}
+
+    return {"default_backend": json_codec().name, "decode_p50_us": decode,
+            "registry_build": registry, "cache_key": keys}
+
+
+def print_json_report(report: Dict[str, Any]):
+    print(f"📦 JSON decode p50 (µs), default backend: {report['default_backend']}")
+    for label, row in report["decode_p50_us"].items():
+        timings = "  ".join(f"{k} {v}" for k, v in row.items() if k != "bytes")
+        print(f"   {label:<16}{row['bytes']:>10} B   {timings}")
+    print("🪣 Registry from /coins/list:")
+    for label, row in report["registry_build"].items():
+        print(f"   {label:<10}{row['ms']:>8} ms   peak {row['peak_kib']} KiB")
+    print("🔑 Cache key for a 250-id markets page:")
+    for label, row in report["cache_key"].items():
+        print(f"   {label:<12}{row['us']:>8} µs   {row['key_bytes']} chars")
+
+
+def bench_history(n_coins: int = 20, days: int = 365, queries: int = 2000, seed: int = 5) -> Dict[str, Any]:
+    """Incremental price-history sync against synthetic market_chart data.
+
+    Counts requests for a first sync, a same-day re-sync and a next-day
+    sync, then times a cold load of every file and 30-day range queries,
+    and compares on-disk bytes per row with the JSON they came from.
+    """
+    import shutil
+    import tempfile
+
+    root = tempfile.mkdtemp(prefix="cryptobuddy-history-")
+    try:
+        session = SyntheticSession(max(n_coins, 100))
+        coins = [c["id"] for c in session.coins[:n_coins]]
+        store = PriceHistoryStore(root, DataClient(session=session, requests_per_minute=None))
+        now = 1_704_067_200 + 12 * 3600  # fixed clock: reproducible data and bucket edges
+        report: Dict[str, Any] = {"coins": n_coins, "days": days}
+        for label, clock in (("first_sync", now), ("same_day", now + 3600), ("next_day", now + 86400)):
+            before = session.requests
+            t0 = time.perf_counter()
+            added = sum(store.sync(cid, days, now=clock) for cid in coins)
+            report[label] = {"requests": session.requests - before, "rows_added": added,
+                             "ms": round((time.perf_counter() - t0) * 1e3, 2)}
+
+        t0 = time.perf_counter()
+        cold = PriceHistoryStore(root)
+        rows = sum(len(cold.series(cid).ts) for cid in coins)
+        report["load"] = {"rows": rows, "ms": round((time.perf_counter() - t0) * 1e3, 2)}
+
+        rng = random.Random(seed)
+        first, last = cold.coverage(coins[0])
+        samples = []
+        for _ in range(queries):
+            cid = rng.choice(coins)
+            start = rng.uniform(first, last - 30 * 86400)
+            t0 = time.perf_counter()
+            cold.range(cid, start, start + 30 * 86400)
+            samples.append(time.perf_counter() - t0)
+        report["range_30d"] = summarize_timings(samples)
+
+        disk = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(root) for f in files)
+        chart = SyntheticSession.market_chart(coins[0], now - days * 86400, now)
+        report["bytes_per_row"] = {"disk": round(disk / rows, 1),
+                                   "json": round(len(_stdlib_dumps(chart)) / len(chart["prices"]), 1)}
+        return report
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def print_history_report(report: Dict[str, Any]):
+    print(f"📜 Price history for {report['coins']} coins x {report['days']} days")
+    for label in ("first_sync", "same_day", "next_day"):
+        row = report[label]
+        print(f"   {label:<12}{row['requests']:>6} requests {row['rows_added']:>8} rows {row['ms']:>10} ms")
+    load, q = report["load"], report["range_30d"]
+    print(f"   cold load: {load['rows']} rows in {load['ms']} ms; 30-day range p50 {q['p50_us']} µs")
+    size = report["bytes_per_row"]
+    print(f"   bytes/row: {size['disk']} on disk vs {size['json']} as JSON")
+
+
+def bench_risk(n_coins: int = 20, window: int = 30, days: int = 365) -> Dict[str, Any]:
+    """Cost of one new daily close for ``n_coins`` coins: RollingRisk.push vs rebuilding the window.
+
+    Both keep the same state; reading the full correlation matrix out of
+    it is timed separately.
+    """
+    rng = random.Random(9)
+    closes = [[100.0] * n_coins]
+    for _ in range(days):
+        closes.append([p * math.exp(rng.gauss(0, 0.04)) for p in closes[-1]])
+    ids = [f"coin-{i}" for i in range(n_coins)]
+
+    def recompute(rows: List[List[float]]) -> RollingRisk:
+        engine = RollingRisk(ids, window, ids[0])
+        for row in rows[-(window + 1):]:
+            engine._push(row, None, False)
+        engine._resync(optional_import("numpy"))
+        return engine
+
+    incremental = RollingRisk(ids, window, ids[0])
+    push, full = [], []
+    for k, row in enumerate(closes):
+        t0 = time.perf_counter()
+        incremental.push(row)
+        push.append(time.perf_counter() - t0)
+        if k > window:
+            t0 = time.perf_counter()
+            recompute(closes[:k + 1])
+            full.append(time.perf_counter() - t0)
+    expected = recompute(closes).correlation_matrix()
+    drift = max(abs(a - b) for got, want in zip(incremental.correlation_matrix(), expected)
+                for a, b in zip(got, want))
+    return {"coins": n_coins, "window": window, "days": days, "numpy": optional_import("numpy") is not None,
+            "push": summarize_timings(push), "recompute": summarize_timings(full),
+            "matrix": summarize_timings([_timed(incremental.correlation_matrix) for _ in range(50)]),
+            "max_corr_drift": drift}
+
+
+def _timed(fn: Callable[[], Any]) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def print_risk_report(report: Dict[str, Any]):
+    print(f"🎢 Rolling risk, {report['coins']} coins, {report['window']}-day window, {report['days']} days"
+          f" (numpy: {report['numpy']})")
+    for label in ("push", "recompute", "matrix"):
+        row = report[label]
+        print(f"   {label:<10} p50 {row['p50_us']:>10} µs   p95 {row['p95_us']:>10} µs")
+    print(f"   correlation drift vs recompute: {report['max_corr_drift']:.2e}")
+
+
+def bench_portfolio(n_positions: int = 500, moved: float = 0.05, runs: int = 50) -> Dict[str, Any]:
+    """Revalue cost when all prices changed vs when ``moved`` of them did, and report building."""
+    rng = random.Random(13)
+    ids = [c["id"] for c in synthetic_coins_list(n_positions)]
+    portfolio = Portfolio()
+    for cid in ids:
+        portfolio.add(cid, rng.uniform(0.1, 100), rng.uniform(0.01, 1000))
+    payload = {cid: {"usd": rng.uniform(0.01, 1000), "usd_24h_change": rng.gauss(0, 5)} for cid in ids}
+    samples: Dict[str, List[float]] = {"all_moved": [], "some_moved": [], "unchanged": [], "valuation": []}
+    for _ in range(runs):
+        for cid in ids:
+            payload[cid] = dict(payload[cid], usd=payload[cid]["usd"] * rng.uniform(0.99, 1.01))
+        samples["all_moved"].append(_timed(lambda: portfolio.revalue(payload)))
+        for cid in rng.sample(ids, int(n_positions * moved)):
+            payload[cid] = dict(payload[cid], usd=payload[cid]["usd"] * rng.uniform(0.99, 1.01))
+        samples["some_moved"].append(_timed(lambda: portfolio.revalue(payload)))
+        samples["unchanged"].append(_timed(lambda: portfolio.revalue(payload)))
+        samples["valuation"].append(_timed(portfolio.valuation))
+    return {"positions": n_positions, "moved": moved,
+            "timings": {label: summarize_timings(values) for label, values in samples.items()}}
+
+
+def print_portfolio_report(report: Dict[str, Any]):
+    print(f"💼 Portfolio of {report['positions']} positions ({report['moved']:.0%} of prices moving)")
+    for label, row in report["timings"].items():
+        print(f"   {label:<12} p50 {row['p50_us']:>10} µs   p95 {row['p95_us']:>10} µs")
+
+
+def bench_startup(runs: int = 7) -> Dict[str, Any]:
+    """Time CLI cold start per phase in fresh interpreters (offline).
+
+    Seeds a temporary cache dir with a synthetic registry snapshot and a
+    cached bitcoin document, then runs the script with --startup-probe.
+    """
+    import subprocess
+    import tempfile
+    import statistics
+
+    script = os.path.abspath(cryptobuddy_pro_plus_v1.__file__)
+    tmp = tempfile.mkdtemp(prefix="cryptobuddy-bench-")
+    with open(os.path.join(tmp, "coin_registry.bin"), "wb") as f:
+        f.write(RegistryIndex.from_coins(synthetic_coins_list()).to_bytes())
+
+    def seed_cache():
+        client = DataClient(session=None, disk_cache=DiskCache(os.path.join(tmp, "http_cache.sqlite3")))
+        url = f"{client.base_url}/coins/bitcoin"
+        doc = {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin", "hashing_algorithm": "SHA-256",
+               "description": {"en": "Bitcoin uses proof-of-work."},
+               "market_data": {"current_price": {"usd": 60000.0}, "market_cap": {"usd": 1.2e12},
+                               "total_volume": {"usd": 3e10}, "price_change_percentage_24h": 1.5}}
+        proj = coin_projection()
+        client._store(client._cache_key(url, client.coin_market_params(), proj), proj.fn(doc), time.time(), 3600, 0)
+
+    def wall(cmd: List[str]) -> Tuple[float, str]:
+        t0 = time.perf_counter()
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        return (time.perf_counter() - t0) * 1e3, out
+
+    interpreter, help_wall, probe_wall, probes = [], [], [], []
+    for _ in range(runs):
+        seed_cache()
+        interpreter.append(wall([sys.executable, "-c", "pass"])[0])
+        help_wall.append(wall([sys.executable, script, "--help"])[0])
+        elapsed, out = wall([sys.executable, script, "--startup-probe", "--cache-dir", tmp])
+        probe_wall.append(elapsed)
+        probes.append(json.loads(out.strip().splitlines()[-1]))
+
+    deferred = [m for m in ("asyncio", "sqlite3", "requests", "aiohttp", "tqdm", "textblob")
+                if importlib.util.find_spec(m) is not None]
+    eager_ms = statistics.median(
+        wall([sys.executable, "-c", "import " + ", ".join(deferred)])[0] for _ in range(runs)
+    ) - statistics.median(interpreter)
+
+    return {
+        "runs": runs,
+        "interpreter_ms": round(statistics.median(interpreter), 2),
+        "help_total_ms": round(statistics.median(help_wall), 2),
+        "probe_total_ms": round(statistics.median(probe_wall), 2),
+        "phases_ms": {name: round(statistics.median(p[name] for p in probes), 3) for name in probes[0]},
+        "deferred_modules": deferred,
+        "deferred_import_ms": round(eager_ms, 2),
+    }
+
+
+def print_startup_report(report: Dict[str, Any]):
+    print(f"⏱️  Startup (median of {report['runs']} runs): interpreter {report['interpreter_ms']} ms, "
+          f"--help {report['help_total_ms']} ms, probe {report['probe_total_ms']} ms")
+    for name, ms in report["phases_ms"].items():
+        print(f"   {name:<16}{ms:>10.3f} ms")
+    print(f"   deferred imports ({', '.join(report['deferred_modules'])}): "
+          f"~{report['deferred_import_ms']} ms not paid at startup")
+
+
+class SyntheticSession:
+    """Session stand-in that fabricates CoinGecko responses from synthetic data.
+
+    Covers the endpoints the advisor uses (/coins/list, /coins/{id},
+    /coins/markets, /simple/price, /coins/{id}/market_chart/range); wrapped
+    in a RecordingSession it produces a fixture set without touching the
+    network.
+    """
+
+    def __init__(self, n_coins: int = 15000):
+        self.headers: Dict[str, str] = {}
+        self.coins = synthetic_coins_list(n_coins)
+        self._known = {c["id"] for c in self.coins}
+        self.requests = 0
+
+    def mount(self, prefix: str, adapter: Any):
+        pass
+
+    @staticmethod
+    def market(coin_id: str) -> Dict[str, Any]:
+        record = project_coin(synthetic_coin_document(coin_id))
+        del record["hashing_algorithm"], record["description"]  # not in /coins/markets rows
+        return record
+
+    @staticmethod
+    def market_chart(coin_id: str, start: int, end: int) -> Dict[str, List[List[float]]]:
+        """Smooth random walk sampled at CoinGecko's granularity for the span.
+
+        Each price depends only on its timestamp, so overlapping requests
+        agree wherever their points coincide.
+        """
+        span = end - start
+        interval = 300 if span <= 86400 else 3600 if span <= 90 * 86400 else 86400
+        rng = random.Random(coin_id)
+        base, supply = 10 ** rng.uniform(-2, 4), 10 ** rng.uniform(6, 10)
+        slow, fast = rng.uniform(0, 2 * math.pi), rng.uniform(0, 2 * math.pi)
+        chart: Dict[str, List[List[float]]] = {"prices": [], "market_caps": [], "total_volumes": []}
+        t = -(-start // interval) * interval
+        while t <= end:
+            noise = random.Random(f"{coin_id}:{t}").gauss(0, 0.01)
+            price = base * math.exp(0.4 * math.sin(t / 2.5e6 + slow) + 0.05 * math.sin(t / 4e5 + fast) + noise)
+            ms = t * 1000
+            chart["prices"].append([ms, price])
+            chart["market_caps"].append([ms, price * supply])
+            chart["total_volumes"].append([ms, price * supply * (0.04 + 0.02 * math.sin(t / 9e4))])
+            t += interval
+        return chart
+
+    def get(self, url: str, params: Optional[dict] = None, timeout: Optional[float] = None,
+            stream: bool = False, **kwargs) -> FixtureResponse:
+        from urllib.parse import urlsplit
+
+        self.requests += 1
+        path = urlsplit(url).path
+        if path.startswith(FIXTURE_PREFIX):
+            path = path[len(FIXTURE_PREFIX):]
+        params = params or {}
+        chart_id = path[len("/coins/"):-len("/market_chart/range")] if path.endswith("/market_chart/range") else None
+        if chart_id in self._known:
+            body: Any = self.market_chart(chart_id, int(params["from"]), int(params["to"]))
+        elif path == "/coins/list":
+            body = self.coins
+        elif path == "/coins/markets":
+            if params.get("ids"):
+                ids = [cid for cid in params["ids"].split(",") if cid in self._known]
+            else:
+                size, page = int(params.get("per_page", 100)), int(params.get("page", 1))
+                ids = [c["id"] for c in self.coins[(page - 1) * size:page * size]]
+            body = [self.market(cid) for cid in ids]
+        elif path == "/simple/price":
+            body = {}
+            for cid in params.get("ids", "").split(","):
+                if cid in self._known:
+                    m = self.market(cid)
+                    body[cid] = {"usd": m["current_price"], "usd_24h_change": m["price_change_percentage_24h"]}
+        elif path.startswith("/coins/") and path[len("/coins/"):] in self._known:
+            body = synthetic_coin_document(path[len("/coins/"):])
+        else:
+            return FixtureResponse(b'{"error":"coin not found"}', 404, url=url)
+        return FixtureResponse(_stdlib_dumps(body), url=url)
+
+
+E2E_WORKLOAD = "bench-workload.json"  # written next to the fixtures it was recorded with
+E2E_RANK_SIZES = (5, 50, 500)
+
+
+def e2e_operations(advisor: CryptoAdvisor, workload: Dict[str, Any],
+                   csv_path: str) -> List[Tuple[str, Callable[[], Any]]]:
+    """The advisor calls the end-to-end suite times, as (name, zero-argument callable)."""
+    ids = workload["ids"]
+    queries = workload["find_queries"]
+    ops: List[Tuple[str, Callable[[], Any]]] = [
+        ("registry_refresh", lambda: advisor.registry.refresh()),
+        ("find_id", lambda: [advisor.registry.find_id(q) for q in queries]),
+        ("summarize_coin", lambda: advisor.summarize_coin(workload["summary"])),
+        ("compare", lambda: advisor.compare(*workload["compare"])),
+    ]
+    for n in workload["rank_sizes"]:
+        # rank_coins without its tqdm progress bar
+        ops.append((f"rank_coins[{n}]", lambda n=n: advisor.renderer.rankings(advisor.rank_report(ids[:n], top=10))))
+    ops.append(("show_watchlist", advisor.show_watchlist))
+    ops.append(("export_watchlist_csv", lambda: advisor.export_watchlist_csv(csv_path)))
+    return ops
+
+
+def record_e2e_fixtures(fixture_dir: str, live: bool = False,
+                        rank_sizes: Tuple[int, ...] = E2E_RANK_SIZES) -> Dict[str, Any]:
+    """Run the suite's workload once through a RecordingSession and save it beside the fixtures.
+
+    Synthetic data by default; ``live`` records from the real API, which
+    takes one coin document per ranked coin (about 500 requests at the
+    default rate limit).
+    """
+    n = max(rank_sizes)
+    source = None if live else SyntheticSession()
+    client = DataClient(session=RecordingSession(fixture_dir, source),
+                        requests_per_minute=30 if live else None)
+    advisor = CryptoAdvisor(client)
+    if live:
+        ids = [r["id"] for page in client.iter_market_pages(n) for r in page if r.get("id")][:n]
+    else:
+        ids = [c["id"] for c in source.coins[:n]]
+    registry = advisor.registry
+    rng = random.Random(13)
+    sample = [registry.get(cid) or {"id": cid, "symbol": cid, "name": cid} for cid in rng.sample(ids, min(50, len(ids)))]
+    workload = {
+        "source": "live" if live else "synthetic",
+        "ids": ids,
+        "rank_sizes": [size for size in rank_sizes if size <= len(ids)],
+        "summary": "btc",
+        "compare": ["btc", "eth"],
+        "watch": ids[:20],
+        # ids, symbols, names, name prefixes and misses, like bench_resolve
+        "find_queries": ([c["id"] for c in sample] + [c["symbol"] for c in sample] + [c["name"] for c in sample]
+                         + [c["name"][:5] for c in sample] + [f"zzq{i}xv" for i in range(len(sample))]),
+    }
+    advisor.watchlist = list(workload["watch"])
+    csv_path = os.path.join(fixture_dir, "bench-watchlist.csv.tmp")
+    for _, op in e2e_operations(advisor, workload, csv_path):
+        op()
+    os.remove(csv_path)
+    with open(os.path.join(fixture_dir, E2E_WORKLOAD), "w", encoding="utf-8") as f:
+        json.dump(workload, f)
+    return workload
+
+
+def _peak_rss_kib() -> Optional[int]:
+    resource = optional_import("resource")  # POSIX only
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # bytes on macOS, KiB elsewhere
+
+
+def _git_revision() -> Optional[str]:
+    import subprocess
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def bench_e2e(fixture_dir: Optional[str] = None, runs: int = 20, startup_runs: int = 5,
+              record_live: bool = False) -> Dict[str, Any]:
+    """End-to-end advisor operations over replayed fixtures, plus CLI startup.
+
+    Fixtures come from ``fixture_dir`` (recorded first if it has no
+    workload file) or a synthetic set in a temp dir. Each operation is
+    timed once on a fresh advisor (``cold_ms``: registry load, sustainability
+    documents) and then ``runs`` more times with an empty response cache,
+    so every sample pays replay, decoding and projection the way a request
+    past its TTL would, while the registry and sustainability scores stay
+    warm as in a long-running process. ``peak_kib`` comes from a separate
+    tracemalloc pass; ``retained_blocks`` is the growth in live allocator
+    blocks across one call (cache refills, memo entries, leaks).
+    """
+    import gc
+    import platform
+    import tempfile
+    import tracemalloc
+
+    tmp = tempfile.mkdtemp(prefix="cryptobuddy-e2e-")
+    fixture_dir = fixture_dir or os.path.join(tmp, "fixtures")
+    workload_path = os.path.join(fixture_dir, E2E_WORKLOAD)
+    if os.path.exists(workload_path):
+        with open(workload_path, encoding="utf-8") as f:
+            workload = json.load(f)
+    else:
+        workload = record_e2e_fixtures(fixture_dir, live=record_live)
+
+    replay = ReplaySession(fixture_dir)
+    client = DataClient(session=replay, requests_per_minute=None)
+    advisor = CryptoAdvisor(client)
+    advisor.watchlist = list(workload["watch"])
+    csv_path = os.path.join(tmp, "watchlist.csv")
+
+    ops: Dict[str, Dict[str, Any]] = {}
+    for name, op in e2e_operations(advisor, workload, csv_path):
+        client._cache.clear()
+        t0 = time.perf_counter()
+        op()
+        cold = time.perf_counter() - t0
+
+        samples = []
+        gc.collect()
+        gc.disable()  # as timeit does: collector pauses are noise, not cost of the call
+        try:
+            for _ in range(runs):
+                client._cache.clear()
+                t0 = time.perf_counter()
+                op()
+                samples.append(time.perf_counter() - t0)
+        finally:
+            gc.enable()
+
+        client._cache.clear()
+        gc.collect()
+        blocks = sys.getallocatedblocks()
+        op()
+        gc.collect()
+        retained = sys.getallocatedblocks() - blocks
+
+        client._cache.clear()
+        tracemalloc.start()  # separate pass: tracing slows allocation-heavy code a lot
+        op()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        ops[name] = {"cold_ms": round(cold * 1e3, 3), "timings": summarize_timings(samples),
+                     "ops_per_sec": round(len(samples) / sum(samples), 2),
+                     "peak_kib": round(peak / 1024), "retained_blocks": retained,
+                     "rss_kib": _peak_rss_kib()}
+    rss = _peak_rss_kib()
+
+    return {
+        "meta": {"revision": _git_revision(), "python": platform.python_version(),
+                 "platform": platform.platform(), "json_backend": json_codec().name,
+                 "numpy": optional_import("numpy") is not None, "fixtures": workload["source"],
+                 "fixture_requests": replay.replayed, "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "runs": runs,
+        "ops": ops,
+        "peak_rss_kib": rss,
+        "startup": bench_startup(startup_runs),
+    }
+
+
+def compare_bench(report: Dict[str, Any], baseline: Dict[str, Any],
+                  tolerance: float = 0.2) -> List[Dict[str, Any]]:
+    """Per-metric changes from a saved baseline.
+
+    ``regressed`` marks medians, allocation peaks and startup times that
+    grew by more than ``tolerance``; tail latencies are reported but never
+    gate, since with a few dozen runs p95/p99 are single samples.
+    """
+    pairs: List[Tuple[str, Optional[float], Optional[float], bool]] = []
+    for name, row in report["ops"].items():
+        old = baseline.get("ops", {}).get(name)
+        if old is None:
+            continue
+        pairs.append((f"{name}.p50_us", old["timings"].get("p50_us"), row["timings"].get("p50_us"), True))
+        pairs.append((f"{name}.p95_us", old["timings"].get("p95_us"), row["timings"].get("p95_us"), False))
+        pairs.append((f"{name}.peak_kib", old.get("peak_kib"), row.get("peak_kib"), True))
+    for metric in ("help_total_ms", "probe_total_ms"):
+        pairs.append((f"startup.{metric}", baseline.get("startup", {}).get(metric),
+                      report["startup"].get(metric), True))
+    pairs.append(("peak_rss_kib", baseline.get("peak_rss_kib"), report.get("peak_rss_kib"), True))
+
+    rows = []
+    for metric, old, new, gate in pairs:
+        if not old or new is None:
+            continue
+        change = new / old - 1.0
+        rows.append({"metric": metric, "baseline": old, "current": new,
+                     "change_pct": round(change * 100, 1), "regressed": gate and change > tolerance})
+    return rows
+
+
+def print_e2e_report(report: Dict[str, Any]):
+    meta = report["meta"]
+    print(f"🏁 End-to-end suite @ {meta['revision'] or 'unknown revision'}: {meta['fixtures']} fixtures, "
+          f"{report['runs']} runs, Python {meta['python']}, JSON {meta['json_backend']}")
+    print(f"   {'operation':<22}{'cold ms':>10}{'p50 µs':>12}{'p95 µs':>12}{'p99 µs':>12}"
+          f"{'ops/s':>10}{'peak KiB':>10}{'blocks':>8}")
+    for name, row in report["ops"].items():
+        t = row["timings"]
+        print(f"   {name:<22}{row['cold_ms']:>10}{t['p50_us']:>12}{t['p95_us']:>12}{t['p99_us']:>12}"
+              f"{row['ops_per_sec']:>10}{row['peak_kib']:>10}{row['retained_blocks']:>8}")
+    startup = report["startup"]
+    print(f"   CLI startup: --help {startup['help_total_ms']} ms, warm query {startup['probe_total_ms']} ms")
+    if report["peak_rss_kib"] is not None:
+        print(f"   peak RSS {report['peak_rss_kib'] / 1024:.1f} MiB")
+
+
+def print_bench_comparison(rows: List[Dict[str, Any]]) -> bool:
+    """Print baseline deltas; True when anything regressed."""
+    regressed = [r for r in rows if r["regressed"]]
+    print(f"📉 vs baseline: {len(rows)} metrics, {len(regressed)} regressed")
+    for r in rows:
+        flag = "❌" if r["regressed"] else "  "
+        print(f" {flag} {r['metric']:<32}{r['baseline']:>12} → {r['current']:<12}{r['change_pct']:+.1f}%")
+    return bool(regressed)
+
+
+# -----------------------------
+# Runner
+# -----------------------------
+
+# name -> (run(args) -> report, print_report(report))
+BENCHMARKS: Dict[str, Tuple[Callable[[argparse.Namespace], Dict[str, Any]], Callable[[Dict[str, Any]], Any]]] = {
+    "resolve": (lambda args: bench_resolve(), print_resolve_report),
+    "startup": (lambda args: bench_startup(), print_startup_report),
+    "scoring": (lambda args: bench_scoring(), print_scoring_report),
+    "projection": (lambda args: bench_projection(), print_projection_report),
+    "json": (lambda args: bench_json(args.payloads), print_json_report),
+    "history": (lambda args: bench_history(), print_history_report),
+    "risk": (lambda args: bench_risk(), print_risk_report),
+    "portfolio": (lambda args: bench_portfolio(), print_portfolio_report),
+    "e2e": (lambda args: bench_e2e(args.fixtures, runs=args.runs, record_live=bool(args.fixtures)),
+            print_e2e_report),
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for CryptoBuddy Pro+")
+    parser.add_argument('bench', choices=list(BENCHMARKS), help='Benchmark to run')
+    parser.add_argument('--payloads', metavar='DIR', help='json: recorded *.json responses to decode')
+    parser.add_argument('--fixtures', metavar='DIR', help='e2e: replay fixtures from DIR (recorded from the live API if DIR has none; default: synthetic)')
+    parser.add_argument('--runs', type=int, default=20, help='e2e: timed runs per operation (default: 20)')
+    parser.add_argument('--save', metavar='FILE', help='Write the report as a JSON baseline')
+    parser.add_argument('--baseline', metavar='FILE', help='e2e: compare with a saved baseline; exit 1 if a median, allocation peak or startup time regressed')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='--baseline: allowed growth before a metric counts as regressed (default: 0.2 = 20%%)')
+    args = parser.parse_args(argv)
+    if args.baseline and args.bench != 'e2e':
+        parser.error("--baseline only applies to the e2e benchmark")
+
+    run, print_report = BENCHMARKS[args.bench]
+    report = run(args)
+    print_report(report)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Baseline saved to {args.save}")
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        return 1 if print_bench_comparison(compare_bench(report, baseline, args.tolerance)) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,31 +1,154 @@
 import os
 import sys
 import time
+_IMPORT_STARTED = time.perf_counter()  # startup phase timing (see --startup-probe)
 import json
 import math
-import csv
 import random
 import logging
+import threading
+import bisect
+import heapq
+import struct
+import functools
+import importlib
+import importlib.util
+import contextvars
+from array import array
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any
-
-try:
-    import requests
-except ImportError:
-    raise SystemExit("Please install requests: pip install requests")
-
-try:
-    from tqdm import tqdm
-    TQDM_AVAILABLE = True
-except ImportError:
-    TQDM_AVAILABLE = False
-
-# Optional sentiment libs
-try:
-    from textblob import TextBlob
-    TEXTBLOB_AVAILABLE = True
-except Exception:
-    TEXTBLOB_AVAILABLE = False
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+
+# Heavy or optional dependencies are imported on first use so that --help,
+# cached lookups and known-coin queries start fast.
+
+def _lazy_import(name: str):
+    """Stdlib module whose body only executes on first attribute access."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+asyncio = _lazy_import("asyncio")
+sqlite3 = _lazy_import("sqlite3")
+hashlib = _lazy_import("hashlib")
+
+_OPTIONAL_MODULES: Dict[str, Any] = {}
+
+
+def optional_import(name: str):
+    """Import an optional dependency on first use; None if it is not installed."""
+    if name not in _OPTIONAL_MODULES:
+        try:
+            _OPTIONAL_MODULES[name] = importlib.import_module(name)
+        except Exception:
+            _OPTIONAL_MODULES[name] = None
+    return _OPTIONAL_MODULES[name]
+
+
+def _requests():
+    """The requests module, imported when the first HTTP session is needed."""
+    module = optional_import("requests")
+    if module is None:
+        raise SystemExit("Please install requests: pip install requests")
+    return module
+
+
+class JsonCodec(NamedTuple):
+    name: str
+    loads: Callable[[Any], Any]  # accepts bytes or str
+    dumps: Callable[[Any], bytes]  # compact UTF-8
+
+
+def _stdlib_dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+JSON_BACKENDS = ("auto", "orjson", "stdlib")
+# orjson takes ~20 ms to import but saves ~5 µs per KB decoded, so "auto"
+# only switches to it once a process has decoded this much
+ORJSON_AFTER_BYTES = 4 * 1024 * 1024
+_JSON_CODEC: Optional[JsonCodec] = None
+_auto_decoded = 0
+
+
+def json_codec(backend: Optional[str] = None) -> JsonCodec:
+    """The JSON codec for response bodies and cache rows.
+
+    ``backend`` is "orjson" (stdlib if it isn't installed), "stdlib" or
+    "auto"; it defaults to ``$CRYPTOBUDDY_JSON`` or "auto", which uses the
+    stdlib until ORJSON_AFTER_BYTES have been decoded and orjson from then
+    on. Passing ``backend`` returns that codec without changing the default.
+    """
+    global _JSON_CODEC
+    if backend is None and _JSON_CODEC is not None:
+        return _JSON_CODEC
+    name = backend or os.environ.get("CRYPTOBUDDY_JSON", "auto")
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"Unknown JSON backend {name!r}; choose from {', '.join(JSON_BACKENDS)}")
+    orjson = optional_import("orjson") if name == "orjson" else None
+    if orjson is not None:
+        codec = JsonCodec("orjson", orjson.loads, orjson.dumps)
+    elif name == "auto":
+        codec = JsonCodec("auto", _auto_loads, _stdlib_dumps)
+    else:
+        codec = JsonCodec("stdlib", json.loads, _stdlib_dumps)
+    if backend is None:
+        _JSON_CODEC = codec
+    return codec
+
+
+def _auto_loads(body: Any) -> Any:
+    global _auto_decoded, _JSON_CODEC
+    _auto_decoded += len(body)
+    if _auto_decoded >= ORJSON_AFTER_BYTES and (_JSON_CODEC is None or _JSON_CODEC.name == "auto"):
+        _JSON_CODEC = json_codec("orjson")
+        return _JSON_CODEC.loads(body)
+    return json.loads(body)
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array as its bytes arrive.
+
+    Only the unparsed tail of the stream is buffered, so memory follows the
+    largest element rather than the whole payload. Elements must be objects,
+    arrays or strings (a bare number split across chunks can't be detected).
+    """
+    import codecs
+
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf, pos, started = "", 0, False
+    for chunk in chunks:
+        buf = buf[pos:] + utf8.decode(chunk)
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                item, pos = decoder.raw_decode(buf, pos)
+            except ValueError:
+                break  # element continues in the next chunk
+            yield item
+    if buf[pos:].strip():
+        raise ValueError("Truncated JSON array")
 
 # Configure logging
 logging.basicConfig(
@@ -179,10 +302,735 @@ def format_currency(amount: float) -> str:
     return f"${amount:,.2f}"
 
 
+def market_fields(coin_market_data: Optional[dict]) -> Dict[str, float]:
+    """Extract the USD market numbers the advisor uses from a coin record.
+
+    Accepts both the nested /coins/{id} document (``market_data`` with
+    per-currency maps) and the flat records returned by /coins/markets.
+    """
+    d = coin_market_data or {}
+    md = d.get("market_data")
+    if isinstance(md, dict):
+        return {
+            "price": safe_float((md.get("current_price") or {}).get("usd", 0)),
+            "change_24h": safe_float(md.get("price_change_percentage_24h", 0)),
+            "market_cap": safe_float((md.get("market_cap") or {}).get("usd", 0)),
+            "volume": safe_float((md.get("total_volume") or {}).get("usd", 0)),
+        }
+    return {
+        "price": safe_float(d.get("current_price", 0)),
+        "change_24h": safe_float(d.get("price_change_percentage_24h", 0)),
+        "market_cap": safe_float(d.get("market_cap", 0)),
+        "volume": safe_float(d.get("total_volume", 0)),
+    }
+
+
+def default_cache_dir() -> str:
+    """Directory for on-disk state; override with CRYPTOBUDDY_HOME."""
+    return os.environ.get("CRYPTOBUDDY_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache", "cryptobuddy")
+
+
+# -----------------------------
+# Instrumentation
+# -----------------------------
+
+SPAN_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)  # seconds
+
+
+class SpanStats:
+    """Aggregated timings for one span name; ``self_total`` excludes nested spans."""
+
+    __slots__ = ("count", "total", "self_total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.self_total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(SPAN_BUCKETS)  # per bucket, not cumulative
+
+    def add(self, elapsed: float, self_time: float):
+        self.count += 1
+        self.total += elapsed
+        self.self_total += self_time
+        if elapsed > self.max:
+            self.max = elapsed
+        i = bisect.bisect_left(SPAN_BUCKETS, elapsed)
+        if i < len(self.buckets):
+            self.buckets[i] += 1
+
+
+_CURRENT_SPAN: "contextvars.ContextVar[Optional[_Span]]" = contextvars.ContextVar("cryptobuddy_span", default=None)
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "start", "children", "token")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+        self.children = 0.0
+
+    def __enter__(self) -> "_Span":
+        self.token = _CURRENT_SPAN.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        elapsed = time.perf_counter() - self.start
+        _CURRENT_SPAN.reset(self.token)
+        parent = _CURRENT_SPAN.get()
+        if parent is not None:
+            parent.children += elapsed
+        # Concurrent child tasks can overlap their parent; never report negative self time
+        self.metrics.observe(self.name, elapsed, max(0.0, elapsed - self.children))
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    """Timing spans and labelled counters for the hot paths, off until enabled.
+
+    ``with metrics.span(name):`` times a block. Nested spans are subtracted
+    from their parent's self time, so self times add up to the wall time
+    spent inside spans, which is what the --profile breakdown shows. The
+    parent is tracked per asyncio task and thread. While disabled, spans
+    and counters cost one attribute check.
+    """
+
+    def __init__(self, enabled: bool = False, prefix: str = "cryptobuddy"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._spans: Dict[str, SpanStats] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self.started = time.perf_counter()
+
+    def span(self, name: str) -> Any:
+        return _Span(self, name) if self.enabled else _NULL_SPAN
+
+    def observe(self, name: str, elapsed: float, self_time: Optional[float] = None):
+        """Record one timing directly (``span`` calls this on exit)."""
+        with self._lock:
+            stats = self._spans.get(name)
+            if stats is None:
+                stats = self._spans[name] = SpanStats()
+            stats.add(elapsed, elapsed if self_time is None else self_time)
+
+    def inc(self, name: str, value: float = 1.0, **labels: str):
+        """Add to a counter; ``name`` follows Prometheus naming (e.g. ``http_requests_total``)."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+            self.started = time.perf_counter()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = {name: {"count": s.count, "total_sec": round(s.total, 6), "self_sec": round(s.self_total, 6),
+                            "mean_ms": round(s.total / s.count * 1e3, 3), "max_ms": round(s.max * 1e3, 3)}
+                     for name, s in self._spans.items()}
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self._counters.items())]
+        return {"uptime_sec": round(time.perf_counter() - self.started, 3), "spans": spans, "counters": counters}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        def labels(pairs) -> str:
+            if not pairs:
+                return ""
+            escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        p = self.prefix
+        with self._lock:
+            spans = sorted(self._spans.items())
+            counters = sorted(self._counters.items())
+        lines = [f"# HELP {p}_span_seconds Time spent in instrumented phases, nested spans included.",
+                 f"# TYPE {p}_span_seconds histogram"]
+        for name, s in spans:
+            cumulative = 0
+            for le, n in zip(SPAN_BUCKETS, s.buckets):
+                cumulative += n
+                lines.append(f'{p}_span_seconds_bucket{labels((("span", name), ("le", repr(le))))} {cumulative}')
+            lines.append(f'{p}_span_seconds_bucket{labels((("span", name), ("le", "+Inf")))} {s.count}')
+            lines.append(f'{p}_span_seconds_sum{labels((("span", name),))} {s.total!r}')
+            lines.append(f'{p}_span_seconds_count{labels((("span", name),))} {s.count}')
+        lines += [f"# HELP {p}_span_self_seconds_total Time spent in instrumented phases, nested spans excluded.",
+                  f"# TYPE {p}_span_self_seconds_total counter"]
+        lines += [f'{p}_span_self_seconds_total{labels((("span", name),))} {s.self_total!r}' for name, s in spans]
+        typed = set()
+        for (name, pairs), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {p}_{name} counter")
+            lines.append(f"{p}_{name}{labels(pairs)} {float(value)!r}")
+        return "\n".join(lines) + "\n"
+
+    def breakdown(self) -> str:
+        """Per-phase table (self time, largest first) plus counters, for --profile."""
+        snap = self.snapshot()
+        wall = snap["uptime_sec"]
+        in_spans = sum(s["self_sec"] for s in snap["spans"].values())
+        out = [f"⏱️  Profile: {wall:.3f} s wall, {in_spans:.3f} s in instrumented phases",
+               f"   {'phase':<24}{'calls':>8}{'self ms':>12}{'total ms':>12}{'self %':>8}{'max ms':>10}"]
+        for name, s in sorted(snap["spans"].items(), key=lambda kv: -kv[1]["self_sec"]):
+            share = s["self_sec"] / wall if wall else 0.0
+            out.append(f"   {name:<24}{s['count']:>8}{s['self_sec'] * 1e3:>12.2f}{s['total_sec'] * 1e3:>12.2f}"
+                       f"{share:>8.1%}{s['max_ms']:>10.2f}")
+        if snap["counters"]:
+            out.append("   counters:")
+            for c in snap["counters"]:
+                tags = ",".join(f"{k}={v}" for k, v in c["labels"].items())
+                out.append(f"   {c['name'] + (f'{{{tags}}}' if tags else ''):<52}{c['value']:>12g}")
+        return "\n".join(out)
+
+
+metrics = Metrics()  # process-wide; enabled by --profile, --metrics-out and --serve
+
+
+class PhaseTimer:
+    """Wall-clock durations (ms) of consecutive named phases."""
+
+    def __init__(self, start: Optional[float] = None):
+        self.phases: Dict[str, float] = {}
+        self._last = start if start is not None else time.perf_counter()
+
+    def mark(self, name: str):
+        now = time.perf_counter()
+        self.phases[name] = round((now - self._last) * 1e3, 3)
+        self._last = now
+
+
+# -----------------------------
+# In-memory cache (bounded LRU)
+# -----------------------------
+
+class MemoryCache:
+    """Bounded, thread-safe LRU cache for decoded API responses.
+
+    Limits both the number of entries and the approximate payload size (the
+    byte length of the HTTP body). Expired entries are dropped on read and by
+    a periodic sweep, so idle payloads do not linger in long-running sessions.
+    ``stale_grace`` keeps entries that long past their TTL so they can still
+    be served stale via ``get(key, ttl + grace)``.
+    Hit/miss/eviction counters are exposed through ``stats()``.
+    """
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 32 * 1024 * 1024,
+                 sweep_interval: float = 30.0, stale_grace: float = 0.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.stale_grace = stale_grace
+        # key -> (fetched_at, ttl, value, size)
+        self._data: "OrderedDict[str, Tuple[float, float, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_sweep = time.time() + sweep_interval
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def get(self, key: str, ttl: float, count: bool = True) -> Optional[Tuple[float, Any]]:
+        """Return (fetched_at, value) if fresh under ``ttl``, else None.
+
+        ``count=False`` skips the hit/miss counters (used for re-checks).
+        """
+        now = time.time()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += count
+                return None
+            ts, entry_ttl, val, size = entry
+            if now - ts >= ttl:
+                if now - ts >= entry_ttl + self.stale_grace:
+                    self._remove(key, size)
+                    self.expirations += 1
+                self.misses += count
+                return None
+            self._data.move_to_end(key)
+            self.hits += count
+            return ts, val
+
+    def set(self, key: str, value: Any, ts: float, ttl: float, size: int = 0):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[3]
+            if size > self.max_bytes:
+                return
+            self._data[key] = (ts, ttl, value, size)
+            self.bytes += size
+            while self._data and (len(self._data) > self.max_entries or self.bytes > self.max_bytes):
+                _, (_, _, _, evicted_size) = self._data.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def sweep(self) -> int:
+        """Drop every expired entry now; returns how many were removed."""
+        with self._lock:
+            return self._sweep(time.time())
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _remove(self, key: str, size: int):
+        del self._data[key]
+        self.bytes -= size
+
+    def _sweep(self, now: float) -> int:
+        self._next_sweep = now + self.sweep_interval
+        grace = self.stale_grace
+        expired = [k for k, (ts, ttl, _, _) in self._data.items() if now - ts >= ttl + grace]
+        for k in expired:
+            self._remove(k, self._data[k][3])
+        self.expirations += len(expired)
+        return len(expired)
+
+
+# -----------------------------
+# Persistent cache (shared between runs)
+# -----------------------------
+
+class DiskCache:
+    """SQLite-backed response cache shared between runs and processes.
+
+    Entries keep the time they were fetched, so readers apply the same
+    per-endpoint TTL as the in-memory tier. Total payload size is capped at
+    ``max_bytes``; when exceeded, least recently read entries are evicted.
+    SQLite's WAL mode and busy timeout make concurrent readers and writers in
+    different processes safe. Errors are logged and treated as misses.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024):
+        self.path = path or os.path.join(default_cache_dir(), "http_cache.sqlite3")
+        self.max_bytes = max_bytes
+        self._local = threading.local()  # sqlite connections are per-thread
+        self._written_since_evict = 0
+
+    def _conn(self) -> "sqlite3.Connection":
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, ts REAL NOT NULL, expires REAL NOT NULL,"
+                " accessed REAL NOT NULL, size INTEGER NOT NULL, value BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, ttl: float) -> Optional[Tuple[float, Any, int]]:
+        """Return (fetched_at, value, size) if a fresh entry exists, else None."""
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT ts, value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            ts, blob = row
+            now = time.time()
+            if now - ts >= ttl:
+                return None
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            return ts, json_codec().loads(blob), len(blob)
+        except (sqlite3.Error, ValueError) as e:
+            logger.debug("Disk cache read failed for %s: %s", key, e)
+            return None
+
+    def set(self, key: str, value: Any, ts: float, ttl: float):
+        try:
+            blob = json_codec().dumps(value)
+            if len(blob) > self.max_bytes:
+                return
+            self._conn().execute(
+                "INSERT OR REPLACE INTO entries (key, ts, expires, accessed, size, value)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, ts, ts + ttl, time.time(), len(blob), blob),
+            )
+            self._written_since_evict += len(blob)
+            if self._written_since_evict >= self.max_bytes // 10:
+                self.evict()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.debug("Disk cache write failed for %s: %s", key, e)
+
+    def evict(self):
+        """Drop expired entries, then LRU entries until under ``max_bytes``."""
+        self._written_since_evict = 0
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")  # serialize eviction across processes
+            conn.execute("DELETE FROM entries WHERE expires <= ?", (time.time(),))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                target = int(self.max_bytes * 0.9)  # low-water mark avoids evicting on every write
+                victims = []
+                for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+                    if total <= target:
+                        break
+                    victims.append((key,))
+                    total -= size
+                conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.debug("Disk cache eviction failed: %s", e)
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+
+    def clear(self):
+        try:
+            self._conn().execute("DELETE FROM entries")
+        except sqlite3.Error as e:
+            logger.debug("Disk cache clear failed: %s", e)
+
+
+# -----------------------------
+# Sustainability score cache
+# -----------------------------
+
+class SustainabilityCache:
+    """Per-coin sustainability scores that survive between runs.
+
+    Each score is stored with a digest of the fields it was computed from
+    (see sustainability_digest), so it stays valid until the coin's
+    description or hashing algorithm changes. Every row is loaded into a
+    dict on first use, making lookups plain dict reads; new scores are
+    written through to SQLite. With ``path=None`` nothing is persisted.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._scores: Optional[Dict[str, Tuple[str, float]]] = None  # coin id -> (digest, score)
+        self._conn: Optional["sqlite3.Connection"] = None
+        self._lock = threading.Lock()
+
+    def _rows(self) -> Dict[str, Tuple[str, float]]:
+        if self._scores is None:
+            with self._lock:
+                if self._scores is None:
+                    self._scores = self._load()
+        return self._scores
+
+    def _load(self) -> Dict[str, Tuple[str, float]]:
+        if not self.path:
+            return {}
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sustainability ("
+                " coin_id TEXT PRIMARY KEY, digest TEXT NOT NULL, score REAL NOT NULL)"
+            )
+            self._conn = conn
+            return {cid: (digest, score) for cid, digest, score
+                    in conn.execute("SELECT coin_id, digest, score FROM sustainability")}
+        except sqlite3.Error as e:
+            logger.debug("Sustainability cache unavailable at %s: %s", self.path, e)
+            return {}
+
+    def __contains__(self, coin_id: str) -> bool:
+        return coin_id in self._rows()
+
+    def __len__(self) -> int:
+        return len(self._rows())
+
+    def lookup(self, coin_id: str) -> Optional[Tuple[str, float]]:
+        """(digest, score) for a coin, or None."""
+        return self._rows().get(coin_id)
+
+    def score(self, coin_id: str, default: Optional[float] = None) -> Optional[float]:
+        entry = self._rows().get(coin_id)
+        return entry[1] if entry is not None else default
+
+    def put(self, coin_id: str, digest: str, score: float):
+        rows = self._rows()
+        with self._lock:
+            if rows.get(coin_id) == (digest, score):
+                return
+            rows[coin_id] = (digest, score)
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute("INSERT OR REPLACE INTO sustainability (coin_id, digest, score) VALUES (?, ?, ?)",
+                                   (coin_id, digest, score))
+            except sqlite3.Error as e:
+                logger.debug("Sustainability cache write failed for %s: %s", coin_id, e)
+
+
+# -----------------------------
+# Client-side rate limiting
+# -----------------------------
+
+class TokenBucket:
+    """Thread-safe token-bucket rate limiter.
+
+    Tokens refill at ``rate`` per second up to ``capacity`` (the burst size).
+    ``reserve()`` claims a token and returns how long the caller must wait for
+    it, so sync callers can ``time.sleep`` and async callers ``asyncio.sleep``.
+    Tokens may go negative, which queues callers in arrival order. The
+    queueing delay handed out is tracked separately from network time.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()  # may sit in the future while paused
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.pauses = 0
+
+    def _refill(self, now: float):
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def reserve(self) -> float:
+        """Claim one token; returns seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1.0
+            wait = max(0.0, self._updated - now) + max(0.0, -self._tokens) / self.rate
+            self.acquired += 1
+            if wait > 0:
+                self.throttled += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            return wait
+
+    def acquire(self) -> float:
+        """Block until a token is available; returns the delay added."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float):
+        """Hold every caller for ``seconds`` (e.g. after a 429 Retry-After)."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = max(self._updated, now + seconds)
+            self.pauses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_sec": self.rate,
+            "burst": self.capacity,
+            "acquired": self.acquired,
+            "throttled": self.throttled,
+            "total_wait_sec": round(self.total_wait, 3),
+            "max_wait_sec": round(self.max_wait, 3),
+            "avg_wait_sec": round(self.total_wait / self.acquired, 3) if self.acquired else 0.0,
+            "pauses": self.pauses,
+        }
+
+
+# -----------------------------
+# Request coalescing (single-flight)
+# -----------------------------
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Collapse concurrent loads of the same key into one in-flight call.
+
+    The first caller for a key (the leader) runs the load; callers arriving
+    while it is in flight wait and receive the same result or exception.
+    ``do`` serves threads, ``do_async`` coroutines on one event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._futures: Dict[str, "asyncio.Future"] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    async def do_async(self, key: str, factory):
+        fut = self._futures.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            return await asyncio.shield(fut)  # a cancelled waiter must not cancel the leader
+
+        fut = self._futures[key] = asyncio.get_running_loop().create_future()
+        self.leaders += 1
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved; waiters (if any) re-raise it
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            del self._futures[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights) + len(self._futures),
+        }
+
+
 # -----------------------------
 # Data client (CoinGecko)
 # -----------------------------
 
+class Projection(NamedTuple):
+    """Reduces a response before it is cached; ``tag`` keeps its cache key apart from the raw one."""
+    tag: str
+    fn: Callable[[Any], Any]
+
+
+def project_coin(doc: dict, vs_currency: str = "usd") -> dict:
+    """Slim a /coins/{id} document to a flat /coins/markets-style record.
+
+    Keeps identity, the ``vs_currency`` market numbers and the two fields
+    heuristic_sustainability reads; drops links, images, other languages and
+    the per-currency maps for every other currency.
+    """
+    if not isinstance(doc, dict):
+        return doc
+    md = doc.get("market_data") or {}
+    return {
+        "id": doc.get("id"),
+        "symbol": doc.get("symbol", ""),
+        "name": doc.get("name", ""),
+        "current_price": (md.get("current_price") or {}).get(vs_currency),
+        "market_cap": (md.get("market_cap") or {}).get(vs_currency),
+        "total_volume": (md.get("total_volume") or {}).get(vs_currency),
+        "price_change_percentage_24h": md.get("price_change_percentage_24h"),
+        "hashing_algorithm": doc.get("hashing_algorithm"),
+        "description": {"en": (doc.get("description") or {}).get("en", "") or ""},
+    }
+
+
+_COIN_PROJECTIONS: Dict[str, Projection] = {}
+
+
+def coin_projection(vs_currency: str = "usd") -> Projection:
+    proj = _COIN_PROJECTIONS.get(vs_currency)
+    if proj is None:
+        proj = _COIN_PROJECTIONS[vs_currency] = Projection(
+            f"coin:{vs_currency}", lambda doc: project_coin(doc, vs_currency))
+    return proj
+
+
+@functools.lru_cache(maxsize=4096)
+def _hashed_cache_key(url: str, items: Tuple[Tuple[str, Any], ...], tag: str) -> str:
+    """Cache key, memoized because the same requests repeat constantly.
+
+    Keys longer than 256 characters (multi-id queries) are replaced by a
+    digest; short ones stay readable and skip importing hashlib.
+    """
+    raw = json.dumps([url, items, tag], separators=(",", ":"))
+    if len(raw) <= 256:
+        return raw
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+_MISS = object()  # cache-miss sentinel (None is a valid cached payload)
+
+
 class DataClient:
     """Simple CoinGecko client with caching and retry/backoff.
 
@@ -191,50 +1039,229 @@ class DataClient:
     """
 
     BASE = "https://api.coingecko.com/api/v3"
+    MARKETS_PAGE_SIZE = 250  # max per_page accepted by /coins/markets
 
-    def __init__(self, session: Optional[requests.Session] = None, cache_ttl: int = 60):
-        self.session = session or requests.Session()
+    def __init__(self, session: Optional["requests.Session"] = None, cache_ttl: int = 60,
+                 disk_cache: Optional[DiskCache] = None, cache_max_entries: int = 512,
+                 cache_max_bytes: int = 32 * 1024 * 1024,
+                 requests_per_minute: Optional[float] = 30, burst: int = 5,
+                 stale_while_revalidate: bool = False, max_stale: float = 600,
+                 base_url: Optional[str] = None):
         self.user_agent = "CryptoBuddyProPlus/3.0 (+https://example.local)"
-        self.session.headers.update({"User-Agent": self.user_agent})
+        # Point at a FixtureServer or mirror instead of the public API
+        self.base_url = (base_url or os.environ.get("CRYPTOBUDDY_BASE_URL") or self.BASE).rstrip("/")
+        self._session = session  # created on first request when not supplied
+        if session is not None:
+            session.headers.update({"User-Agent": self.user_agent})
         self.cache_ttl = cache_ttl
-        self._cache: Dict[str, Tuple[float, Any]] = {}
+        self._cache = MemoryCache(max_entries=cache_max_entries, max_bytes=cache_max_bytes)
+        self.disk_cache = disk_cache  # optional second tier shared between runs
+        # Proactive limiter so bursts are smoothed before CoinGecko answers 429
+        self.rate_limiter: Optional[TokenBucket] = (
+            TokenBucket(requests_per_minute / 60.0, burst) if requests_per_minute else None
+        )
+        self._inflight = SingleFlight()  # one fetch per cache key at a time
+        # Stale-while-revalidate: serve entries up to max_stale past their TTL
+        # immediately and refresh them in the background.
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_stale = max_stale
+        self._cache.stale_grace = self._stale_grace
+        self._refreshing: set = set()
+        self._refresh_lock = threading.Lock()
+        self.stale_served = 0
+        self.revalidations = 0
+        self.revalidation_failures = 0
 
-    def _get(self, path: str, params: Optional[dict] = None, ttl: Optional[int] = None) -> Any:
-        url = f"{self.BASE}{path}"
-        cache_key = url + (json.dumps(params, sort_keys=True) if params else "")
-        now = time.time()
+    @property
+    def session(self) -> "requests.Session":
+        if self._session is None:
+            self._session = _requests().Session()
+            self._session.headers.update({"User-Agent": self.user_agent})
+        return self._session
+
+    def _get(self, path: str, params: Optional[dict] = None, ttl: Optional[int] = None,
+             project: Optional["Projection"] = None) -> Any:
+        """Cached GET; with ``project`` only the projected value is cached and returned."""
+        url = f"{self.base_url}{path}"
+        cache_key = self._cache_key(url, params, project)
         ttl = ttl if ttl is not None else self.cache_ttl
 
         # Return cached
-        if cache_key in self._cache:
-            ts, val = self._cache[cache_key]
-            if now - ts < ttl:
-                return val
+        val = self._lookup(cache_key, ttl)
+        if val is not _MISS:
+            return val
+
+        stale = self._serve_stale(url, cache_key, params, ttl, project)
+        if stale is not _MISS:
+            return stale
+
+        return self._inflight.do(cache_key, lambda: self._load(url, cache_key, params, ttl, project))
+
+    @property
+    def _stale_grace(self) -> float:
+        return self.max_stale if self.stale_while_revalidate else 0.0
+
+    def _serve_stale(self, url: str, cache_key: str, params: Optional[dict], ttl: float,
+                     project: Optional["Projection"] = None) -> Any:
+        """In SWR mode, return a stale-but-bounded value and refresh it behind the caller."""
+        if not self.stale_while_revalidate:
+            return _MISS
+        val = self._lookup(cache_key, ttl + self.max_stale, count=False)
+        if val is _MISS:
+            return _MISS
+        self.stale_served += 1
+        self._revalidate(url, cache_key, params, ttl, project)
+        return val
+
+    def _revalidate(self, url: str, cache_key: str, params: Optional[dict], ttl: float,
+                    project: Optional["Projection"] = None):
+        with self._refresh_lock:
+            if cache_key in self._refreshing:
+                return
+            self._refreshing.add(cache_key)
+
+        def refresh():
+            try:
+                self._inflight.do(cache_key, lambda: self._load(url, cache_key, params, ttl, project))
+                self.revalidations += 1
+            except Exception as e:
+                # Keep serving the stale copy until max_stale runs out
+                self.revalidation_failures += 1
+                logger.warning("Background refresh failed for %s: %s", url, e)
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(cache_key)
+
+        threading.Thread(target=refresh, name="cryptobuddy-revalidate", daemon=True).start()
+
+    def _load(self, url: str, cache_key: str, params: Optional[dict], ttl: float,
+              project: Optional["Projection"] = None) -> Any:
+        # A flight that finished just before ours started may have filled the cache
+        val = self._lookup(cache_key, ttl, count=False)
+        if val is not _MISS:
+            return val
+        now = time.time()
+        data, size = self._project(*self._fetch(url, params), project)
+        self._store(cache_key, data, now, ttl, size)
+        return data
+
+    @staticmethod
+    def _project(data: Any, size: int, project: Optional["Projection"]) -> Tuple[Any, int]:
+        """Apply a projection before caching; size becomes the projected JSON size."""
+        if project is None:
+            return data, size
+        data = project.fn(data)
+        return data, len(json_codec().dumps(data))
+
+    @staticmethod
+    def _cache_key(url: str, params: Optional[dict], project: Optional["Projection"] = None) -> str:
+        items = tuple(sorted(params.items())) if params else ()
+        return _hashed_cache_key(url, items, project.tag if project is not None else "")
 
+    def _lookup(self, cache_key: str, ttl: float, count: bool = True) -> Any:
+        """Return a fresh cached value from memory or disk, else _MISS."""
+        if not metrics.enabled:  # hottest call site: skip even the null span
+            return self._lookup_tiers(cache_key, ttl, count)[0]
+        with metrics.span("cache.lookup"):
+            val, tier = self._lookup_tiers(cache_key, ttl, count)
+        if count:
+            metrics.inc("cache_lookups_total", tier=tier, result="miss" if val is _MISS else "hit")
+        return val
+
+    def _lookup_tiers(self, cache_key: str, ttl: float, count: bool) -> Tuple[Any, str]:
+        """(value or _MISS, tier that answered)."""
+        hit = self._cache.get(cache_key, ttl, count)
+        if hit is not None:
+            return hit[1], "memory"
+
+        if self.disk_cache is not None:
+            disk_hit = self.disk_cache.get(cache_key, ttl)
+            if disk_hit is not None:
+                ts, val, size = disk_hit
+                self._cache.set(cache_key, val, ts, ttl, size)  # keep original fetch time
+                return val, "disk"
+        return _MISS, "all"
+
+    def _store(self, cache_key: str, data: Any, ts: float, ttl: float, size: int):
+        self._cache.set(cache_key, data, ts, ttl, size)
+        if self.disk_cache is not None:
+            # Disk rows are retained through the stale window as well
+            self.disk_cache.set(cache_key, data, ts, ttl + self._stale_grace)
+
+    def _fetch(self, url: str, params: Optional[dict]) -> Tuple[Any, int]:
+        """GET with retries; returns (decoded JSON, body size in bytes)."""
+        body = self._request(url, params).content
+        with metrics.span("json.decode"):
+            return json_codec().loads(body), len(body)
+
+    def _request(self, url: str, params: Optional[dict], stream: bool = False) -> "requests.Response":
+        """GET with rate limiting and retries; returns the first 200 response."""
         # Simple retry with exponential backoff
         backoff = 0.5
         for attempt in range(5):
+            if self.rate_limiter is not None:
+                with metrics.span("http.rate_limit_wait"):
+                    waited = self.rate_limiter.acquire()
+                if waited > 0:
+                    metrics.inc("rate_limit_waits_total")
+                    metrics.inc("rate_limit_wait_seconds_total", waited)
             try:
-                resp = self.session.get(url, params=params, timeout=10)
+                with metrics.span("http.attempt"):
+                    resp = self.session.get(url, params=params, timeout=10, stream=stream)
+                metrics.inc("http_requests_total", status=str(resp.status_code))
                 if resp.status_code == 200:
-                    data = resp.json()
-                    self._cache[cache_key] = (now, data)
-                    return data
+                    return resp
 
-                # Handle rate-limiting / 429 gracefully
+                # Handle rate-limiting / 429 gracefully: Retry-After replaces the backoff
                 if resp.status_code == 429:
-                    wait = int(resp.headers.get("Retry-After", 5))
+                    wait = self._retry_after(resp.headers)
                     logger.warning("Rate limited by CoinGecko, sleeping %s seconds", wait)
-                    time.sleep(wait)
+                    metrics.inc("http_retries_total", reason="429")
+                    if self.rate_limiter is not None:
+                        self.rate_limiter.pause(wait)  # next acquire() waits it out
+                    else:
+                        with metrics.span("http.retry_after"):
+                            time.sleep(wait)
+                    continue
                 else:
                     logger.debug("Unexpected status code %s for %s", resp.status_code, url)
-            except requests.RequestException as e:
+                    metrics.inc("http_retries_total", reason="status")
+            except _requests().RequestException as e:
                 logger.debug("Request exception: %s", e)
-            time.sleep(backoff)
+                metrics.inc("http_requests_total", status="error")
+                metrics.inc("http_retries_total", reason="error")
+            with metrics.span("http.backoff"):
+                time.sleep(backoff)
             backoff *= 2
 
         raise RuntimeError(f"Failed to GET {url} after retries")
 
+    @staticmethod
+    def _retry_after(headers) -> float:
+        try:
+            return max(0.0, float(headers.get("Retry-After", 5)))
+        except (TypeError, ValueError):
+            return 5.0
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Counters for the in-memory cache tier (hits, misses, evictions, size)."""
+        return self._cache.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache and rate-limiter counters; limiter wait is queueing, not network time."""
+        return {
+            "cache": self.cache_stats(),
+            "rate_limiter": self.rate_limiter.stats() if self.rate_limiter is not None else None,
+            "single_flight": self._inflight.stats(),
+            "stale_while_revalidate": {
+                "enabled": self.stale_while_revalidate,
+                "max_stale_sec": self.max_stale,
+                "stale_served": self.stale_served,
+                "revalidations": self.revalidations,
+                "revalidation_failures": self.revalidation_failures,
+            },
+        }
+
     # Coin listing and resolution
     def coins_list(self) -> List[Dict[str, Any]]:
         """Return the list of all coins (id, symbol, name).
@@ -243,12 +1270,37 @@ class DataClient:
         """
         return self._get("/coins/list", ttl=3600)
 
+    def iter_coins_list(self) -> Iterator[Dict[str, Any]]:
+        """Stream /coins/list records as they are parsed, bypassing the response cache.
+
+        For callers that keep their own copy (the coin registry snapshot):
+        neither the raw body nor the decoded list is ever held whole.
+        """
+        url = f"{self.base_url}/coins/list"
+        resp = self._request(url, None, stream=True)
+        try:
+            yield from iter_json_array(resp.iter_content(64 * 1024))
+        except _requests().RequestException as e:
+            raise RuntimeError(f"Stream of {url} interrupted: {e}") from e
+        finally:
+            resp.close()
+
     def coin_market(self, coin_id: str, vs_currency: str = "usd") -> dict:
-        """Get market data for a coin (market endpoint)
+        """Get market data for a coin as a compact record (see project_coin).
 
-        Uses /coins/{id}?market_data=true which returns a wide set of fields.
+        Uses /coins/{id}?market_data=true, which returns a wide set of fields;
+        only what the advisor reads is cached. Use coin_document for the rest.
         """
-        params = {
+        return self._get(f"/coins/{coin_id}", params=self.coin_market_params(),
+                         project=coin_projection(vs_currency))
+
+    def coin_document(self, coin_id: str) -> dict:
+        """The full /coins/{id} document, for views that need more than coin_market."""
+        return self._get(f"/coins/{coin_id}", params=self.coin_market_params())
+
+    @staticmethod
+    def coin_market_params() -> Dict[str, str]:
+        return {
             "localization": "false",
             "tickers": "false",
             "market_data": "true",
@@ -256,72 +1308,1307 @@ class DataClient:
             "developer_data": "false",
             "sparkline": "false",
         }
-        return self._get(f"/coins/{coin_id}", params=params)
 
-    def simple_price(self, ids: str, vs_currencies: str = "usd") -> dict:
-        params = {
+    def coins_markets(self, ids: List[str], vs_currency: str = "usd") -> List[Dict[str, Any]]:
+        """Get flat market records for many coins at once (/coins/markets).
+
+        Ids are requested in pages of up to MARKETS_PAGE_SIZE, so N coins cost
+        ceil(N / 250) round trips instead of N. Records carry price, market cap,
+        volume and 24h change but no description or hashing algorithm.
+        """
+        records: List[Dict[str, Any]] = []
+        for params in self.markets_pages(ids, vs_currency):
+            records.extend(self._get("/coins/markets", params=params) or [])
+        return records
+
+    def iter_market_pages(self, max_coins: int = 5000, vs_currency: str = "usd") -> Iterator[List[Dict[str, Any]]]:
+        """Yield the whole market by market cap, one /coins/markets page at a time.
+
+        Only the current page is held, so callers that reduce each page as it
+        arrives use flat memory however many coins they scan.
+        """
+        page = 1
+        remaining = max_coins
+        while remaining > 0:
+            records = self._get("/coins/markets", params={
+                "vs_currency": vs_currency,
+                "order": "market_cap_desc",
+                "per_page": self.MARKETS_PAGE_SIZE,
+                "page": page,
+                "sparkline": "false",
+                "price_change_percentage": "24h",
+            }) or []
+            yield records[:remaining]
+            if len(records) < self.MARKETS_PAGE_SIZE:
+                return
+            remaining -= len(records)
+            page += 1
+
+    @classmethod
+    def markets_pages(cls, ids: List[str], vs_currency: str = "usd") -> List[Dict[str, Any]]:
+        """Query params for each /coins/markets page needed to cover ``ids``."""
+        pages = []
+        for chunk in cls.id_chunks(ids):
+            pages.append({
+                "vs_currency": vs_currency,
+                "ids": ",".join(chunk),
+                "per_page": cls.MARKETS_PAGE_SIZE,
+                "page": 1,
+                "sparkline": "false",
+                "price_change_percentage": "24h",
+            })
+        return pages
+
+    @staticmethod
+    def simple_price_params(ids: str, vs_currencies: str = "usd") -> Dict[str, str]:
+        return {
             "ids": ids,
             "vs_currencies": vs_currencies,
             "include_24hr_change": "true",
             "include_market_cap": "true",
             "include_24hr_vol": "true",
         }
-        return self._get("/simple/price", params=params)
+
+    def simple_price(self, ids: str, vs_currencies: str = "usd", ttl: Optional[int] = None) -> dict:
+        return self._get("/simple/price", params=self.simple_price_params(ids, vs_currencies), ttl=ttl)
+
+    def simple_prices(self, ids: List[str], vs_currencies: str = "usd",
+                      ttl: Optional[int] = None) -> Dict[str, dict]:
+        """simple_price for any number of ids, one request per MARKETS_PAGE_SIZE ids."""
+        merged: Dict[str, dict] = {}
+        for chunk in self.id_chunks(ids):
+            merged.update(self.simple_price(",".join(chunk), vs_currencies, ttl=ttl) or {})
+        return merged
+
+    @classmethod
+    def id_chunks(cls, ids: List[str]) -> List[List[str]]:
+        unique = sorted(set(ids))  # stable cache keys regardless of input order
+        return [unique[i:i + cls.MARKETS_PAGE_SIZE] for i in range(0, len(unique), cls.MARKETS_PAGE_SIZE)]
+
+    def market_chart_range(self, coin_id: str, start: float, end: float, vs_currency: str = "usd") -> dict:
+        """Raw /market_chart/range payload: ``prices``, ``market_caps`` and ``total_volumes`` as [ms, value] pairs.
+
+        CoinGecko picks the granularity from the span: 5-minutely within a
+        day, hourly up to 90 days, daily beyond. See PriceHistoryStore.
+        """
+        return self._get(f"/coins/{coin_id}/market_chart/range",
+                         params={"vs_currency": vs_currency, "from": str(int(start)), "to": str(int(end))})
 
 
 # -----------------------------
-# Helpers: symbol/id resolution
+# Async data client
 # -----------------------------
 
-class CoinRegistry:
-    """Resolve between symbol (e.g. BTC) and CoinGecko id (e.g. bitcoin).
+class AsyncDataClient:
+    """Asyncio counterpart of DataClient for concurrent fan-out.
 
-    Downloads coin list once and provides lookups. Case-insensitive and supports
-    best-effort fuzzy match if exact symbol not found.
+    Wraps a DataClient and shares its memory/disk cache tiers, so sync and
+    async callers see the same data. At most ``concurrency`` requests are in
+    flight at once. With aiohttp installed, requests go over a keep-alive
+    connection pool; otherwise they run in worker threads on the wrapped
+    client's requests session, whose adapter pool is sized to match.
+    Retry, 429 handling and the token-bucket limiter are shared with
+    DataClient._fetch.
     """
 
-    def __init__(self, client: DataClient):
-        self.client = client
-        self._by_symbol: Dict[str, List[Dict[str, Any]]] = {}
-        self._by_id: Dict[str, Dict[str, Any]] = {}
-        self.refresh()
+    def __init__(self, client: Optional[DataClient] = None, concurrency: int = 8):
+        self.client = client or DataClient()
+        self.concurrency = concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session = None  # aiohttp.ClientSession, created inside the running loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional["ThreadPoolExecutor"] = None
+        # Fixture transports replace the requests session, so they need the thread path
+        self._aiohttp = (None if isinstance(self.client.session, FixtureTransport)
+                         else optional_import("aiohttp"))
+        if self._aiohttp is None and isinstance(self.client.session, _requests().Session):
+            adapter = _requests().adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+            self.client.session.mount("https://", adapter)
+            self.client.session.mount("http://", adapter)
 
-    def refresh(self):
-        coins = self.client.coins_list()
-        self._by_symbol.clear()
-        self._by_id.clear()
-        for c in coins:
-            sym = c.get("symbol", "").lower()
-            cid = c.get("id")
-            if not sym or not cid:
-                continue
-            self._by_symbol.setdefault(sym, []).append(c)
-            self._by_id[cid] = c
+    async def __aenter__(self) -> "AsyncDataClient":
+        return self
 
-    def find_id(self, query: str) -> Optional[str]:
-        """Return a best-effort coin id for a given query (symbol or id or name).
+    async def __aexit__(self, *exc):
+        await self.close()
 
-        Examples: 'btc' -> 'bitcoin', 'bitcoin' -> 'bitcoin', 'ethereum' -> 'ethereum'
-        """
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._semaphore = None
+        self._loop = None
+
+    def _bind_loop(self):
+        """(Re)create loop-bound primitives when called from a new event loop."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._session = None  # a session from a closed loop cannot be reused
+
+    async def _get(self, path: str, params: Optional[dict] = None, ttl: Optional[int] = None,
+                   project: Optional["Projection"] = None) -> Any:
+        client = self.client
+        url = f"{client.base_url}{path}"
+        cache_key = client._cache_key(url, params, project)
+        ttl = ttl if ttl is not None else client.cache_ttl
+
+        val = client._lookup(cache_key, ttl)
+        if val is not _MISS:
+            return val
+
+        stale = client._serve_stale(url, cache_key, params, ttl, project)
+        if stale is not _MISS:
+            return stale
+
+        return await client._inflight.do_async(
+            cache_key, lambda: self._load(url, cache_key, params, ttl, project))
+
+    async def _load(self, url: str, cache_key: str, params: Optional[dict], ttl: float,
+                    project: Optional["Projection"] = None) -> Any:
+        client = self.client
+        val = client._lookup(cache_key, ttl, count=False)
+        if val is not _MISS:
+            return val
+        self._bind_loop()
+        async with self._semaphore:
+            now = time.time()
+            if self._aiohttp is not None:
+                data, size = await self._fetch(url, params)
+            else:
+                if self._executor is None:
+                    from concurrent.futures import ThreadPoolExecutor
+                    self._executor = ThreadPoolExecutor(max_workers=self.concurrency,
+                                                        thread_name_prefix="cryptobuddy-io")
+                loop = asyncio.get_running_loop()
+                data, size = await loop.run_in_executor(self._executor, client._fetch, url, params)
+        data, size = client._project(data, size, project)
+        client._store(cache_key, data, now, ttl, size)
+        return data
+
+    async def _fetch(self, url: str, params: Optional[dict]) -> Tuple[Any, int]:
+        aiohttp = self._aiohttp
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=30),
+                headers={"User-Agent": self.client.user_agent},
+                timeout=aiohttp.ClientTimeout(total=10),
+            )
+        limiter = self.client.rate_limiter
+        backoff = 0.5
+        for attempt in range(5):
+            if limiter is not None:
+                wait = limiter.reserve()
+                if wait > 0:
+                    metrics.inc("rate_limit_waits_total")
+                    metrics.inc("rate_limit_wait_seconds_total", wait)
+                    with metrics.span("http.rate_limit_wait"):
+                        await asyncio.sleep(wait)
+            try:
+                with metrics.span("http.attempt"):
+                    async with self._session.get(url, params=params) as resp:
+                        status = resp.status
+                        body = await resp.read() if status == 200 else b""
+                        headers = resp.headers
+                metrics.inc("http_requests_total", status=str(status))
+                if status == 200:
+                    with metrics.span("json.decode"):
+                        return json_codec().loads(body), len(body)
+
+                if status == 429:
+                    wait = DataClient._retry_after(headers)
+                    logger.warning("Rate limited by CoinGecko, sleeping %s seconds", wait)
+                    metrics.inc("http_retries_total", reason="429")
+                    if limiter is not None:
+                        limiter.pause(wait)
+                    else:
+                        with metrics.span("http.retry_after"):
+                            await asyncio.sleep(wait)
+                    continue
+                else:
+                    logger.debug("Unexpected status code %s for %s", status, url)
+                    metrics.inc("http_retries_total", reason="status")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.debug("Request exception: %s", e)
+                metrics.inc("http_requests_total", status="error")
+                metrics.inc("http_retries_total", reason="error")
+            with metrics.span("http.backoff"):
+                await asyncio.sleep(backoff)
+            backoff *= 2
+
+        raise RuntimeError(f"Failed to GET {url} after retries")
+
+    async def coins_list(self) -> List[Dict[str, Any]]:
+        return await self._get("/coins/list", ttl=3600)
+
+    async def coin_market(self, coin_id: str, vs_currency: str = "usd") -> dict:
+        return await self._get(f"/coins/{coin_id}", params=DataClient.coin_market_params(),
+                               project=coin_projection(vs_currency))
+
+    async def coin_document(self, coin_id: str) -> dict:
+        return await self._get(f"/coins/{coin_id}", params=DataClient.coin_market_params())
+
+    async def coins_markets(self, ids: List[str], vs_currency: str = "usd") -> List[Dict[str, Any]]:
+        pages = await asyncio.gather(*(
+            self._get("/coins/markets", params=params)
+            for params in DataClient.markets_pages(ids, vs_currency)
+        ))
+        return [r for page in pages for r in (page or [])]
+
+    async def simple_price(self, ids: str, vs_currencies: str = "usd", ttl: Optional[int] = None) -> dict:
+        return await self._get("/simple/price", params=DataClient.simple_price_params(ids, vs_currencies),
+                               ttl=ttl)
+
+    async def simple_prices(self, ids: List[str], vs_currencies: str = "usd",
+                            ttl: Optional[int] = None) -> Dict[str, dict]:
+        merged: Dict[str, dict] = {}
+        for part in await asyncio.gather(*(
+            self.simple_price(",".join(chunk), vs_currencies, ttl=ttl) for chunk in DataClient.id_chunks(ids)
+        )):
+            merged.update(part or {})
+        return merged
+
+
+# -----------------------------
+# Offline fixtures: record/replay and a local server
+# -----------------------------
+
+FIXTURE_PREFIX = "/api/v3"  # path part of DataClient.BASE, left out of fixture names
+
+
+def fixture_name(path: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """File name for one GET: a slug of the path plus a digest of the sorted params.
+
+    ``/api/v3/coins/markets?ids=...`` becomes ``coins-markets-<digest>.json``.
+    The recorder, the replayer and FixtureServer share it, so one directory
+    serves all three.
+    """
+    if path.startswith(FIXTURE_PREFIX):
+        path = path[len(FIXTURE_PREFIX):]
+    slug = "-".join(part for part in path.split("/") if part) or "root"
+    slug = "".join(c if c.isalnum() or c in "-_." else "_" for c in slug)
+    if params:
+        raw = json.dumps(sorted((str(k), str(v)) for k, v in params.items()), separators=(",", ":"))
+        slug += "-" + hashlib.blake2b(raw.encode("utf-8"), digest_size=6).hexdigest()
+    return slug + ".json"
+
+
+class FixtureResponse:
+    """The parts of requests.Response that DataClient uses, over an in-memory body."""
+
+    __slots__ = ("status_code", "headers", "content", "url")
+
+    def __init__(self, content: bytes, status_code: int = 200,
+                 headers: Optional[Dict[str, str]] = None, url: str = ""):
+        self.status_code = status_code
+        self.headers = headers or {"Content-Type": "application/json"}
+        self.content = content
+        self.url = url
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8")
+
+    def json(self) -> Any:
+        return json_codec().loads(self.content)
+
+    def iter_content(self, chunk_size: int = 1) -> Iterator[bytes]:
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FixtureTransport:
+    """Session-like base for ``DataClient(session=...)`` backed by a fixture directory.
+
+    AsyncDataClient routes fixture transports through its thread pool rather
+    than aiohttp, so async fan-out records and replays as well.
+    """
+
+    def __init__(self, fixture_dir: str):
+        self.fixture_dir = fixture_dir
+        self.headers: Dict[str, str] = {}
+
+    def fixture_path(self, url: str, params: Optional[dict]) -> str:
+        from urllib.parse import urlsplit
+        return os.path.join(self.fixture_dir, fixture_name(urlsplit(url).path, params))
+
+    def mount(self, prefix: str, adapter: Any):
+        pass
+
+
+class RecordingSession(FixtureTransport):
+    """Pass GETs through to a real session and save every 200 body as a fixture.
+
+    Bodies are written byte for byte, so a recorded directory also feeds
+    ``bench_cryptobuddy.py json --payloads``. Error responses are returned
+    but not recorded; FixtureServer injects those on demand.
+    """
+
+    def __init__(self, fixture_dir: str, session: Optional["requests.Session"] = None):
+        super().__init__(fixture_dir)
+        self.session = session if session is not None else _requests().Session()
+        self.headers = self.session.headers
+        self.recorded = 0
+        os.makedirs(fixture_dir, exist_ok=True)
+
+    def get(self, url: str, params: Optional[dict] = None, timeout: Optional[float] = None,
+            stream: bool = False, **kwargs) -> Any:
+        resp = self.session.get(url, params=params, timeout=timeout, **kwargs)
+        if resp.status_code != 200:
+            return resp
+        body = resp.content
+        path = self.fixture_path(url, params)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)  # concurrent recorders never leave a torn file
+        self.recorded += 1
+        return FixtureResponse(body, headers=dict(resp.headers), url=url)
+
+    def mount(self, prefix: str, adapter: Any):
+        self.session.mount(prefix, adapter)
+
+
+class ReplaySession(FixtureTransport):
+    """Answer GETs from recorded fixtures without touching the network.
+
+    A request with no fixture raises RuntimeError instead of returning an
+    error status, so DataClient fails at once rather than retrying with
+    backoff. Bodies are read once and kept in memory.
+    """
+
+    def __init__(self, fixture_dir: str):
+        super().__init__(fixture_dir)
+        self._bodies: Dict[str, bytes] = {}
+        self.replayed = 0
+        self.missing = 0
+
+    def load(self, url: str, params: Optional[dict] = None) -> Optional[bytes]:
+        """Recorded body for a GET, or None when it was never recorded."""
+        path = self.fixture_path(url, params)
+        body = self._bodies.get(path)
+        if body is None:
+            try:
+                with open(path, "rb") as f:
+                    body = f.read()
+            except FileNotFoundError:
+                self.missing += 1
+                return None
+            self._bodies[path] = body
+        self.replayed += 1
+        return body
+
+    def get(self, url: str, params: Optional[dict] = None, timeout: Optional[float] = None,
+            stream: bool = False, **kwargs) -> FixtureResponse:
+        body = self.load(url, params)
+        if body is None:
+            raise RuntimeError(f"No fixture for {url} {params or ''} in {self.fixture_dir} "
+                               f"(record one with --record)")
+        return FixtureResponse(body, url=url)
+
+
+class FixtureServer:
+    """Local stand-in for the CoinGecko API that serves a fixture directory.
+
+    Point a client at ``base_url`` (``--base-url`` on the command line).
+    Each request waits ``latency`` plus up to ``jitter`` seconds, then gets
+    a 429 with Retry-After (probability ``throttle_rate``), a 500
+    (``error_rate``) or the recorded body; unrecorded requests get a 404.
+    Delays and faults come from one seeded RNG, so the same seed and
+    request order reproduce the same run.
+    """
+
+    def __init__(self, fixture_dir: str, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, retry_after: float = 1.0, seed: Optional[int] = None):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        self.fixtures = ReplaySession(fixture_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {"requests": 0, "ok": 0, "throttled": 0, "errors": 0, "missing": 0}
+        self._thread: Optional[threading.Thread] = None
+        fixtures = self
+
+        class Handler(BaseHTTPRequestHandler):
+            server_version = "CryptoBuddyFixtures/1"
+
+            def do_GET(self):
+                status, body, headers = fixtures.respond(self.path)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                logger.debug("%s %s", self.address_string(), fmt % args)
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{FIXTURE_PREFIX}"
+
+    def respond(self, raw_path: str) -> Tuple[int, bytes, Dict[str, str]]:
+        """Status, body and extra headers for one GET path with query string."""
+        from urllib.parse import parse_qsl, urlsplit
+
+        with self._lock:
+            self.counts["requests"] += 1
+            delay = self.latency + (self._rng.uniform(0.0, self.jitter) if self.jitter else 0.0)
+            roll = self._rng.random()
+        if delay > 0:
+            time.sleep(delay)
+
+        if roll < self.throttle_rate:
+            return self._reply("throttled", 429, b'{"error":"rate limited"}',
+                               {"Retry-After": f"{self.retry_after:g}"})
+        if roll < self.throttle_rate + self.error_rate:
+            return self._reply("errors", 500, b'{"error":"injected failure"}')
+        url = urlsplit(raw_path)
+        body = self.fixtures.load(url.path, dict(parse_qsl(url.query)))
+        if body is None:
+            return self._reply("missing", 404, b'{"error":"not recorded"}')
+        return self._reply("ok", 200, body)
+
+    def _reply(self, outcome: str, status: int, body: bytes,
+               headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes, Dict[str, str]]:
+        with self._lock:
+            self.counts[outcome] += 1
+        return status, body, headers or {}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+        counts.update(latency_ms=self.latency * 1e3, jitter_ms=self.jitter * 1e3,
+                      error_rate=self.error_rate, throttle_rate=self.throttle_rate)
+        return counts
+
+    def start(self) -> "FixtureServer":
+        """Serve from a daemon thread; returns self for ``with FixtureServer(...).start()``."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                            name="cryptobuddy-fixtures", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def serve_forever(self):
+        """Serve in the foreground until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._httpd.server_close()
+
+
+# -----------------------------
+# Price history store
+# -----------------------------
+
+class PriceSeries(NamedTuple):
+    """Price history columns, oldest first; ``ts`` is each bucket's start in epoch seconds."""
+    ts: array
+    price: array
+    market_cap: array
+    volume: array
+
+
+def empty_series() -> PriceSeries:
+    return PriceSeries(array("d"), array("d"), array("d"), array("d"))
+
+
+def bucket_points(payload: dict, step: int, start: float, end: float) -> PriceSeries:
+    """Downsample a market_chart payload to one row per ``step``-second bucket in [start, end).
+
+    A bucket's close is the first observation at or after the next
+    bucket's start (for daily buckets, the price at the following
+    midnight). CoinGecko reports that point at every granularity, so a
+    cold daily fetch and a 5-minutely incremental one store the same
+    value; the payload must reach past ``end`` to close the last bucket.
+    Buckets that end after ``end`` are dropped, so a partial day is never
+    stored.
+    """
+    caps = {int(ms): v for ms, v in payload.get("market_caps") or []}
+    vols = {int(ms): v for ms, v in payload.get("total_volumes") or []}
+    rows: Dict[int, Tuple[int, float, float, float]] = {}  # bucket -> (ms, price, cap, volume)
+    for ms, price in payload.get("prices") or []:
+        if price is None:
+            continue
+        ms = int(ms)
+        bucket = ms // 1000 // step * step - step  # the bucket this point closes
+        if start <= bucket and bucket + step <= end and (bucket not in rows or ms < rows[bucket][0]):
+            rows[bucket] = (ms, safe_float(price), safe_float(caps.get(ms)), safe_float(vols.get(ms)))
+    out = empty_series()
+    for bucket in sorted(rows):
+        _, price, cap, vol = rows[bucket]
+        out.ts.append(bucket)
+        out.price.append(price)
+        out.market_cap.append(cap)
+        out.volume.append(vol)
+    return out
+
+
+class PriceHistoryStore:
+    """Per-coin price history that survives between runs and syncs incrementally.
+
+    Each (coin, currency) is one append-only file: a header, then rows of
+    four native doubles (bucket start, close price, market cap, volume),
+    oldest first. That is 32 bytes per day at the default daily ``step``. A
+    file loads with one ``frombytes`` and strided slices into columns, and
+    range queries bisect the timestamp column. The header records the span
+    already fetched, including stretches where CoinGecko had no data, so
+    ``sync`` only requests /market_chart/range for what lies outside it.
+    With ``root=None`` nothing is persisted.
+    """
+
+    FILE_MAGIC = b"CBPH"
+    FILE_VERSION = 1
+    _HEADER = struct.Struct("<4sHxxqdd")  # magic, version, step, synced from, synced to
+    _FIELDS = len(PriceSeries._fields)
+    _ROW_BYTES = 8 * len(PriceSeries._fields)
+    MAX_REQUEST_DAYS = 90  # CoinGecko returns daily points beyond this, too coarse for sub-daily steps
+
+    def __init__(self, root: Optional[str], client: Optional[DataClient] = None, step: int = 86400):
+        self.root = root
+        self.client = client
+        self.step = step
+        self._series: Dict[Tuple[str, str], PriceSeries] = {}
+        self._coverage: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._lock = threading.RLock()
+
+    def _path(self, coin_id: str, vs_currency: str) -> Optional[str]:
+        if not self.root:
+            return None
+        name = "".join(c if c.isalnum() or c in "-_." else "_" for c in coin_id)
+        return os.path.join(self.root, f"{vs_currency}-{self.step}s", name + ".bin")
+
+    def _loaded(self, key: Tuple[str, str]) -> PriceSeries:
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = self._load(key)
+        return series
+
+    def _load(self, key: Tuple[str, str]) -> PriceSeries:
+        path = self._path(*key)
+        if path is None or not os.path.exists(path):
+            return empty_series()
+        try:
+            with open(path, "rb") as f:
+                buf = f.read()
+            magic, version, step, lo, hi = self._HEADER.unpack_from(buf, 0)
+            if magic != self.FILE_MAGIC or version != self.FILE_VERSION or step != self.step:
+                raise ValueError("not a price history file (or another format/step)")
+            body = array("d")
+            rows = (len(buf) - self._HEADER.size) // self._ROW_BYTES  # ignore a torn trailing row
+            body.frombytes(buf[self._HEADER.size:self._HEADER.size + rows * self._ROW_BYTES])
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning("Ignoring unreadable price history %s: %s", path, e)
+            return empty_series()
+        series = PriceSeries(*(body[i::self._FIELDS] for i in range(self._FIELDS)))
+        if series.ts:  # rows written after the last header update still count as fetched
+            lo, hi = min(lo, series.ts[0]), max(hi, series.ts[-1] + self.step)
+        self._coverage[key] = (lo, hi)
+        return series
+
+    def series(self, coin_id: str, vs_currency: str = "usd") -> PriceSeries:
+        """Everything stored for a coin (shared; do not modify)."""
+        return self._loaded((coin_id, vs_currency))
+
+    def range(self, coin_id: str, start: Optional[float] = None, end: Optional[float] = None,
+              vs_currency: str = "usd") -> PriceSeries:
+        """Rows with ``start <= ts < end`` (either bound optional), as copies."""
+        s = self._loaded((coin_id, vs_currency))
+        lo = 0 if start is None else bisect.bisect_left(s.ts, start)
+        hi = len(s.ts) if end is None else bisect.bisect_left(s.ts, end)
+        return PriceSeries(*(column[lo:hi] for column in s))
+
+    def coverage(self, coin_id: str, vs_currency: str = "usd") -> Optional[Tuple[float, float]]:
+        """(from, to) span already fetched, or None if the coin was never synced."""
+        key = (coin_id, vs_currency)
+        self._loaded(key)
+        return self._coverage.get(key)
+
+    def sync(self, coin_id: str, days: float = 365, vs_currency: str = "usd", now: Optional[float] = None) -> int:
+        """Fetch whatever part of the last ``days`` is missing; returns how many rows were added.
+
+        Only whole buckets are stored, so a re-sync within the same bucket
+        makes no request at all. Each request reaches one bucket past its
+        range for the closing price (see bucket_points).
+        """
+        if self.client is None:
+            raise RuntimeError("PriceHistoryStore has no DataClient to sync from")
+        step = self.step
+        end = int(time.time() if now is None else now) // step * step
+        start = end - int(days * 86400) // step * step
+        key = (coin_id, vs_currency)
+        self._loaded(key)
+        covered = self._coverage.get(key)
+        if covered is None:
+            gaps = [(start, end)]
+        else:
+            gaps = [(a, b) for a, b in ((start, int(covered[0])), (int(covered[1]), end)) if a < b]
+        # Sub-daily buckets need CoinGecko's hourly data: keep each request, plus its closing bucket, within 90 days
+        chunk = self.MAX_REQUEST_DAYS * 86400 - step if step < 86400 else max(end - start, step)
+        added = 0
+        for lo, hi in gaps:
+            for a in range(lo, hi, chunk):
+                b = min(hi, a + chunk)
+                with metrics.span("history.sync"):
+                    payload = self.client.market_chart_range(coin_id, a, b + step, vs_currency)
+                    if not isinstance(payload, dict):
+                        raise RuntimeError(f"Couldn't fetch {coin_id} history for {a}..{b}")
+                    added += self.merge(coin_id, bucket_points(payload, step, a, b), a, b, vs_currency)
+        return added
+
+    def merge(self, coin_id: str, rows: PriceSeries, synced_from: float, synced_to: float,
+              vs_currency: str = "usd") -> int:
+        """Add rows fetched for [synced_from, synced_to); returns how many were new.
+
+        Rows after the stored ones are appended in place; anything else
+        (back-filling older history) rewrites the file.
+        """
+        key = (coin_id, vs_currency)
+        with self._lock:
+            old = self._loaded(key)
+            covered = self._coverage.get(key)
+            coverage = ((min(covered[0], synced_from), max(covered[1], synced_to)) if covered is not None
+                        else (synced_from, synced_to))
+            if not old.ts or not rows.ts or rows.ts[0] > old.ts[-1]:
+                merged = PriceSeries(*(a + b for a, b in zip(old, rows)))
+                self._write(key, merged, coverage, append_from=len(old.ts))
+            else:
+                by_ts: Dict[float, Tuple[float, float, float]] = {}
+                for series in (old, rows):  # fetched rows replace stored ones
+                    by_ts.update(zip(series.ts, zip(series.price, series.market_cap, series.volume)))
+                merged = empty_series()
+                for t in sorted(by_ts):
+                    merged.ts.append(t)
+                    for column, value in zip(merged[1:], by_ts[t]):
+                        column.append(value)
+                self._write(key, merged, coverage, append_from=None)
+            self._series[key] = merged
+            self._coverage[key] = coverage
+            return len(merged.ts) - len(old.ts)
+
+    def _write(self, key: Tuple[str, str], series: PriceSeries, coverage: Tuple[float, float],
+               append_from: Optional[int]):
+        path = self._path(*key)
+        if path is None:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        header = self._HEADER.pack(self.FILE_MAGIC, self.FILE_VERSION, self.step, *coverage)
+        if append_from is not None and os.path.exists(path):
+            with open(path, "r+b") as f:
+                # Rows before header: after a crash in between, load() still sees them as fetched
+                f.truncate(self._HEADER.size + append_from * self._ROW_BYTES)  # drop a torn row
+                f.seek(0, os.SEEK_END)
+                f.write(self._interleave(series, append_from).tobytes())
+                f.seek(0)
+                f.write(header)
+            return
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.write(self._interleave(series, 0).tobytes())
+        os.replace(tmp, path)
+
+    def _interleave(self, series: PriceSeries, first: int) -> array:
+        n = len(series.ts) - first
+        rows = array("d", bytes(n * self._ROW_BYTES))
+        for i, column in enumerate(series):
+            rows[i::self._FIELDS] = column[first:]
+        return rows
+
+
+# -----------------------------
+# Risk analytics
+# -----------------------------
+
+# Days of daily closes behind history-based risk numbers
+DEFAULT_RISK_WINDOW = 30
+# E|X| for X ~ N(0, sigma^2): puts a daily volatility on the same scale as one 24h change
+MEAN_ABS_MOVE = math.sqrt(2 / math.pi)
+
+
+class RiskMetrics(NamedTuple):
+    """History-based risk numbers for one coin over a rolling window of daily closes."""
+    id: str
+    observations: int  # daily returns in the window
+    volatility: float  # standard deviation of daily log returns, in percent
+    drawdown: float  # current fall from the window's highest close (0..1)
+    max_drawdown: float  # worst peak-to-trough fall since tracking started (0..1)
+    beta: Optional[float] = None  # against the benchmark coin
+    correlation: Optional[float] = None  # with the benchmark coin
+
+
+class Correlations(NamedTuple):
+    """Pairwise correlation of daily returns; ``matrix[i][j]`` pairs ``ids[i]`` and ``ids[j]``."""
+    ids: List[str]
+    matrix: List[List[Optional[float]]]
+    metrics: List[RiskMetrics]
+
+
+def align_closes(series: List[PriceSeries], after: Optional[float] = None) -> Tuple[List[float], List[List[float]]]:
+    """Timestamps present in every series (later than ``after``) and the closes at each, oldest first."""
+    if not series:
+        return [], []
+    columns = []
+    for s in series:
+        lo = 0 if after is None else bisect.bisect_right(s.ts, after)
+        columns.append(dict(zip(s.ts[lo:], s.price[lo:])))
+    common = sorted(set(columns[0]).intersection(*columns[1:]))
+    return common, [[column[t] for column in columns] for t in common]
+
+
+class RollingRisk:
+    """Rolling volatility, drawdown, beta and correlation over aligned price columns.
+
+    Keeps running sums of log returns and of their pairwise products over
+    the last ``window`` returns, so push() costs O(1) per column pair: the
+    new return is added and the one leaving the window subtracted. Window
+    highs use a monotonic deque per column (amortized O(1)). Running sums
+    pick up float error as values come and go, so they are rebuilt from
+    the window every RESYNC pushes; extend() rebuilds them with one matrix
+    product when NumPy is installed and the batch is longer than the window.
+    """
+
+    RESYNC = 4096
+
+    __slots__ = ("ids", "window", "benchmark", "last_ts", "_index", "_returns", "_last", "_sum", "_cross",
+                 "_highs", "_peak", "_max_dd", "_pushes")
+
+    def __init__(self, ids: Iterable[str], window: int = DEFAULT_RISK_WINDOW, benchmark: Optional[str] = None):
+        self.ids = list(ids)
+        self.window = window
+        self._index = {cid: i for i, cid in enumerate(self.ids)}
+        self.benchmark = benchmark if benchmark in self._index else None
+        self.last_ts: Optional[float] = None  # timestamp of the newest row pushed, if given
+        n = len(self.ids)
+        self._returns: deque = deque()
+        self._last: Optional[List[float]] = None
+        self._sum = [0.0] * n
+        self._cross = [[0.0] * n for _ in range(n)]  # upper triangle: [i][j] with i <= j
+        self._highs: List[deque] = [deque() for _ in range(n)]  # (push number, close), closes decreasing
+        self._peak = [0.0] * n
+        self._max_dd = [0.0] * n
+        self._pushes = 0
+
+    @property
+    def observations(self) -> int:
+        return len(self._returns)
+
+    def push(self, closes: List[float], ts: Optional[float] = None):
+        """Add one row of closes (one per column, same order as ``ids``)."""
+        self._push(closes, ts, True)
+        if self._pushes % self.RESYNC == 0:
+            self._resync()
+
+    def extend(self, rows: List[List[float]], timestamps: Optional[List[float]] = None):
+        """push() every row in order."""
+        np = optional_import("numpy") if len(rows) > self.window else None
+        stamps = timestamps if timestamps is not None else [None] * len(rows)
+        for row, ts in zip(rows, stamps):
+            self._push(row, ts, np is None)
+        if np is not None:
+            self._resync(np)
+
+    def _push(self, closes: List[float], ts: Optional[float], update_sums: bool):
+        last = self._last
+        # A missing or zero close repeats the previous one: no return rather than log(0)
+        closes = [c if c > 0 else (last[i] if last else 0.0) for i, c in enumerate(closes)]
+        if last is not None:
+            r = [math.log(c / p) if c > 0 and p > 0 else 0.0 for c, p in zip(closes, last)]
+            self._returns.append(r)
+            if update_sums:
+                self._add(r, 1.0)
+            if len(self._returns) > self.window:
+                old = self._returns.popleft()
+                if update_sums:
+                    self._add(old, -1.0)
+        self._last = closes
+        self._pushes += 1
+        k = self._pushes
+        for i, c in enumerate(closes):
+            highs = self._highs[i]
+            while highs and highs[-1][1] <= c:
+                highs.pop()
+            highs.append((k, c))
+            if highs[0][0] < k - self.window:
+                highs.popleft()
+            if c > self._peak[i]:
+                self._peak[i] = c
+            elif self._peak[i] > 0:
+                self._max_dd[i] = max(self._max_dd[i], 1.0 - c / self._peak[i])
+        if ts is not None:
+            self.last_ts = ts
+
+    def _add(self, r: List[float], sign: float):
+        n = len(r)
+        total, cross = self._sum, self._cross
+        for i in range(n):
+            ri = r[i] * sign
+            if ri:
+                total[i] += ri
+                row = cross[i]
+                for j in range(i, n):
+                    row[j] += ri * r[j]
+
+    def _resync(self, np: Any = None):
+        n = len(self.ids)
+        if np is not None and self._returns:
+            r = np.array(self._returns, dtype=np.float64)
+            self._sum = r.sum(axis=0).tolist()
+            self._cross = (r.T @ r).tolist()
+            return
+        self._sum = [0.0] * n
+        self._cross = [[0.0] * n for _ in range(n)]
+        for r in self._returns:
+            self._add(r, 1.0)
+
+    def _cov(self, i: int, j: int) -> Optional[float]:
+        n = len(self._returns)
+        if n < 2:
+            return None
+        a, b = (i, j) if i <= j else (j, i)
+        return (self._cross[a][b] - self._sum[i] * self._sum[j] / n) / (n - 1)
+
+    def volatility(self, cid: str) -> Optional[float]:
+        """Standard deviation of daily log returns in the window, in percent."""
+        var = self._cov(self._index[cid], self._index[cid])
+        return None if var is None else math.sqrt(max(var, 0.0)) * 100
+
+    def correlation(self, a: str, b: str) -> Optional[float]:
+        i, j = self._index[a], self._index[b]
+        cov, var_i, var_j = self._cov(i, j), self._cov(i, i), self._cov(j, j)
+        if cov is None or var_i <= 0 or var_j <= 0:
+            return None
+        return max(-1.0, min(1.0, cov / math.sqrt(var_i * var_j)))
+
+    def beta(self, cid: str) -> Optional[float]:
+        if self.benchmark is None:
+            return None
+        i, b = self._index[cid], self._index[self.benchmark]
+        cov, var_b = self._cov(i, b), self._cov(b, b)
+        return None if cov is None or var_b <= 0 else cov / var_b
+
+    def drawdown(self, cid: str) -> float:
+        i = self._index[cid]
+        highs = self._highs[i]
+        # A coin with no positive close in the window (zero-priced or delisted) has nothing to fall from
+        if not highs or self._last is None or highs[0][1] <= 0:
+            return 0.0
+        return 1.0 - self._last[i] / highs[0][1]
+
+    def metrics(self, cid: str) -> RiskMetrics:
+        bench = self.benchmark
+        return RiskMetrics(cid, self.observations, self.volatility(cid) or 0.0, self.drawdown(cid),
+                           self._max_dd[self._index[cid]], self.beta(cid),
+                           self.correlation(cid, bench) if bench is not None else None)
+
+    def correlation_matrix(self) -> List[List[Optional[float]]]:
+        """correlation() for every pair; one NumPy pass over the running sums when installed."""
+        n = len(self._returns)
+        np = optional_import("numpy") if n >= 2 else None
+        if np is None:
+            return [[self.correlation(a, b) for b in self.ids] for a in self.ids]
+        upper = np.triu(np.array(self._cross, dtype=np.float64))
+        total = np.array(self._sum, dtype=np.float64)
+        cov = (upper + np.triu(upper, 1).T - np.outer(total, total) / n) / (n - 1)
+        sd = np.sqrt(np.fmax(np.diag(cov), 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = np.clip(cov / np.outer(sd, sd), -1.0, 1.0).tolist()
+        valid = (sd > 0).tolist()
+        return [[v if valid[i] and valid[j] else None for j, v in enumerate(row)] for i, row in enumerate(corr)]
+
+
+# -----------------------------
+# Helpers: symbol/id resolution
+# -----------------------------
+
+def name_trigrams(text: str) -> set:
+    """Padded character trigrams of a lowercase string (pg_trgm style)."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class RegistryIndex:
+    """Immutable, array-backed coin list with precomputed lookup indexes.
+
+    Coins are rows in three parallel lists (ids, lowercase symbols, names).
+    Symbols and lowercase names are also kept sorted next to row-number
+    arrays, so exact and prefix lookups are bisects and loading needs no
+    per-row dict building beyond id -> row. The whole thing round-trips
+    through a compact binary snapshot (see ``to_bytes``), so startup does
+    not need /coins/list.
+    """
+
+    SNAPSHOT_MAGIC = b"CBRS"
+    SNAPSHOT_VERSION = 1
+    _HEADER = struct.Struct("<4sHdI")  # magic, version, created, row count
+    _SEP = "\x00"
+
+    __slots__ = ("ids", "symbols", "names", "sorted_names", "name_rows", "sorted_symbols",
+                 "symbol_rows", "created", "row_by_id", "_trigrams", "_trigram_counts")
+
+    def __init__(self, ids: List[str], symbols: List[str], names: List[str],
+                 sorted_names: Optional[List[str]] = None, name_rows: Optional[array] = None,
+                 sorted_symbols: Optional[List[str]] = None, symbol_rows: Optional[array] = None,
+                 created: Optional[float] = None):
+        self.ids = ids
+        self.symbols = symbols
+        self.names = names
+        self.created = created if created is not None else time.time()
+        if name_rows is None:
+            lower = [n.lower() for n in names]
+            name_rows = array("I", sorted(range(len(ids)), key=lower.__getitem__))
+            sorted_names = [lower[r] for r in name_rows]
+        if symbol_rows is None:
+            symbol_rows = array("I", sorted(range(len(ids)), key=symbols.__getitem__))
+            sorted_symbols = [symbols[r] for r in symbol_rows]
+        self.sorted_names: List[str] = sorted_names
+        self.name_rows = name_rows
+        self.sorted_symbols: List[str] = sorted_symbols
+        self.symbol_rows = symbol_rows
+        self.row_by_id: Dict[str, int] = dict(zip(ids, range(len(ids))))
+        self._trigrams: Optional[Dict[str, List[int]]] = None
+        self._trigram_counts: Optional[array] = None
+
+    @staticmethod
+    def _equal_range(keys: List[str], rows: array, q: str) -> array:
+        lo = bisect.bisect_left(keys, q)
+        return rows[lo:bisect.bisect_right(keys, q, lo)]
+
+    def rows_for_symbol(self, symbol: str) -> array:
+        """Rows whose lowercase symbol equals ``symbol``, in list order."""
+        return self._equal_range(self.sorted_symbols, self.symbol_rows, symbol)
+
+    def rows_for_name(self, name: str) -> array:
+        """Rows whose lowercase name equals ``name``, in list order."""
+        return self._equal_range(self.sorted_names, self.name_rows, name) if name else array("I")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_coins(cls, coins: Iterable[Dict[str, Any]]) -> "RegistryIndex":
+        ids, symbols, names, seen = [], [], [], set()
+        for c in coins:
+            sym = (c.get("symbol") or "").lower()
+            cid = c.get("id")
+            if not sym or not cid or cid in seen:
+                continue
+            seen.add(cid)
+            ids.append(cid)
+            symbols.append(sys.intern(sym))  # symbols repeat a lot
+            names.append((c.get("name") or "").replace(cls._SEP, " "))
+        return cls(ids, symbols, names)
+
+    def same_coins(self, other: "RegistryIndex") -> bool:
+        return self.ids == other.ids and self.symbols == other.symbols and self.names == other.names
+
+    def coin(self, row: int) -> Dict[str, str]:
+        return {"id": self.ids[row], "symbol": self.symbols[row], "name": self.names[row]}
+
+    def trigram_index(self) -> Dict[str, List[int]]:
+        """Trigram -> rows posting lists, built on first substring/fuzzy query."""
+        if self._trigrams is None:
+            index: Dict[str, List[int]] = {}
+            counts = array("H", bytes(2 * len(self.ids)))
+            for name, r in zip(self.sorted_names, self.name_rows):
+                grams = name_trigrams(name)
+                counts[r] = min(len(grams), 0xFFFF)
+                for g in grams:
+                    index.setdefault(g, []).append(r)
+            self._trigram_counts = counts
+            self._trigrams = index
+        return self._trigrams
+
+    def to_bytes(self) -> bytes:
+        parts = [self._HEADER.pack(self.SNAPSHOT_MAGIC, self.SNAPSHOT_VERSION, self.created, len(self.ids))]
+        for blob in (self._SEP.join(self.ids).encode("utf-8"),
+                     self._SEP.join(self.symbols).encode("utf-8"),
+                     self._SEP.join(self.names).encode("utf-8"),
+                     self._SEP.join(self.sorted_names).encode("utf-8"),
+                     self.name_rows.tobytes(),
+                     self.symbol_rows.tobytes()):
+            parts.append(struct.pack("<I", len(blob)))
+            parts.append(blob)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, buf) -> "RegistryIndex":
+        magic, version, created, count = cls._HEADER.unpack_from(buf, 0)
+        if magic != cls.SNAPSHOT_MAGIC or version != cls.SNAPSHOT_VERSION:
+            raise ValueError("not a registry snapshot (or an older format)")
+        offset = cls._HEADER.size
+        sections = []
+        for _ in range(6):
+            (length,) = struct.unpack_from("<I", buf, offset)
+            offset += 4
+            sections.append(bytes(buf[offset:offset + length]))
+            offset += length
+
+        def strings(blob: bytes) -> List[str]:
+            return blob.decode("utf-8").split(cls._SEP) if count else []
+
+        ids = strings(sections[0])
+        symbols = [sys.intern(sym) for sym in strings(sections[1])]
+        names, sorted_names = strings(sections[2]), strings(sections[3])
+        name_rows, symbol_rows = array("I"), array("I")
+        name_rows.frombytes(sections[4])
+        symbol_rows.frombytes(sections[5])
+        if not (len(ids) == len(symbols) == len(names) == len(sorted_names)
+                == len(name_rows) == len(symbol_rows) == count):
+            raise ValueError("corrupt registry snapshot")
+        sorted_symbols = [symbols[r] for r in symbol_rows]
+        return cls(ids, symbols, names, sorted_names, name_rows, sorted_symbols, symbol_rows, created)
+
+
+class CoinRegistry:
+    """Resolve between symbol (e.g. BTC) and CoinGecko id (e.g. bitcoin).
+
+    Downloads coin list once and provides lookups. Case-insensitive and supports
+    best-effort fuzzy match if exact symbol not found.
+
+    Name lookups are indexed: an exact-name dict, a sorted name list for
+    prefix search (bisect) and a trigram index for substring/fuzzy search,
+    built on first use. Candidates are ranked by match quality, then by
+    market cap when known (see ``note_market_caps``), then list order.
+
+    With ``snapshot_path`` the index is loaded from (and saved to) a binary
+    snapshot; a snapshot older than ``ttl`` is served as-is while a
+    background thread refreshes it.
+    """
+
+    SNAPSHOT_TTL = 24 * 3600
+
+    def __init__(self, client: Optional[DataClient], coins: Optional[List[Dict[str, Any]]] = None,
+                 snapshot_path: Optional[str] = None, ttl: float = SNAPSHOT_TTL,
+                 market_caps: Optional[Dict[str, float]] = None):
+        self.client = client
+        self.snapshot_path = snapshot_path
+        self.ttl = ttl
+        self._data = RegistryIndex([], [], [])  # swapped as a whole; readers take one reference
+        self._market_caps: Dict[str, float] = market_caps if market_caps is not None else {}
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        if coins is not None:
+            self.load(coins)
+        elif not self._load_snapshot():
+            self.refresh()
+        elif self.age > self.ttl:
+            self.refresh_in_background()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def age(self) -> float:
+        """Seconds since the coin list was fetched from CoinGecko."""
+        return time.time() - self._data.created
+
+    def refresh(self):
+        with metrics.span("registry.refresh"):
+            new = RegistryIndex.from_coins(self.client.iter_coins_list())
+        old = self._data
+        if old.same_coins(new):
+            old.created = new.created  # unchanged: keep the built indexes (incl. trigrams)
+        else:
+            added = len(new.row_by_id.keys() - old.row_by_id.keys())
+            removed = len(old.row_by_id.keys() - new.row_by_id.keys())
+            logger.debug("Coin registry refreshed: %d added, %d removed", added, removed)
+            self._data = new
+        self._save_snapshot()
+
+    def refresh_if_stale(self, max_age: Optional[float] = None) -> bool:
+        """refresh() if the list is older than ``max_age`` (default: ttl); True if it did."""
+        if self.age <= (self.ttl if max_age is None else max_age):
+            return False
+        self.refresh()
+        return True
+
+    def refresh_in_background(self) -> bool:
+        """Start a daemon refresh unless one is already running."""
+        with self._refresh_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return False
+
+            def run():
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.warning("Background registry refresh failed: %s", e)
+
+            self._refresh_thread = threading.Thread(target=run, name="cryptobuddy-registry", daemon=True)
+            self._refresh_thread.start()
+            return True
+
+    def load(self, coins: List[Dict[str, Any]]):
+        """Rebuild the lookup indexes from a /coins/list payload."""
+        self._data = RegistryIndex.from_coins(coins)
+
+    def _load_snapshot(self) -> bool:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with metrics.span("registry.snapshot_load"), open(self.snapshot_path, "rb") as f:
+                self._data = RegistryIndex.from_bytes(f.read())
+            return True
+        except (OSError, ValueError, struct.error, UnicodeDecodeError) as e:
+            logger.warning("Ignoring unreadable registry snapshot %s: %s", self.snapshot_path, e)
+            return False
+
+    def _save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        tmp = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.snapshot_path)), exist_ok=True)
+            with open(tmp, "wb") as f:
+                f.write(self._data.to_bytes())
+            os.replace(tmp, self.snapshot_path)  # atomic for concurrent readers
+        except OSError as e:
+            logger.warning("Could not write registry snapshot %s: %s", self.snapshot_path, e)
+
+    def get(self, coin_id: str) -> Optional[Dict[str, str]]:
+        """Coin metadata (id, symbol, name) for a known id."""
+        d = self._data
+        row = d.row_by_id.get(coin_id)
+        return d.coin(row) if row is not None else None
+
+    def note_market_caps(self, caps: Dict[str, float]):
+        """Record market caps (coin id -> USD) used to rank ambiguous matches."""
+        self._market_caps.update(caps)
+
+    def find_id(self, query: str) -> Optional[str]:
+        """Return a best-effort coin id for a given query (symbol or id or name).
+
+        Examples: 'btc' -> 'bitcoin', 'bitcoin' -> 'bitcoin', 'ethereum' -> 'ethereum'
+        """
         q = query.strip().lower()
-        # exact id
-        if q in self._by_id:
+        d = self._data
+        # exact id / unambiguous symbol: plain dict hits, no ranking needed
+        if q in d.row_by_id:
             return q
-        # exact symbol
-        if q in self._by_symbol and len(self._by_symbol[q]) == 1:
-            return self._by_symbol[q][0]["id"]
-        # multiple symbols with same symbol (rare) -> prefer common names
-        if q in self._by_symbol:
-            # heuristics: prefer id that matches symbol+"(token)" etc. Just return first.
-            return self._by_symbol[q][0]["id"]
-        # fallback: try to find by name substring
-        for cid, meta in self._by_id.items():
-            if q == meta.get("name", "").lower():
-                return cid
-        for cid, meta in self._by_id.items():
-            if q in meta.get("name", "").lower():
-                return cid
-        return None
+        rows = d.rows_for_symbol(q)
+        if rows:
+            # multiple coins with same symbol -> prefer the largest market cap
+            if len(rows) == 1:
+                return d.ids[rows[0]]
+            return d.ids[min(rows, key=lambda r: self._rank_key(d, r))]
+        matches = self.search(q, limit=1, fuzzy=False)
+        return matches[0][0] if matches else None
+
+    def search(self, query: str, limit: int = 5, fuzzy: bool = True,
+               min_similarity: float = 0.3) -> List[Tuple[str, float]]:
+        """Ranked (coin id, score) candidates for a query, best first.
+
+        Tiers: exact id (1.0), exact symbol (0.95), exact name (0.9), name
+        prefix (0.8), name substring (0.6), then trigram similarity (<= 0.5).
+        Lower tiers are only computed while fewer than ``limit`` candidates
+        have been found.
+        """
+        q = query.strip().lower()
+        if not q:
+            return []
+        d = self._data
+        ranked: List[Tuple[str, float]] = []
+        seen = set()
+        for tier in self._match_tiers(d, q, fuzzy, min_similarity):
+            fresh = [(row, score) for row, score in tier if row not in seen]
+            # partial selection: only the slots still open need ordering
+            fresh = heapq.nsmallest(limit - len(ranked), fresh,
+                                    key=lambda m: (-m[1],) + self._rank_key(d, m[0]))
+            for row, score in fresh:
+                seen.add(row)
+                ranked.append((d.ids[row], score))
+            if len(ranked) >= limit:
+                break
+        return ranked[:limit]
+
+    def _rank_key(self, d: RegistryIndex, row: int) -> Tuple[float, int]:
+        return -self._market_caps.get(d.ids[row], 0.0), row
+
+    def _match_tiers(self, d: RegistryIndex, q: str, fuzzy: bool, min_similarity: float):
+        row = d.row_by_id.get(q)
+        if row is not None:
+            yield [(row, 1.0)]
+        yield [(r, 0.95) for r in d.rows_for_symbol(q)]
+        yield [(r, 0.9) for r in d.rows_for_name(q)]
+
+        prefix = []
+        i = bisect.bisect_left(d.sorted_names, q)
+        while i < len(d.sorted_names) and d.sorted_names[i].startswith(q):
+            prefix.append((d.name_rows[i], 0.8))
+            i += 1
+        yield prefix
+
+        if len(q) < 3:
+            # Too short for trigrams: fall back to a scan (rare, and cheap for 1-2 chars)
+            yield [(r, 0.6) for name, r in zip(d.sorted_names, d.name_rows) if q in name]
+            return
+        index = d.trigram_index()
+        grams = sorted({q[i:i + 3] for i in range(len(q) - 2)},
+                       key=lambda g: len(index.get(g, ())))
+        candidates = set(index.get(grams[0], ()))
+        for g in grams[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(index.get(g, ()))
+        yield [(r, 0.6) for r in candidates if q in d.names[r].lower()]
+
+        if fuzzy:
+            yield self._fuzzy(d, q, min_similarity)
+
+    @staticmethod
+    def _fuzzy(d: RegistryIndex, q: str, min_similarity: float) -> List[Tuple[int, float]]:
+        index = d.trigram_index()
+        counts = d._trigram_counts
+        qgrams = name_trigrams(q)
+        shared: Dict[int, int] = {}
+        for g in qgrams:
+            for r in index.get(g, ()):
+                shared[r] = shared.get(r, 0) + 1
+        matches = []
+        for r, n in shared.items():
+            similarity = 2.0 * n / (len(qgrams) + counts[r])  # Dice coefficient
+            if similarity >= min_similarity:
+                matches.append((r, 0.5 * similarity))
+        return matches
 
 
 # -----------------------------
@@ -361,21 +2648,46 @@ def heuristic_sustainability(coin_market_data: dict) -> float:
     return 0.5
 
 
+def sustainability_inputs(coin_data: dict) -> Tuple[str, str]:
+    """(hashing_algorithm, English description): the fields heuristic_sustainability reads."""
+    return coin_data.get("hashing_algorithm") or "", (coin_data.get("description") or {}).get("en", "") or ""
+
+
+def sustainability_digest(coin_data: dict) -> str:
+    """Short digest of sustainability_inputs, stored next to cached scores."""
+    hashing, desc = sustainability_inputs(coin_data)
+    return hashlib.blake2b(f"{hashing}\0{desc}".encode("utf-8"), digest_size=8).hexdigest()
+
+
+def has_sustainability_inputs(coin_data: Optional[dict]) -> bool:
+    """True for full /coins/{id} documents; lean /coins/markets records lack the text fields."""
+    return coin_data is not None and ("description" in coin_data or "hashing_algorithm" in coin_data)
+
+
 def compute_risk_score(coin_market_data: dict) -> float:
     """Compute a risk score: higher means more risky (0..1).
 
-    - Volatility: 24h change magnitude
+    - Volatility: 24h change magnitude (see risk_from_fields for history-based volatility)
     - Market cap: smaller market cap -> more risky
     - Liquidity: volume relative to market cap
     """
-    try:
-        market = coin_market_data.get("market_data", {})
-        price_change = safe_float(market.get("price_change_percentage_24h", 0))
-        market_cap = safe_float(market.get("market_cap", {}).get("usd", 0))
-        vol = safe_float(market.get("total_volume", {}).get("usd", 0))
+    if coin_market_data is None:
+        return 0.7
+    fields = market_fields(coin_market_data)
+    return risk_from_fields(fields["change_24h"], fields["market_cap"], fields["volume"])
 
+
+def risk_from_fields(price_change: float, market_cap: float, vol: float,
+                     volatility: Optional[float] = None) -> float:
+    """compute_risk_score on already-extracted numbers.
+
+    ``volatility`` (daily, in percent; see RiskMetrics) replaces the single
+    24h change with the typical daily move it implies.
+    """
+    try:
         vol_ratio = (vol / market_cap) if market_cap > 0 else 1.0
-        vol_score = min(1.0, abs(price_change) / 20.0)  # 20% -> 1.0
+        move = abs(price_change) if volatility is None else volatility * MEAN_ABS_MOVE
+        vol_score = min(1.0, move / 20.0)  # 20% -> 1.0
         cap_score = 1.0 - (math.tanh(math.log1p(market_cap) / 20.0))  # larger cap -> lower risk
         liquidity_score = 1.0 - math.tanh(vol_ratio * 10)
 
@@ -386,13 +2698,83 @@ def compute_risk_score(coin_market_data: dict) -> float:
         return 0.7
 
 
-def sentiment_score(text: str) -> float:
-    """Return sentiment polarity in [-1,1]. Use TextBlob if available, else deterministic fallback."""
-    if not text:
-        return 0.0
-    if TEXTBLOB_AVAILABLE:
+def combined_score(sustain: float, change_24h: float, risk: float) -> float:
+    # favor sustainability and positive momentum, penalize risk
+    return sustain * 0.4 + (max(-10, change_24h) / 100.0) * 0.3 - risk * 0.3
+
+
+# Below this many rows the scalar loop beats importing NumPy and building arrays
+VECTORIZE_MIN_ROWS = 128
+
+
+class ScoreColumns(NamedTuple):
+    risk: Any  # numpy arrays, or lists without numpy
+    combined: Any
+
+
+def score_columns(change_24h, market_cap, volume, sustainability,
+                  vectorize: Optional[bool] = None, exact: bool = True, volatility=None) -> ScoreColumns:
+    """Risk and combined score for whole columns of coins at once.
+
+    Uses NumPy when installed (by default only for VECTORIZE_MIN_ROWS rows
+    or more) and otherwise falls back to the scalar functions. The NumPy
+    path follows risk_from_fields operation for operation, including the
+    0.7 fallback where log1p is undefined. With ``exact`` the two
+    transcendental steps go through libm like the scalar code, so results
+    are bit-identical; without it NumPy's SIMD tanh/log1p are ~3x faster
+    but may differ in the last bit (tests/test_score_columns.py checks
+    both). ``volatility`` is an optional column for risk_from_fields (None
+    where a coin has no history).
+    """
+    if vectorize is None:
+        vectorize = len(change_24h) >= VECTORIZE_MIN_ROWS
+    np = optional_import("numpy") if vectorize else None
+    if np is None:
+        sigma = volatility if volatility is not None else [None] * len(change_24h)
+        risk = [risk_from_fields(c, m, v, s) for c, m, v, s in zip(change_24h, market_cap, volume, sigma)]
+        return ScoreColumns(risk, [combined_score(s, c, r) for s, c, r in zip(sustainability, change_24h, risk)])
+
+    if exact:
+        def tanh(x):
+            return np.fromiter(map(math.tanh, x.tolist()), np.float64, len(x))
+
+        def log1p(x):
+            # nan where math.log1p would raise; those rows are overwritten below
+            return np.fromiter((math.log1p(v) if v > -1.0 else math.nan for v in x.tolist()), np.float64, len(x))
+    else:
+        tanh, log1p = np.tanh, np.log1p
+
+    change = np.asarray(change_24h, dtype=np.float64)
+    cap = np.asarray(market_cap, dtype=np.float64)
+    vol = np.asarray(volume, dtype=np.float64)
+    sustain = np.asarray(sustainability, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        positive = cap > 0
+        vol_ratio = np.where(positive, vol / np.where(positive, cap, 1.0), 1.0)
+        move = np.abs(change)
+        if volatility is not None:
+            sigma = np.array([math.nan if v is None else v for v in volatility], dtype=np.float64)
+            move = np.where(np.isnan(sigma), move, sigma * MEAN_ABS_MOVE)
+        # fmin/fmax skip NaN the same way Python's min/max keep their first argument
+        vol_score = np.fmin(1.0, move / 20.0)
+        cap_score = 1.0 - tanh(log1p(cap) / 20.0)
+        liquidity_score = 1.0 - tanh(vol_ratio * 10)
+        score = 0.5 * vol_score + 0.3 * cap_score + 0.2 * liquidity_score
+        risk = np.fmax(0.0, np.fmin(1.0, score))
+    # math.log1p raises at or below -1, which the scalar path turns into 0.7
+    risk = np.where(cap <= -1.0, 0.7, risk)
+    combined = sustain * 0.4 + (np.fmax(-10.0, change) / 100.0) * 0.3 - risk * 0.3
+    return ScoreColumns(risk, combined)
+
+
+def sentiment_score(text: str) -> float:
+    """Return sentiment polarity in [-1,1]. Use TextBlob if available, else deterministic fallback."""
+    if not text:
+        return 0.0
+    textblob = optional_import("textblob")
+    if textblob is not None:
         try:
-            tb = TextBlob(text)
+            tb = textblob.TextBlob(text)
             return max(-1.0, min(1.0, tb.sentiment.polarity))
         except Exception:
             pass
@@ -418,10 +2800,876 @@ def sentiment_score(text: str) -> float:
     return max(-1.0, min(1.0, score))
 
 
+# -----------------------------
+# Result records and renderers
+# -----------------------------
+
+class Quote(NamedTuple):
+    """Market numbers for one coin, as shown in price and watchlist views."""
+    id: str
+    symbol: str
+    name: str
+    price: float
+    change_24h: float
+    market_cap: float
+    volume: float
+
+
+class CoinScore(NamedTuple):
+    """Market numbers plus the advisor's scores for one coin."""
+    id: str
+    symbol: str
+    name: str
+    price: float
+    change_24h: float
+    market_cap: float
+    volume: float
+    sustainability: float
+    risk: float
+    combined_score: float
+    description: str = ""
+    volatility: Optional[float] = None  # from price history, when risk used it (see RiskMetrics)
+    max_drawdown: Optional[float] = None
+    beta: Optional[float] = None
+
+
+class Holding(NamedTuple):
+    coin_id: str
+    amount: float  # coin units
+    cost: float  # USD paid for ``amount`` (average-cost basis)
+
+
+class Position(NamedTuple):
+    """One holding valued at its latest price."""
+    id: str
+    name: str
+    amount: float
+    price: float
+    value: float
+    cost: float
+    pnl: float
+    pnl_pct: float
+    weight: float  # share of the portfolio's value (0..1)
+    change_24h: float  # percent
+
+
+class PortfolioValuation(NamedTuple):
+    positions: List[Position]  # largest first
+    value: float
+    cost: float
+    pnl: float
+    pnl_pct: float
+    change_24h: float  # USD
+    missing: List[str]  # held coins the last price request didn't cover (valued at their last known price)
+    repriced: int  # positions recomputed by the last revalue
+
+
+class Comparison(NamedTuple):
+    a: CoinScore
+    b: CoinScore
+    winner: Optional[str]  # coin id, or None when neither wins on both counts
+
+
+def quote_from_market(coin_id: str, d: dict) -> Quote:
+    f = market_fields(d)
+    return Quote(coin_id, d.get("symbol", "").upper(), d.get("name", coin_id),
+                 f["price"], f["change_24h"], f["market_cap"], f["volume"])
+
+
+def score_coin(coin_id: str, d: dict, sustain: float, description: str = "",
+               history: Optional[RiskMetrics] = None) -> CoinScore:
+    """Score a /coins/{id} document or /coins/markets record (with history-based risk if given)."""
+    f = market_fields(d)
+    volatility = history.volatility if history is not None else None
+    risk = risk_from_fields(f["change_24h"], f["market_cap"], f["volume"], volatility)
+    combined = combined_score(sustain, f["change_24h"], risk)
+    return CoinScore(coin_id, d.get("symbol", "").upper(), d.get("name", coin_id),
+                     f["price"], f["change_24h"], f["market_cap"], f["volume"],
+                     sustain, risk, combined, description, *_history_fields(history))
+
+
+def _history_fields(history: Optional[RiskMetrics]) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+    if history is None:
+        return None, None, None
+    return history.volatility, history.max_drawdown, history.beta
+
+
+def score_quotes(quotes: List[Quote], sustainability: List[float], top: Optional[int] = None,
+                 history: Optional[Dict[str, RiskMetrics]] = None) -> List[CoinScore]:
+    """Score many quotes column-wise (see score_columns), best first.
+
+    With ``top`` only the best ``top`` are kept, by partial selection
+    rather than a full sort. Coins in ``history`` are scored on their
+    history-based volatility.
+    """
+    results = _scored(quotes, sustainability, history)
+    if top is not None:
+        return heapq.nlargest(top, results, key=_combined_key)
+    results.sort(key=_combined_key, reverse=True)
+    return results
+
+
+def _scored(quotes: List[Quote], sustainability: List[float],
+            history: Optional[Dict[str, RiskMetrics]] = None) -> List[CoinScore]:
+    found = [history.get(q.id) for q in quotes] if history else None
+    cols = score_columns([q.change_24h for q in quotes], [q.market_cap for q in quotes],
+                         [q.volume for q in quotes], sustainability,
+                         volatility=[h.volatility if h else None for h in found] if found else None)
+    risk = cols.risk.tolist() if hasattr(cols.risk, "tolist") else cols.risk
+    combined = cols.combined.tolist() if hasattr(cols.combined, "tolist") else cols.combined
+    if not found:
+        return [CoinScore(*q, s, r, c) for q, s, r, c in zip(quotes, sustainability, risk, combined)]
+    return [CoinScore(*q, s, r, c, "", *_history_fields(h))
+            for q, s, r, c, h in zip(quotes, sustainability, risk, combined, found)]
+
+
+def _combined_key(r: CoinScore) -> float:
+    return r.combined_score
+
+
+class ScreenFilters(NamedTuple):
+    min_market_cap: float = 0.0
+    max_risk: float = 1.0
+    min_sustainability: float = 0.0
+    min_volume_ratio: float = 0.0  # 24h volume / market cap
+
+
+def screen_markets(pages: Iterable[List[Dict[str, Any]]], sustainability: Callable[[str], float],
+                   filters: ScreenFilters = ScreenFilters(), top: int = 10) -> List[CoinScore]:
+    """Top ``top`` coins by combined score across streamed market pages.
+
+    Each page is filtered and scored column-wise, then merged into a
+    bounded min-heap, so work is O(n log top) and memory O(top + page).
+    """
+    heap: List[Tuple[float, int, CoinScore]] = []
+    seen = 0
+    for records in pages:
+        quotes, sustain = [], []
+        for d in records:
+            q = quote_from_market(d.get("id", ""), d)
+            if not q.id or q.market_cap < filters.min_market_cap:
+                continue
+            if filters.min_volume_ratio and (q.market_cap <= 0 or q.volume / q.market_cap < filters.min_volume_ratio):
+                continue
+            s = sustainability(q.id)
+            if s < filters.min_sustainability:
+                continue
+            quotes.append(q)
+            sustain.append(s)
+        for r in _scored(quotes, sustain):
+            if r.risk > filters.max_risk:
+                continue
+            seen += 1
+            entry = (r.combined_score, -seen, r)  # earlier (bigger cap) wins ties
+            if len(heap) < top:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+    return [r for _, _, r in sorted(heap, reverse=True)]
+
+
+def compare_scores(a: CoinScore, b: CoinScore) -> Comparison:
+    winner = None
+    if a.sustainability > b.sustainability and a.risk < b.risk:
+        winner = a.id
+    elif b.sustainability > a.sustainability and b.risk < a.risk:
+        winner = b.id
+    return Comparison(a, b, winner)
+
+
+def record_to_dict(result: Any) -> Any:
+    """Convert records (and lists/dicts of them) to plain JSON-ready values."""
+    if hasattr(result, "_asdict"):
+        return {k: record_to_dict(v) for k, v in result._asdict().items()}
+    if isinstance(result, dict):
+        return {k: record_to_dict(v) for k, v in result.items()}
+    if isinstance(result, (list, tuple)):
+        return [record_to_dict(v) for v in result]
+    return result
+
+
+def result_rows(result: Any) -> List[NamedTuple]:
+    """Flatten a view result into the records that make up its table rows."""
+    if isinstance(result, Comparison):
+        return [result.a, result.b]
+    if isinstance(result, Correlations):
+        return result.metrics
+    if isinstance(result, PortfolioValuation):
+        return result.positions
+    if isinstance(result, dict):
+        return [r for r in result.values() if r is not None]
+    if isinstance(result, list):
+        return result
+    return [result]
+
+
+def render_json(result: Any) -> str:
+    return json.dumps(record_to_dict(result), indent=2)
+
+
+def render_csv(result: Any) -> str:
+    import csv
+    import io
+
+    rows = result_rows(result)
+    if not rows:
+        return ""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(rows[0]._fields)
+    writer.writerows(rows)
+    return buf.getvalue()
+
+
+class PlainRenderer:
+    """Emoji-free, deterministic text views."""
+
+    def summary(self, r: CoinScore) -> str:
+        lines = [
+            f"{r.name} ({r.symbol})",
+            f"Price:          {format_currency(r.price)} ({r.change_24h:+.2f}% 24h)",
+            f"Market cap:     {format_currency(r.market_cap)}",
+            f"24h volume:     {format_currency(r.volume)}",
+            f"Sustainability: {r.sustainability*100:.0f}%",
+            f"Risk:           {r.risk:.2f}/1.0",
+        ]
+        if r.volatility is not None:
+            lines.append(f"Volatility:     {r.volatility:.2f}% daily, max drawdown {r.max_drawdown:.0%}"
+                         + (f", beta {r.beta:.2f}" if r.beta is not None else ""))
+        if r.description:
+            lines.append(f"Description:    {r.description[:300]}")
+        return "\n".join(lines)
+
+    def comparison(self, c: Comparison) -> str:
+        lines = [f"{'':<16}{c.a.symbol:>16}{c.b.symbol:>16}"]
+        for label, attr, fmt in (("Price", "price", format_currency), ("24h change", "change_24h", "{:+.2f}%".format),
+                                 ("Market cap", "market_cap", format_currency),
+                                 ("Sustainability", "sustainability", "{:.0%}".format),
+                                 ("Risk", "risk", "{:.2f}".format),
+                                 ("Volatility", "volatility", "{:.2f}%".format),
+                                 ("Max drawdown", "max_drawdown", "{:.0%}".format),
+                                 ("Beta", "beta", "{:.2f}".format)):
+            va, vb = getattr(c.a, attr), getattr(c.b, attr)
+            if va is None and vb is None:
+                continue
+            lines.append(f"{label:<16}{'-' if va is None else fmt(va):>16}{'-' if vb is None else fmt(vb):>16}")
+        winner = c.a.name if c.winner == c.a.id else c.b.name if c.winner == c.b.id else "none"
+        lines.append(f"Winner: {winner}")
+        return "\n".join(lines)
+
+    def rankings(self, results: List[CoinScore]) -> str:
+        lines = [f"{'#':>2}  {'SYMBOL':<8}{'SCORE':>8}{'PRICE':>14}{'24H':>9}{'RISK':>6}{'SUST':>6}"]
+        for i, r in enumerate(results, 1):
+            lines.append(f"{i:>2}  {r.symbol:<8}{r.combined_score:>8.3f}{format_currency(r.price):>14}"
+                         f"{r.change_24h:>+8.2f}%{r.risk:>6.2f}{r.sustainability:>6.2f}")
+        return "\n".join(lines)
+
+    def correlations(self, c: Correlations) -> str:
+        lines = [f"{'':<10}" + "".join(f"{cid[:9]:>10}" for cid in c.ids)]
+        for cid, row in zip(c.ids, c.matrix):
+            lines.append(f"{cid[:9]:<10}" + "".join(f"{'-' if v is None else format(v, '.2f'):>10}" for v in row))
+        lines.append("")
+        lines.append(f"{'':<10}{'VOL%':>8}{'DD':>8}{'MAXDD':>8}{'BETA':>8}")
+        for m in c.metrics:
+            beta = "-" if m.beta is None else f"{m.beta:.2f}"
+            lines.append(f"{m.id[:9]:<10}{m.volatility:>8.2f}{m.drawdown:>8.0%}{m.max_drawdown:>8.0%}{beta:>8}")
+        return "\n".join(lines)
+
+    def portfolio(self, v: PortfolioValuation) -> str:
+        lines = [f"{'COIN':<14}{'AMOUNT':>14}{'PRICE':>14}{'VALUE':>14}{'P&L':>14}{'P&L%':>9}{'WEIGHT':>8}"]
+        for p in v.positions:
+            lines.append(f"{p.id[:13]:<14}{p.amount:>14.6g}{format_currency(p.price):>14}{format_currency(p.value):>14}"
+                         f"{p.pnl:>+14,.2f}{p.pnl_pct:>+8.1f}%{p.weight:>8.1%}")
+        lines.append(f"Total value: {format_currency(v.value)}  cost: {format_currency(v.cost)}  "
+                     f"P&L: {v.pnl:+,.2f} ({v.pnl_pct:+.1f}%)  24h: {v.change_24h:+,.2f}")
+        if v.missing:
+            lines.append(f"No current price: {', '.join(v.missing)}")
+        return "\n".join(lines)
+
+    def quotes(self, quotes: Dict[str, Optional[Quote]]) -> str:
+        lines = []
+        for key, q in quotes.items():
+            if q is None:
+                lines.append(f"{key}: no data")
+            else:
+                lines.append(f"{q.symbol or q.id}: {format_currency(q.price)} ({q.change_24h:+.2f}%)")
+        return "\n".join(lines)
+
+    watchlist = prices = quotes
+
+
+class PersonalityRenderer:
+    """The CryptoBuddy voice: emoji, reactions and disclaimers."""
+
+    def __init__(self, personality: Optional[CryptoPersonality] = None):
+        self.personality = personality or CryptoPersonality()
+
+    def summary(self, r: CoinScore) -> str:
+        # Personality reactions
+        price_reaction = ""
+        if r.change_24h > 0:
+            price_reaction = self.personality.react_to_positive_data(r.name, r.change_24h)
+        elif r.change_24h < 0:
+            price_reaction = self.personality.react_to_negative_data(r.name, r.change_24h)
+
+        out = []
+        out.append(f"⛏️  **{r.name} ({r.symbol})** - Let's dig in!")
+        out.append("")
+        out.append(f"💰 **Price**: {format_currency(r.price)} | 24h: {r.change_24h:+.2f}%")
+        out.append(f"   {price_reaction}")
+        out.append("")
+        out.append(f"📊 **Market Cap**: {format_currency(r.market_cap)}")
+        out.append(f"📈 **24h Volume**: {format_currency(r.volume)}")
+        out.append("")
+        out.append(f"🌱 **Sustainability**: {r.sustainability*100:.0f}%")
+        out.append(f"   {self.personality.get_sustainability_praise(r.sustainability)}")
+        out.append("")
+        out.append(f"⚡ **Risk Score**: {r.risk:.2f}/1.0")
+        out.append(f"   {self.personality.get_risk_comment(r.risk)}")
+        if r.volatility is not None:
+            beta = f" | Beta vs BTC: {r.beta:.2f}" if r.beta is not None else ""
+            out.append(f"🎢 **Volatility**: {r.volatility:.2f}%/day | Max drawdown: {r.max_drawdown:.0%}{beta}")
+
+        if r.description:
+            short = (r.description[:300] + '...') if len(r.description) > 300 else r.description
+            out.append("")
+            out.append(f"📖 **Description**: {short}")
+
+        out.append("")
+        out.append("⚠️  **Remember**: Not financial advice! DYOR! 📚")
+
+        return "\n".join(out)
+
+    def comparison(self, c: Comparison) -> str:
+        a, b = c.a, c.b
+        p = self.personality
+
+        # Determine winner with personality
+        if c.winner == a.id:
+            winner = f"🏆 {a.name} looking more based overall! 🌟"
+        elif c.winner == b.id:
+            winner = f"🏆 {b.name} might be the play! 🎯"
+        else:
+            winner = "🤷 It's a tough call! Both have their strengths! ⚖️"
+
+        lines = [f"🔎 **Battle of the Coins**: {a.name} vs {b.name}"]
+        lines.append("")
+        lines.append(f"💰 **Price Fight**:")
+        lines.append(f"   {a.symbol}: {format_currency(a.price)} ({a.change_24h:+.2f}%)")
+        lines.append(f"   {b.symbol}: {format_currency(b.price)} ({b.change_24h:+.2f}%)")
+        lines.append("")
+        lines.append(f"📊 **Market Power**:")
+        lines.append(f"   {a.symbol}: {format_currency(a.market_cap)}")
+        lines.append(f"   {b.symbol}: {format_currency(b.market_cap)}")
+        lines.append("")
+        lines.append(f"🌱 **Eco Battle**:")
+        lines.append(f"   {a.symbol}: {a.sustainability*100:.0f}% - {p.get_sustainability_praise(a.sustainability)}")
+        lines.append(f"   {b.symbol}: {b.sustainability*100:.0f}% - {p.get_sustainability_praise(b.sustainability)}")
+        lines.append("")
+        lines.append(f"⚡ **Risk Check**:")
+        lines.append(f"   {a.symbol}: {a.risk:.2f} - {p.get_risk_comment(a.risk)}")
+        lines.append(f"   {b.symbol}: {b.risk:.2f} - {p.get_risk_comment(b.risk)}")
+        if a.volatility is not None or b.volatility is not None:
+            lines.append("")
+            lines.append(f"🎢 **Rollercoaster Check**:")
+            for r in (a, b):
+                if r.volatility is None:
+                    lines.append(f"   {r.symbol}: no price history yet 🤷")
+                else:
+                    lines.append(f"   {r.symbol}: {r.volatility:.2f}%/day, max drawdown {r.max_drawdown:.0%}")
+        lines.append("")
+        lines.append(winner)
+        lines.append("")
+        lines.append("🎯 **Remember**: This ain't financial advice! Do your own research! 📚")
+
+        return "\n".join(lines)
+
+    def rankings(self, results: List[CoinScore]) -> str:
+        if not results:
+            return "😅 Well this is awkward... couldn't fetch data for any of those coins! 📡"
+
+        # Build response with personality
+        lines = [f"🏆 **Crypto Rankings** - From based to rekt potential:"]
+        lines.append("")
+
+        for i, r in enumerate(results, 1):
+            medal = ""
+            if i == 1:
+                medal = "🥇 "
+            elif i == 2:
+                medal = "🥈 "
+            elif i == 3:
+                medal = "🥉 "
+
+            trend = "🚀" if r.change_24h > 5 else "📈" if r.change_24h > 0 else "📉" if r.change_24h < 0 else "➡️"
+            risk_emoji = "🟢" if r.risk <= 0.3 else "🟡" if r.risk <= 0.6 else "🔴"
+            sustain_emoji = "🌍" if r.sustainability >= 0.8 else "🌱" if r.sustainability >= 0.6 else "⚡"
+
+            lines.append(f"{medal}{i}. **{r.symbol}** - {r.name}")
+            lines.append(f"   Score: {r.combined_score:.3f} | Price: {format_currency(r.price)} {trend}")
+            lines.append(f"   Risk: {risk_emoji} {r.risk:.2f} | Sustain: {sustain_emoji} {r.sustainability:.2f}")
+            if r.volatility is not None:
+                lines.append(f"   Volatility: 🎢 {r.volatility:.2f}%/day | Max drawdown: {r.max_drawdown:.0%}")
+            lines.append("")
+
+        lines.append("💎 **Pro tip**: High sustainability + low risk = Probably won't get rekt! 😎")
+        lines.append("⚠️  **Disclaimer**: This is for fun! Always DYOR! 📚")
+
+        return "\n".join(lines)
+
+    def portfolio(self, v: PortfolioValuation) -> str:
+        if not v.positions and not v.missing:
+            return "💼 Portfolio is empty! Try 'buy btc 0.1' to get started, fren! 🎯"
+
+        mood = "🤑" if v.pnl_pct > 20 else "😊" if v.pnl > 0 else "😐" if v.pnl == 0 else "😟" if v.pnl_pct > -20 else "😭"
+        lines = [f"💼 **Your Bags** - {format_currency(v.value)} {mood}", ""]
+        for p in v.positions:
+            trend = "🚀" if p.pnl_pct > 10 else "📈" if p.pnl > 0 else "📉" if p.pnl < 0 else "➡️"
+            lines.append(f"{trend} **{p.name}**: {p.amount:g} @ {format_currency(p.price)} = {format_currency(p.value)} "
+                         f"({p.weight:.1%} of bags)")
+            lines.append(f"   P&L: {p.pnl:+,.2f} USD ({p.pnl_pct:+.1f}%) | 24h: {p.change_24h:+.2f}%")
+        for cid in v.missing:
+            lines.append(f"❌ {cid}: no fresh price right now! API might be napping 😴")
+        lines.append("")
+        lines.append(f"💰 **Total P&L**: {v.pnl:+,.2f} USD ({v.pnl_pct:+.1f}%) on {format_currency(v.cost)} invested")
+        lines.append(f"⏱️  **Last 24h**: {v.change_24h:+,.2f} USD")
+        lines.append("")
+        lines.append("💭 **Remember**: It's not a loss until you sell... but it's also not a gain! 🧠")
+        return "\n".join(lines)
+
+    def correlations(self, c: Correlations) -> str:
+        lines = ["🔗 **Who Moves Together** - daily return correlations:", ""]
+        for i, a in enumerate(c.ids):
+            for j in range(i + 1, len(c.ids)):
+                v = c.matrix[i][j]
+                if v is None:
+                    lines.append(f"   {a} ↔ {c.ids[j]}: not enough history 🤷")
+                    continue
+                vibe = "👯 twins" if v >= 0.8 else "🤝 buddies" if v >= 0.5 else "🙃 loners" if v < 0.2 else "😐 meh"
+                lines.append(f"   {a} ↔ {c.ids[j]}: {v:+.2f} {vibe}")
+        lines.append("")
+        lines.append(f"🎢 **Rollercoaster Stats** ({c.metrics[0].observations} days):")
+        for m in c.metrics:
+            beta = f" | Beta: {m.beta:.2f}" if m.beta is not None else ""
+            lines.append(f"   {m.id}: {m.volatility:.2f}%/day | Drawdown: {m.drawdown:.0%} (max {m.max_drawdown:.0%}){beta}")
+        lines.append("")
+        lines.append("💎 **Pro tip**: Coins that all move together aren't diversification, fren! 🧺")
+        return "\n".join(lines)
+
+    def watchlist(self, entries: Dict[str, Optional[Quote]]) -> str:
+        if not entries:
+            return "📝 Watchlist is empty! Add some coins to watch, fren! 🎯"
+
+        lines = ["📌 **Your Watchlist** - Coins you're probably emotionally attached to:"]
+        lines.append("")
+
+        for cid, q in entries.items():
+            if q is None:
+                lines.append(f"❌ {cid}: API said no! Maybe it's sleeping? 😴")
+                continue
+
+            change = q.change_24h
+            # Add emotional commentary based on performance
+            emotion = "😊" if change > 5 else "🙂" if change > 0 else "😐" if change > -5 else "😟"
+            trend = "🚀" if change > 10 else "📈" if change > 0 else "📉" if change < 0 else "➡️"
+
+            lines.append(f"{emotion} **{q.name}** ({q.symbol}): {format_currency(q.price)} {trend} ({change:+.2f}%)")
+
+        lines.append("")
+        lines.append("💭 **Remember**: Don't fall in love with your bags! Stay rational! 🧠")
+
+        return "\n".join(lines)
+
+    def prices(self, quotes: Dict[str, Optional[Quote]]) -> str:
+        lines = []
+        for key, q in quotes.items():
+            if q is None:
+                lines.append(f"❌ {key}: Couldn't find that one in the crypto verse! 🤔")
+                continue
+            trend = "📈" if q.change_24h > 0 else "📉" if q.change_24h < 0 else "➡️"
+            lines.append(f"💰 **{q.symbol or q.id}**: {format_currency(q.price)} {trend} ({q.change_24h:+.2f}%)")
+        return "\n".join(lines)
+
+
+RENDER_FORMATS = ("personality", "plain", "json", "csv")
+
+
+def render_result(view: str, result: Any, fmt: str = "personality",
+                  personality: Optional[CryptoPersonality] = None) -> str:
+    """Render a view ('summary', 'comparison', 'rankings', 'watchlist', 'prices', 'correlations', 'portfolio') in ``fmt``."""
+    with metrics.span("render"):
+        if fmt == "json":
+            return render_json(result)
+        if fmt == "csv":
+            return render_csv(result)
+        if fmt == "plain":
+            return getattr(PlainRenderer(), view)(result)
+        return getattr(PersonalityRenderer(personality), view)(result)
+
+
+# -----------------------------
+# Price alerts
+# -----------------------------
+
+class AlertRule(NamedTuple):
+    rule_id: int
+    coin_id: str
+    threshold: float
+    direction: str  # 'above' or 'below'
+    label: str = ""  # what the user typed, for display
+
+
+class AlertEvent(NamedTuple):
+    rule: AlertRule
+    price: float
+    previous: Optional[float]  # None on the first observation of the coin
+    timestamp: float
+
+
+AlertSink = Callable[[AlertEvent], None]
+
+
+def log_alert_sink(event: AlertEvent):
+    rule = event.rule
+    logger.info("ALERT %s %s %s: price %s", rule.coin_id, rule.direction, rule.threshold, event.price)
+
+
+class JsonLinesAlertSink:
+    """Append each alert event as one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, event: AlertEvent):
+        record = dict(event.rule._asdict(), price=event.price, previous=event.previous,
+                      timestamp=event.timestamp)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+class AlertEngine:
+    """Edge-triggered price alerts fed by one batched price request per tick.
+
+    Rules are indexed per coin and direction in sorted threshold lists, so a
+    tick evaluates each coin with two bisects plus the rules that actually
+    fire. A rule fires when the price crosses its threshold between two
+    ticks (or is already past it on the first tick), not on every tick the
+    condition holds. Events go to every sink; a failing sink is logged.
+    """
+
+    def __init__(self, client: DataClient, sinks: Optional[List[AlertSink]] = None, price_ttl: int = 10):
+        self.client = client
+        self.sinks: List[AlertSink] = list(sinks or [])
+        self.price_ttl = price_ttl  # max age of a price reused from cache
+        self._rules: Dict[int, AlertRule] = {}
+        # coin -> (sorted thresholds, rules in the same order)
+        self._above: Dict[str, Tuple[List[float], List[AlertRule]]] = {}
+        self._below: Dict[str, Tuple[List[float], List[AlertRule]]] = {}
+        self._last_price: Dict[str, float] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def add_rule(self, coin_id: str, threshold: float, direction: str, label: str = "") -> AlertRule:
+        if direction not in ("above", "below"):
+            raise ValueError(f"direction must be 'above' or 'below', not {direction!r}")
+        with self._lock:
+            rule = AlertRule(self._next_id, coin_id, float(threshold), direction, label or coin_id)
+            self._next_id += 1
+            self._rules[rule.rule_id] = rule
+            book = self._above if direction == "above" else self._below
+            thresholds, rules = book.setdefault(coin_id, ([], []))
+            i = bisect.bisect_right(thresholds, rule.threshold)
+            thresholds.insert(i, rule.threshold)
+            rules.insert(i, rule)
+            return rule
+
+    def remove_rule(self, rule_id: int) -> bool:
+        with self._lock:
+            rule = self._rules.pop(rule_id, None)
+            if rule is None:
+                return False
+            book = self._above if rule.direction == "above" else self._below
+            thresholds, rules = book[rule.coin_id]
+            i = bisect.bisect_left(thresholds, rule.threshold)
+            while rules[i].rule_id != rule_id:
+                i += 1
+            del thresholds[i]
+            del rules[i]
+            if not rules:
+                del book[rule.coin_id]
+                if rule.coin_id not in self._above and rule.coin_id not in self._below:
+                    self._last_price.pop(rule.coin_id, None)
+            return True
+
+    def rules(self) -> List[AlertRule]:
+        return list(self._rules.values())
+
+    def watched_ids(self) -> List[str]:
+        return sorted(set(self._above) | set(self._below))
+
+    def tick(self) -> List[AlertEvent]:
+        """Fetch current prices for all watched coins in one batch and evaluate."""
+        ids = self.watched_ids()
+        if not ids:
+            return []
+        return self.evaluate(self._usd_prices(self.client.simple_prices(ids, ttl=self.price_ttl)))
+
+    async def tick_async(self, aclient: "AsyncDataClient") -> List[AlertEvent]:
+        ids = self.watched_ids()
+        if not ids:
+            return []
+        return self.evaluate(self._usd_prices(await aclient.simple_prices(ids, ttl=self.price_ttl)))
+
+    @staticmethod
+    def _usd_prices(payload: Dict[str, dict]) -> Dict[str, float]:
+        return {cid: safe_float(v.get("usd")) for cid, v in payload.items()
+                if isinstance(v, dict) and v.get("usd") is not None}
+
+    def evaluate(self, prices: Dict[str, float], now: Optional[float] = None) -> List[AlertEvent]:
+        """Fire rules crossed by moving from the last seen price to ``prices``."""
+        now = now if now is not None else time.time()
+        events: List[AlertEvent] = []
+        with self._lock:
+            for cid, price in prices.items():
+                prev = self._last_price.get(cid)
+                self._last_price[cid] = price
+                above = self._above.get(cid)
+                if above and (prev is None or price > prev):
+                    thresholds, rules = above
+                    lo = 0 if prev is None else bisect.bisect_right(thresholds, prev)
+                    hi = bisect.bisect_right(thresholds, price)  # threshold in (prev, price]
+                    events.extend(AlertEvent(r, price, prev, now) for r in rules[lo:hi])
+                below = self._below.get(cid)
+                if below and (prev is None or price < prev):
+                    thresholds, rules = below
+                    lo = bisect.bisect_left(thresholds, price)  # threshold in [price, prev)
+                    hi = len(thresholds) if prev is None else bisect.bisect_left(thresholds, prev)
+                    events.extend(AlertEvent(r, price, prev, now) for r in rules[lo:hi])
+        for event in events:
+            for sink in self.sinks:
+                try:
+                    sink(event)
+                except Exception as e:
+                    logger.warning("Alert sink %r failed: %s", sink, e)
+        return events
+
+
+# -----------------------------
+# Portfolio
+# -----------------------------
+
+class Portfolio:
+    """Holdings with an average-cost basis, valued from one batched price request per tick.
+
+    Holdings live in a dict loaded on first use and written through to
+    SQLite (nothing is persisted with ``path=None``). Revaluation is
+    incremental: a position's value, P&L and 24h move are recomputed only
+    when its price or holding changed since the previous tick, and the
+    totals are adjusted by the difference, so a tick where few prices moved
+    does little more than compare each quote with the last one. Totals are
+    re-summed every RESYNC ticks to shed float error.
+    """
+
+    RESYNC = 1024
+
+    def __init__(self, path: Optional[str] = None, client: Optional[DataClient] = None, price_ttl: int = 10):
+        self.path = path
+        self.client = client
+        self.price_ttl = price_ttl  # max age of a price reused from cache
+        self._holdings: Optional[Dict[str, Holding]] = None
+        self._conn: Optional["sqlite3.Connection"] = None
+        self._lock = threading.RLock()
+        self._marks: Dict[str, Tuple[float, float]] = {}  # coin -> (price, 24h change %) last valued at
+        self._quotes: Dict[str, dict] = {}  # coin -> quote object last seen (cached payloads repeat them)
+        self._values: Dict[str, Tuple[float, float, float, float]] = {}  # coin -> (value, cost, 24h USD change, amount)
+        self._dirty: set = set()  # holdings changed since they were last valued
+        self._missing: List[str] = []
+        self._totals = [0.0, 0.0, 0.0]
+        self._ticks = 0
+        self._repriced = 0
+
+    def _rows(self) -> Dict[str, Holding]:
+        if self._holdings is None:
+            with self._lock:
+                if self._holdings is None:
+                    self._holdings = self._load()
+        return self._holdings
+
+    def _load(self) -> Dict[str, Holding]:
+        if not self.path:
+            return {}
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS holdings ("
+                " coin_id TEXT PRIMARY KEY, amount REAL NOT NULL, cost REAL NOT NULL)"
+            )
+            self._conn = conn
+            return {cid: Holding(cid, amount, cost)
+                    for cid, amount, cost in conn.execute("SELECT coin_id, amount, cost FROM holdings")}
+        except sqlite3.Error as e:
+            logger.warning("Portfolio unavailable at %s: %s", self.path, e)
+            return {}
+
+    def __len__(self) -> int:
+        return len(self._rows())
+
+    def __contains__(self, coin_id: str) -> bool:
+        return coin_id in self._rows()
+
+    def get(self, coin_id: str) -> Optional[Holding]:
+        return self._rows().get(coin_id)
+
+    def holdings(self) -> List[Holding]:
+        return sorted(self._rows().values())
+
+    def add(self, coin_id: str, amount: float, price: float) -> Holding:
+        """Buy ``amount`` at ``price`` USD each; returns the updated holding."""
+        if not amount > 0 or not price >= 0:
+            raise ValueError("amount must be positive and price non-negative")
+        with self._lock:
+            old = self._rows().get(coin_id) or Holding(coin_id, 0.0, 0.0)
+            holding = Holding(coin_id, old.amount + amount, old.cost + amount * price)
+            self._store(holding)
+            return holding
+
+    def remove(self, coin_id: str, amount: Optional[float] = None,
+               price: Optional[float] = None) -> Tuple[Optional[Holding], float]:
+        """Sell ``amount`` (everything if None or more than held).
+
+        Returns the remaining holding (None once closed) and the realized
+        P&L at ``price``; without a price it falls back to the last valued
+        one, or reports 0.
+        """
+        with self._lock:
+            old = self._rows().get(coin_id)
+            if old is None:
+                raise KeyError(coin_id)
+            sold = old.amount if amount is None or amount >= old.amount else amount
+            if not sold > 0:
+                raise ValueError("amount must be positive")
+            basis = old.cost * sold / old.amount if old.amount else 0.0
+            if price is None:
+                price = self._marks.get(coin_id, (None, 0.0))[0]
+            realized = sold * price - basis if price is not None else 0.0
+            holding = Holding(coin_id, old.amount - sold, old.cost - basis) if sold < old.amount else None
+            self._store(holding, coin_id)
+            return holding, realized
+
+    def _store(self, holding: Optional[Holding], coin_id: Optional[str] = None):
+        coin_id = holding.coin_id if holding is not None else coin_id
+        rows = self._rows()
+        if holding is None:
+            rows.pop(coin_id, None)
+            self._marks.pop(coin_id, None)
+            self._quotes.pop(coin_id, None)
+            value, cost, day, _ = self._values.pop(coin_id, (0.0, 0.0, 0.0, 0.0))
+            self._totals = [self._totals[0] - value, self._totals[1] - cost, self._totals[2] - day]
+            self._dirty.discard(coin_id)
+        else:
+            rows[coin_id] = holding
+            self._dirty.add(coin_id)
+        if self._conn is None:
+            return
+        try:
+            if holding is None:
+                self._conn.execute("DELETE FROM holdings WHERE coin_id = ?", (coin_id,))
+            else:
+                self._conn.execute("INSERT OR REPLACE INTO holdings (coin_id, amount, cost) VALUES (?, ?, ?)",
+                                   (holding.coin_id, holding.amount, holding.cost))
+        except sqlite3.Error as e:
+            logger.warning("Portfolio write failed for %s: %s", coin_id, e)
+
+    def tick(self, names: Optional[Callable[[str], str]] = None) -> PortfolioValuation:
+        """Fetch prices for every holding in one batch, revalue and report."""
+        ids = list(self._rows())
+        payload = self.client.simple_prices(ids, ttl=self.price_ttl) if ids and self.client is not None else {}
+        self.revalue(payload)
+        return self.valuation(names)
+
+    async def tick_async(self, aclient: "AsyncDataClient",
+                         names: Optional[Callable[[str], str]] = None) -> PortfolioValuation:
+        ids = list(self._rows())
+        self.revalue(await aclient.simple_prices(ids, ttl=self.price_ttl) if ids else {})
+        return self.valuation(names)
+
+    def revalue(self, payload: Dict[str, dict]) -> int:
+        """Apply a /simple/price payload; returns how many positions were recomputed."""
+        with self._lock:
+            marks, values, dirty, quotes = self._marks, self._values, self._dirty, self._quotes
+            total_value, total_cost, total_day = self._totals
+            missing = []
+            repriced = 0
+            for cid, holding in self._rows().items():
+                quote = payload.get(cid)
+                if quote is not None and quote is quotes.get(cid) and cid not in dirty:
+                    continue
+                if isinstance(quote, dict) and quote.get("usd") is not None:
+                    quotes[cid] = quote
+                    mark = (safe_float(quote.get("usd")), safe_float(quote.get("usd_24h_change")))
+                else:
+                    missing.append(cid)
+                    mark = marks.get(cid)
+                    if mark is None:
+                        continue
+                if cid not in dirty and marks.get(cid) == mark:
+                    continue
+                marks[cid] = mark
+                price, change = mark
+                value = holding.amount * price
+                day = value - value / (1 + change / 100) if change > -100 else 0.0
+                old_value, old_cost, old_day, _ = values.get(cid, (0.0, 0.0, 0.0, 0.0))
+                values[cid] = (value, holding.cost, day, holding.amount)
+                total_value += value - old_value
+                total_cost += holding.cost - old_cost
+                total_day += day - old_day
+                repriced += 1
+            dirty.clear()
+            self._missing = missing
+            self._repriced = repriced
+            self._ticks += 1
+            if self._ticks % self.RESYNC == 0:
+                total_value = math.fsum(v[0] for v in values.values())
+                total_cost = math.fsum(v[1] for v in values.values())
+                total_day = math.fsum(v[2] for v in values.values())
+            self._totals = [total_value, total_cost, total_day]
+            return repriced
+
+    def valuation(self, names: Optional[Callable[[str], str]] = None) -> PortfolioValuation:
+        """Positions with P&L and weights as of the last revalue."""
+        with self._lock:
+            value, cost, day = self._totals
+            positions = []
+            for cid, (pos_value, pos_cost, _, amount) in self._values.items():
+                price, change = self._marks[cid]
+                pnl = pos_value - pos_cost
+                positions.append(Position(cid, names(cid) if names else cid, amount, price, pos_value,
+                                          pos_cost, pnl, pnl / pos_cost * 100 if pos_cost else 0.0,
+                                          pos_value / value if value > 0 else 0.0, change))
+            positions.sort(key=lambda p: p.value, reverse=True)
+            return PortfolioValuation(positions, value, cost, value - cost, (value - cost) / cost * 100 if cost else 0.0,
+                                      day, list(self._missing), self._repriced)
+
+
 # -----------------------------
 # Main Advisor class
 # -----------------------------
 
+class AdvisorError(Exception):
+    """A query the advisor can't answer. ``message`` is user-facing, ``status`` the matching HTTP code."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
 class CryptoAdvisor:
     """Main facade for providing recommendations and utilities.
 
@@ -432,15 +3680,77 @@ class CryptoAdvisor:
     - Provide comparison, ranking, portfolio reports
     """
 
-    def __init__(self, client: Optional[DataClient] = None):
+    # Well-known ids and symbols resolve without loading the coin registry
+    KNOWN_COINS = {
+        "bitcoin": "bitcoin", "btc": "bitcoin",
+        "ethereum": "ethereum", "eth": "ethereum",
+        "cardano": "cardano", "ada": "cardano",
+        "solana": "solana", "sol": "solana",
+        "polkadot": "polkadot", "dot": "polkadot",
+        "stellar": "stellar", "xlm": "stellar",
+        "ripple": "ripple", "xrp": "ripple",
+        "dogecoin": "dogecoin", "doge": "dogecoin",
+        "litecoin": "litecoin", "ltc": "litecoin",
+        "chainlink": "chainlink", "link": "chainlink",
+        "tether": "tether", "usdt": "tether",
+        "usd-coin": "usd-coin", "usdc": "usd-coin",
+        "binancecoin": "binancecoin", "bnb": "binancecoin",
+        "tron": "tron", "trx": "tron",
+    }
+
+    # Beta and correlation in risk metrics are measured against this coin
+    RISK_BENCHMARK = "bitcoin"
+    MAX_RISK_ENGINES = 256
+
+    def __init__(self, client: Optional[DataClient] = None, registry_snapshot: Optional[str] = None,
+                 sustainability_cache: Optional[SustainabilityCache] = None,
+                 history: Optional[PriceHistoryStore] = None, portfolio: Optional[Portfolio] = None):
         self.client = client or DataClient()
-        self.registry = CoinRegistry(self.client)
+        self.registry_snapshot = registry_snapshot
+        self._registry: Optional[CoinRegistry] = None  # loaded on first non-trivial resolve
+        self._registry_lock = threading.Lock()
+        self._market_caps: Dict[str, float] = {}  # shared with the registry for ranking matches
         self.personality = CryptoPersonality()
+        self.renderer = PersonalityRenderer(self.personality)
         self.watchlist: List[str] = []  # store coin ids
-        self.portfolio: Dict[str, float] = {}  # coin_id -> holdings (in coin units)
+        self.portfolio = portfolio if portfolio is not None else Portfolio(None, self.client)
+        if self.portfolio.client is None:
+            self.portfolio.client = self.client
+        self.history = history if history is not None else PriceHistoryStore(None, self.client)
+        # Days of daily closes behind volatility in risk scores; None scores risk from the 24h change
+        self.risk_window: Optional[int] = None
+        self._risk_engines: "OrderedDict[Tuple[Tuple[str, ...], int], RollingRisk]" = OrderedDict()
+        self._risk_lock = threading.Lock()
+        self._sustainability = sustainability_cache if sustainability_cache is not None else SustainabilityCache()
+        self._scored_inputs: Dict[str, Tuple[Tuple[str, str], float]] = {}  # coin id -> (inputs, score) this run
+        self._unscored: Dict[str, None] = {}  # coin ids given the neutral score, in the order they were seen
+        self._unscored_lock = threading.Lock()
+        self._fill_thread: Optional[threading.Thread] = None
+        self._async_client: Optional[AsyncDataClient] = None
+
+    @property
+    def async_client(self) -> AsyncDataClient:
+        """Async client sharing this advisor's DataClient caches (created on first use)."""
+        if self._async_client is None:
+            self._async_client = AsyncDataClient(self.client)
+        return self._async_client
+
+    @property
+    def registry(self) -> CoinRegistry:
+        """Coin registry, loaded (snapshot or /coins/list) the first time it is needed."""
+        if self._registry is None:
+            with self._registry_lock:
+                if self._registry is None:
+                    self._registry = CoinRegistry(self.client, snapshot_path=self.registry_snapshot,
+                                                  market_caps=self._market_caps)
+        return self._registry
 
     def resolve(self, symbol_or_id: str) -> Optional[str]:
-        return self.registry.find_id(symbol_or_id)
+        known = self.KNOWN_COINS.get(symbol_or_id.strip().lower())
+        if known is not None:
+            return known
+        with metrics.span("resolve"):
+            return self.registry.find_id(symbol_or_id)
 
     def fetch_market(self, coin_id: str) -> Optional[dict]:
         try:
@@ -449,187 +3759,307 @@ class CryptoAdvisor:
             logger.warning("Failed to fetch market for %s: %s", coin_id, e)
             return None
 
-    def summarize_coin(self, query: str) -> str:
+    def fetch_markets(self, coin_ids: List[str]) -> Dict[str, dict]:
+        """Batched market records keyed by coin id (missing ids are omitted)."""
+        if not coin_ids:
+            return {}
+        try:
+            records = self.client.coins_markets(coin_ids)
+        except Exception as e:
+            logger.warning("Failed to fetch markets for %d coins: %s", len(coin_ids), e)
+            return {}
+        return self._index_markets(records)
+
+    def _index_markets(self, records: List[Dict[str, Any]]) -> Dict[str, dict]:
+        markets = {r["id"]: r for r in records if r.get("id")}
+        # Market caps let the registry rank ambiguous symbol/name matches
+        self._market_caps.update({cid: market_fields(r)["market_cap"] for cid, r in markets.items()})
+        return markets
+
+    async def fetch_market_async(self, coin_id: str) -> Optional[dict]:
+        try:
+            return await self.async_client.coin_market(coin_id)
+        except Exception as e:
+            logger.warning("Failed to fetch market for %s: %s", coin_id, e)
+            return None
+
+    async def fetch_markets_async(self, coin_ids: List[str]) -> Dict[str, dict]:
+        if not coin_ids:
+            return {}
+        try:
+            records = await self.async_client.coins_markets(coin_ids)
+        except Exception as e:
+            logger.warning("Failed to fetch markets for %d coins: %s", len(coin_ids), e)
+            return {}
+        return self._index_markets(records)
+
+    def sustainability(self, coin_id: str, data: Optional[dict] = None) -> float:
+        """Heuristic sustainability for a coin, cached per coin id.
+
+        A full coin document is only re-scored when its description or
+        hashing algorithm changed since the cached score. Lean
+        /coins/markets records carry neither, so they use the cached score;
+        a coin never scored gets the heuristic's neutral 0.5 and is queued
+        for fill_sustainability rather than costing a request here.
+        """
+        if not has_sustainability_inputs(data):
+            cached = self._sustainability.score(coin_id)
+            if cached is not None:
+                return cached
+            with self._unscored_lock:
+                self._unscored[coin_id] = None
+            return heuristic_sustainability(None)
+        # Cached documents hand back the same string objects, so this
+        # comparison is an identity check rather than a re-hash
+        inputs = sustainability_inputs(data)
+        seen = self._scored_inputs.get(coin_id)
+        if seen is not None and seen[0] == inputs:
+            return seen[1]
+        digest = sustainability_digest(data)
+        entry = self._sustainability.lookup(coin_id)
+        if entry is not None and entry[0] == digest:
+            score = entry[1]
+        else:
+            score = heuristic_sustainability(data)
+            self._sustainability.put(coin_id, digest, score)
+        self._scored_inputs[coin_id] = (inputs, score)
+        return score
+
+    def precompute_sustainability(self, coin_ids: List[str], refresh: bool = False) -> int:
+        """Score coins ahead of time (one document fetch each); returns how many were fetched.
+
+        Coins that already have a score are skipped unless ``refresh``.
+        """
+        fetched = 0
+        for cid in dict.fromkeys(coin_ids):
+            if not refresh and cid in self._sustainability:
+                continue
+            data = self.fetch_market(cid)
+            if data is not None:
+                self.sustainability(cid, data)
+                fetched += 1
+        return fetched
+
+    def fill_sustainability(self, limit: Optional[int] = None) -> int:
+        """Score queued coins that were ranked with the neutral default; returns how many were fetched."""
+        with self._unscored_lock:
+            coin_ids = list(self._unscored)[:limit]
+            for cid in coin_ids:
+                del self._unscored[cid]
+        return self.precompute_sustainability(coin_ids)
+
+    def fill_sustainability_in_background(self) -> bool:
+        """Start a daemon fill_sustainability unless one is already running or nothing is queued."""
+        with self._unscored_lock:
+            if not self._unscored or (self._fill_thread is not None and self._fill_thread.is_alive()):
+                return False
+
+            def run():
+                try:
+                    while self.fill_sustainability(limit=50):
+                        pass
+                except Exception as e:
+                    logger.warning("Background sustainability fill failed: %s", e)
+
+            self._fill_thread = threading.Thread(target=run, name="cryptobuddy-sustainability", daemon=True)
+            self._fill_thread.start()
+            return True
+
+    def _resolve_all(self, queries: List[str]) -> List[str]:
+        resolved = []
+        for q in queries:
+            cid = self.resolve(q)
+            if cid and cid not in resolved:
+                resolved.append(cid)
+        return resolved
+
+    def coin_report(self, query: str) -> CoinScore:
+        """Scored record behind summarize_coin; raises AdvisorError."""
         cid = self.resolve(query)
         if not cid:
-            return f"❌ Oops! Couldn't find '{query}' in the crypto verse! Maybe it's a shitcoin? 🤔"
-        
+            raise AdvisorError(f"❌ Oops! Couldn't find '{query}' in the crypto verse! Maybe it's a shitcoin? 🤔", 404)
+        return self._coin_score(cid)
+
+    def _coin_score(self, cid: str) -> CoinScore:
+        """coin_report for an already resolved id."""
         data = self.fetch_market(cid)
         if not data:
-            return f"😅 Yikes! Couldn't fetch data for {cid}. Maybe check your connection?"
+            raise AdvisorError(f"😅 Yikes! Couldn't fetch data for {cid}. Maybe check your connection?", 502)
 
-        md = data.get("market_data", {})
-        price = safe_float(md.get("current_price", {}).get("usd", 0))
-        change_24h = safe_float(md.get("price_change_percentage_24h", 0))
-        mcap = safe_float(md.get("market_cap", {}).get("usd", 0))
-        vol = safe_float(md.get("total_volume", {}).get("usd", 0))
-        sustain = heuristic_sustainability(data)
-        risk = compute_risk_score(data)
+        description = (data.get("description") or {}).get("en", "").strip()
+        history = self.risk_metrics([cid]).get(cid) if self.risk_window else None
+        with metrics.span("score"):
+            return score_coin(cid, data, self.sustainability(cid, data), description, history)
 
-        # Personality reactions
-        price_reaction = ""
-        if change_24h > 0:
-            price_reaction = self.personality.react_to_positive_data(data.get('name', cid), change_24h)
-        elif change_24h < 0:
-            price_reaction = self.personality.react_to_negative_data(data.get('name', cid), change_24h)
+    def summarize_coin(self, query: str) -> str:
+        try:
+            report = self.coin_report(query)
+        except AdvisorError as e:
+            return e.message
+        with metrics.span("render"):
+            return self.renderer.summary(report)
 
-        out = []
-        out.append(f"⛏️  **{data.get('name', cid)} ({data.get('symbol','').upper()})** - Let's dig in!")
-        out.append("")
-        out.append(f"💰 **Price**: {format_currency(price)} | 24h: {change_24h:+.2f}%")
-        out.append(f"   {price_reaction}")
-        out.append("")
-        out.append(f"📊 **Market Cap**: {format_currency(mcap)}")
-        out.append(f"📈 **24h Volume**: {format_currency(vol)}")
-        out.append("")
-        out.append(f"🌱 **Sustainability**: {sustain*100:.0f}%")
-        out.append(f"   {self.personality.get_sustainability_praise(sustain)}")
-        out.append("")
-        out.append(f"⚡ **Risk Score**: {risk:.2f}/1.0")
-        out.append(f"   {self.personality.get_risk_comment(risk)}")
-        
-        desc = data.get("description", {}).get("en", "").strip()
-        if desc:
-            short = (desc[:300] + '...') if len(desc) > 300 else desc
-            out.append("")
-            out.append(f"📖 **Description**: {short}")
-        
-        out.append("")
-        out.append("⚠️  **Remember**: Not financial advice! DYOR! 📚")
-        
-        return "\n".join(out)
+    def history_series(self, query: str, days: float = 365) -> Tuple[str, PriceSeries]:
+        """Daily closes for the last ``days``, synced into the history store first; raises AdvisorError."""
+        cid = self.resolve(query)
+        if not cid:
+            raise AdvisorError(f"❌ Oops! Couldn't find '{query}' in the crypto verse! Maybe it's a shitcoin? 🤔", 404)
+        try:
+            self.history.sync(cid, days)
+        except (RuntimeError, OSError, ValueError) as e:
+            logger.debug("History sync for %s failed: %s", cid, e)
+            if not self.history.series(cid).ts:
+                raise AdvisorError(f"😅 Yikes! Couldn't fetch price history for {cid}. Maybe check your connection?", 502)
+        end = time.time() // self.history.step * self.history.step
+        return cid, self.history.range(cid, end - days * 86400, end)
 
-    def compare(self, a: str, b: str) -> str:
-        ida = self.resolve(a)
-        idb = self.resolve(b)
-        if not ida or not idb:
-            return "❌ Couldn't resolve one or both coins, fren! Check those tickers! 🔍"
-
-        da = self.fetch_market(ida)
-        db = self.fetch_market(idb)
-        if not da or not db:
-            return "😅 Oops! Couldn't fetch data for one or both coins. API might be sleeping! 😴"
-
-        ma = da.get('market_data', {})
-        mb = db.get('market_data', {})
-        pa = safe_float(ma.get('current_price', {}).get('usd', 0))
-        pb = safe_float(mb.get('current_price', {}).get('usd', 0))
-        ca = safe_float(ma.get('price_change_percentage_24h', 0))
-        cb = safe_float(mb.get('price_change_percentage_24h', 0))
-        mca = safe_float(ma.get('market_cap', {}).get('usd', 0))
-        mcb = safe_float(mb.get('market_cap', {}).get('usd', 0))
-        sa = heuristic_sustainability(da)
-        sb = heuristic_sustainability(db)
-        ra = compute_risk_score(da)
-        rb = compute_risk_score(db)
+    def history_summary(self, query: str, days: float = 365) -> str:
+        try:
+            cid, series = self.history_series(query, days)
+        except AdvisorError as e:
+            return e.message
+        if not series.ts:
+            return f"🤷 No price history for {cid} in the last {days:g} days, fren."
+        prices = series.price
+        first, last = prices[0], prices[-1]
+        change = (last / first - 1) * 100 if first else 0.0
+        mood = "🚀" if change > 0 else "📉"
+        since = time.strftime("%Y-%m-%d", time.gmtime(series.ts[0]))
+        until = time.strftime("%Y-%m-%d", time.gmtime(series.ts[-1]))
+        return (f"📜 {cid} history ({len(prices)} days, {since} → {until})\n"
+                f"   Close: {format_currency(last)} | Low: {format_currency(min(prices))} | High: {format_currency(max(prices))}\n"
+                f"   {mood} Change: {change:+.2f}% since {since}")
+
+    def _risk_engine(self, coin_ids: Tuple[str, ...], window: int) -> RollingRisk:
+        """Rolling risk over the coins' aligned daily closes, brought up to date incrementally.
+
+        Engines are kept per coin set: later calls sync the history store
+        (no request within the same day) and push only the new closes.
+        """
+        for cid in coin_ids:
+            try:
+                self.history.sync(cid, window + 1)
+            except (RuntimeError, OSError, ValueError) as e:
+                logger.debug("History sync for %s failed: %s", cid, e)
+        key = (coin_ids, window)
+        with self._risk_lock:
+            engine = self._risk_engines.get(key)
+            if engine is None:
+                engine = RollingRisk(coin_ids, window, self.RISK_BENCHMARK)
+                self._risk_engines[key] = engine
+                if len(self._risk_engines) > self.MAX_RISK_ENGINES:
+                    self._risk_engines.popitem(last=False)
+            else:
+                self._risk_engines.move_to_end(key)
+            ts, rows = align_closes([self.history.series(cid) for cid in coin_ids], engine.last_ts)
+            if engine.last_ts is None:
+                ts, rows = ts[-(window + 1):], rows[-(window + 1):]
+            with metrics.span("risk"):
+                engine.extend(rows, ts)
+            return engine
+
+    def risk_metrics(self, coin_ids: List[str], window: Optional[int] = None) -> Dict[str, RiskMetrics]:
+        """History-based risk per coin (coins without two aligned closes are left out)."""
+        window = window or self.risk_window or DEFAULT_RISK_WINDOW
+        bench = self.RISK_BENCHMARK
+        out = {}
+        for cid in coin_ids:
+            engine = self._risk_engine((bench,) if cid == bench else (bench, cid), window)
+            if engine.observations >= 2:
+                out[cid] = engine.metrics(cid)
+        return out
+
+    def correlation_report(self, queries: List[str], window: Optional[int] = None) -> Correlations:
+        """Correlation matrix of daily returns, plus per-coin risk against the benchmark; raises AdvisorError."""
+        resolved = self._resolve_all(queries)
+        if len(resolved) < 2:
+            raise AdvisorError("🤔 Need at least two coins to correlate, fren! Try 'corr btc eth sol'", 400)
+        ids = tuple(resolved) if self.RISK_BENCHMARK in resolved else (self.RISK_BENCHMARK,) + tuple(resolved)
+        engine = self._risk_engine(ids, window or self.risk_window or DEFAULT_RISK_WINDOW)
+        if engine.observations < 2:
+            raise AdvisorError("😅 Not enough shared price history for those coins yet! 📉", 502)
+        return Correlations(engine.ids, engine.correlation_matrix(), [engine.metrics(cid) for cid in engine.ids])
 
-        # Determine winner with personality
-        winner = ""
-        if sa > sb and ra < rb:
-            winner = f"🏆 {da.get('name')} looking more based overall! 🌟"
-        elif sb > sa and rb < ra:
-            winner = f"🏆 {db.get('name')} might be the play! 🎯"
-        else:
-            winner = "🤷 It's a tough call! Both have their strengths! ⚖️"
+    def correlations(self, queries: List[str]) -> str:
+        try:
+            report = self.correlation_report(queries)
+        except AdvisorError as e:
+            return e.message
+        with metrics.span("render"):
+            return self.renderer.correlations(report)
 
-        lines = [f"🔎 **Battle of the Coins**: {da.get('name')} vs {db.get('name')}"]
-        lines.append("")
-        lines.append(f"💰 **Price Fight**:")
-        lines.append(f"   {da.get('symbol','').upper()}: {format_currency(pa)} ({ca:+.2f}%)")
-        lines.append(f"   {db.get('symbol','').upper()}: {format_currency(pb)} ({cb:+.2f}%)")
-        lines.append("")
-        lines.append(f"📊 **Market Power**:")
-        lines.append(f"   {da.get('symbol','').upper()}: {format_currency(mca)}")
-        lines.append(f"   {db.get('symbol','').upper()}: {format_currency(mcb)}")
-        lines.append("")
-        lines.append(f"🌱 **Eco Battle**:")
-        lines.append(f"   {da.get('symbol','').upper()}: {sa*100:.0f}% - {self.personality.get_sustainability_praise(sa)}")
-        lines.append(f"   {db.get('symbol','').upper()}: {sb*100:.0f}% - {self.personality.get_sustainability_praise(sb)}")
-        lines.append("")
-        lines.append(f"⚡ **Risk Check**:")
-        lines.append(f"   {da.get('symbol','').upper()}: {ra:.2f} - {self.personality.get_risk_comment(ra)}")
-        lines.append(f"   {db.get('symbol','').upper()}: {rb:.2f} - {self.personality.get_risk_comment(rb)}")
-        lines.append("")
-        lines.append(winner)
-        lines.append("")
-        lines.append("🎯 **Remember**: This ain't financial advice! Do your own research! 📚")
+    def compare_report(self, a: str, b: str) -> Comparison:
+        id_a, id_b = self.resolve(a), self.resolve(b)
+        if not id_a or not id_b:
+            raise AdvisorError("❌ Couldn't resolve one or both coins, fren! Check those tickers! 🔍", 404)
+        try:
+            return compare_scores(self._coin_score(id_a), self._coin_score(id_b))
+        except AdvisorError as e:
+            if e.status != 502:
+                raise
+            raise AdvisorError("😅 Oops! Couldn't fetch data for one or both coins. API might be sleeping! 😴", 502) from e
 
-        return "\n".join(lines)
+    def compare(self, a: str, b: str) -> str:
+        try:
+            report = self.compare_report(a, b)
+        except AdvisorError as e:
+            return e.message
+        with metrics.span("render"):
+            return self.renderer.comparison(report)
 
-    def rank_coins(self, queries: List[str]) -> str:
-        """Rank a list of coins with personality"""
+    def rank_report(self, queries: List[str], progress: bool = False, top: Optional[int] = None) -> List[CoinScore]:
+        """Scored records (the best ``top`` if given), best first, from one batched /coins/markets fetch."""
         if not queries:
-            return "🤔 You gotta give me some coins to rank, fren! Try 'rank btc eth ada'"
+            raise AdvisorError("🤔 You gotta give me some coins to rank, fren! Try 'rank btc eth ada'", 400)
 
-        resolved = []
-        for q in queries:
-            cid = self.resolve(q)
-            if cid:
-                resolved.append(cid)
-        
+        resolved = self._resolve_all(queries)
         if not resolved:
-            return "❌ Couldn't find any of those coins! Maybe they're too based for CoinGecko? 😅"
+            raise AdvisorError("❌ Couldn't find any of those coins! Maybe they're too based for CoinGecko? 😅", 404)
+        return self._score_coins(resolved, progress, top)
 
-        results = []
-        iterator = resolved
-        if TQDM_AVAILABLE:
-            iterator = tqdm(resolved, desc="🔄 Crunching numbers")
-        
-        for cid in iterator:
-            d = self.fetch_market(cid)
-            if not d:
-                continue
-            md = d.get('market_data', {})
-            price = safe_float(md.get('current_price', {}).get('usd', 0))
-            change = safe_float(md.get('price_change_percentage_24h', 0))
-            mcap = safe_float(md.get('market_cap', {}).get('usd', 0))
-            sustain = heuristic_sustainability(d)
-            risk = compute_risk_score(d)
-            # combined score: favor sustainability and positive momentum, penalize risk
-            combined = sustain * 0.4 + (max(-10, change) / 100.0) * 0.3 - risk * 0.3
-            results.append({
-                'id': cid,
-                'symbol': d.get('symbol','').upper(),
-                'name': d.get('name',''),
-                'price': price,
-                'change_24h': change,
-                'market_cap': mcap,
-                'sustainability': sustain,
-                'risk': risk,
-                'combined_score': combined,
-            })
+    async def rank_report_async(self, queries: List[str], top: Optional[int] = None) -> List[CoinScore]:
+        """rank_report with market pages fetched concurrently"""
+        if not queries:
+            raise AdvisorError("🤔 You gotta give me some coins to rank, fren! Try 'rank btc eth ada'", 400)
 
-        if not results:
-            return "😅 Well this is awkward... couldn't fetch data for any of those coins! 📡"
+        resolved = self._resolve_all(queries)
+        if not resolved:
+            raise AdvisorError("❌ Couldn't find any of those coins! Maybe they're too based for CoinGecko? 😅", 404)
+        return await self._score_coins_async(resolved, top)
 
-        results.sort(key=lambda x: x['combined_score'], reverse=True)
-        
-        # Build response with personality
-        lines = [f"🏆 **Crypto Rankings** - From based to rekt potential:"]
-        lines.append("")
-        
-        for i, r in enumerate(results[:10], 1):  # Top 10 only
-            medal = ""
-            if i == 1:
-                medal = "🥇 "
-            elif i == 2:
-                medal = "🥈 "
-            elif i == 3:
-                medal = "🥉 "
-            
-            trend = "🚀" if r['change_24h'] > 5 else "📈" if r['change_24h'] > 0 else "📉" if r['change_24h'] < 0 else "➡️"
-            risk_emoji = "🟢" if r['risk'] <= 0.3 else "🟡" if r['risk'] <= 0.6 else "🔴"
-            sustain_emoji = "🌍" if r['sustainability'] >= 0.8 else "🌱" if r['sustainability'] >= 0.6 else "⚡"
-            
-            lines.append(f"{medal}{i}. **{r['symbol']}** - {r['name']}")
-            lines.append(f"   Score: {r['combined_score']:.3f} | Price: {format_currency(r['price'])} {trend}")
-            lines.append(f"   Risk: {risk_emoji} {r['risk']:.2f} | Sustain: {sustain_emoji} {r['sustainability']:.2f}")
-            lines.append("")
+    def rank_coins(self, queries: List[str]) -> str:
+        """Rank a list of coins with personality"""
+        try:
+            results = self.rank_report(queries, progress=True, top=10)
+        except AdvisorError as e:
+            return e.message
+        with metrics.span("render"):
+            return self.renderer.rankings(results)
 
-        lines.append("💎 **Pro tip**: High sustainability + low risk = Probably won't get rekt! 😎")
-        lines.append("⚠️  **Disclaimer**: This is for fun! Always DYOR! 📚")
-        
-        return "\n".join(lines)
+    async def rank_coins_async(self, queries: List[str]) -> str:
+        try:
+            results = await self.rank_report_async(queries, top=10)
+        except AdvisorError as e:
+            return e.message
+        with metrics.span("render"):
+            return self.renderer.rankings(results)
+
+    def price_report(self, queries: List[str]) -> Dict[str, Optional[Quote]]:
+        """Quote per query (None if unknown) from one batched /simple/price call."""
+        ids = {q: self.resolve(q) for q in queries}
+        found = [cid for cid in ids.values() if cid]
+        prices = self.client.simple_prices(found) if found else {}
+        out: Dict[str, Optional[Quote]] = {}
+        for q, cid in ids.items():
+            p = prices.get(cid) if cid else None
+            if not p:
+                out[q] = None
+                continue
+            meta = self._registry.get(cid) if self._registry is not None else None
+            out[q] = Quote(cid, (meta or {}).get("symbol", "").upper(), self.coin_name(cid),
+                           safe_float(p.get("usd")), safe_float(p.get("usd_24h_change")),
+                           safe_float(p.get("usd_market_cap")), safe_float(p.get("usd_24h_vol")))
+        return out
 
     # Portfolio / watchlist utilities with personality
     def add_watch(self, query: str) -> str:
@@ -649,109 +4079,187 @@ class CryptoAdvisor:
         return f"🗑️  Removed {cid} from watchlist! Out of sight, out of mind! ✨"
 
     def show_watchlist(self) -> str:
-        if not self.watchlist:
-            return "📝 Watchlist is empty! Add some coins to watch, fren! 🎯"
-        
-        lines = ["📌 **Your Watchlist** - Coins you're probably emotionally attached to:"]
-        lines.append("")
-        
-        for cid in self.watchlist:
-            d = self.fetch_market(cid)
-            if not d:
-                lines.append(f"❌ {cid}: API said no! Maybe it's sleeping? 😴")
-                continue
-            
-            md = d.get('market_data', {})
-            price = safe_float(md.get('current_price', {}).get('usd', 0))
-            change = safe_float(md.get('price_change_percentage_24h', 0))
-            
-            # Add emotional commentary based on performance
-            emotion = "😊" if change > 5 else "🙂" if change > 0 else "😐" if change > -5 else "😟"
-            trend = "🚀" if change > 10 else "📈" if change > 0 else "📉" if change < 0 else "➡️"
-            
-            lines.append(f"{emotion} **{d.get('name')}** ({d.get('symbol','').upper()}): {format_currency(price)} {trend} ({change:+.2f}%)")
-        
-        lines.append("")
-        lines.append("💭 **Remember**: Don't fall in love with your bags! Stay rational! 🧠")
-        
-        return "\n".join(lines)
+        quotes = self.watchlist_report()
+        with metrics.span("render"):
+            return self.renderer.watchlist(quotes)
+
+    async def show_watchlist_async(self) -> str:
+        quotes = await self.watchlist_report_async()
+        with metrics.span("render"):
+            return self.renderer.watchlist(quotes)
+
+    def watchlist_report(self) -> Dict[str, Optional[Quote]]:
+        """Quote per watched coin in watchlist order (None when the API had no data)."""
+        ids = list(self.watchlist)
+        return self._watch_quotes(ids, self.fetch_markets(ids) if ids else {})
+
+    async def watchlist_report_async(self) -> Dict[str, Optional[Quote]]:
+        ids = list(self.watchlist)
+        return self._watch_quotes(ids, await self.fetch_markets_async(ids) if ids else {})
+
+    @staticmethod
+    def _watch_quotes(ids: List[str], markets: Dict[str, dict]) -> Dict[str, Optional[Quote]]:
+        return {cid: quote_from_market(cid, markets[cid]) if markets.get(cid) else None for cid in ids}
+
+    def _spot_price(self, cid: str) -> float:
+        quote = self.client.simple_prices([cid], ttl=self.portfolio.price_ttl).get(cid) or {}
+        if quote.get("usd") is None:
+            raise AdvisorError(f"😅 Couldn't get a price for {cid}! Tell me what you paid, fren. 💸", 502)
+        return safe_float(quote.get("usd"))
+
+    def buy(self, query: str, amount: float, price: Optional[float] = None) -> Holding:
+        """Add ``amount`` of a coin at ``price`` (default: current price); raises AdvisorError."""
+        cid = self.resolve(query)
+        if not cid:
+            raise AdvisorError(f"❌ Couldn't find '{query}' in the crypto jungle! 🌴", 404)
+        if not amount > 0 or (price is not None and not price >= 0):
+            raise AdvisorError("🤔 Amount must be positive and price can't be negative, fren!", 400)
+        return self.portfolio.add(cid, amount, self._spot_price(cid) if price is None else price)
+
+    def sell(self, query: str, amount: Optional[float] = None,
+             price: Optional[float] = None) -> Tuple[str, Optional[Holding], float]:
+        """Remove ``amount`` (default: all); returns (coin id, remaining holding, realized P&L)."""
+        cid = self.resolve(query)
+        if not cid or cid not in self.portfolio:
+            raise AdvisorError(f"🤷 {query} isn't in your portfolio! Can't sell what you don't HODL! 😅", 404)
+        if (amount is not None and not amount > 0) or (price is not None and not price >= 0):
+            raise AdvisorError("🤔 Amount must be positive and price can't be negative, fren!", 400)
+        if price is None:
+            price = self._spot_price(cid)
+        remaining, realized = self.portfolio.remove(cid, amount, price)
+        return cid, remaining, realized
+
+    def add_holding(self, query: str, amount: float, price: Optional[float] = None) -> str:
+        try:
+            h = self.buy(query, amount, price)
+        except AdvisorError as e:
+            return e.message
+        return (f"✅ Bagged {amount:g} {h.coin_id}! Now holding {h.amount:g} "
+                f"at {format_currency(h.cost / h.amount)} avg. WAGMI! 💎🙌")
+
+    def remove_holding(self, query: str, amount: Optional[float] = None, price: Optional[float] = None) -> str:
+        try:
+            cid, remaining, realized = self.sell(query, amount, price)
+        except AdvisorError as e:
+            return e.message
+        mood = "🤑 Profit secured!" if realized > 0 else "😬 Loss taken, lesson learned!" if realized < 0 else "➡️ Broke even!"
+        left = f"{remaining.amount:g} left" if remaining else "position closed"
+        return f"💸 Sold {cid} ({left}). Realized P&L: {realized:+,.2f} USD. {mood}"
+
+    def portfolio_report(self) -> PortfolioValuation:
+        """Holdings valued from one batched /simple/price request."""
+        with metrics.span("portfolio.revalue"):
+            return self.portfolio.tick(self.coin_name)
+
+    async def portfolio_report_async(self) -> PortfolioValuation:
+        with metrics.span("portfolio.revalue"):
+            return await self.portfolio.tick_async(self.async_client, self.coin_name)
+
+    def show_portfolio(self) -> str:
+        report = self.portfolio_report()
+        with metrics.span("render"):
+            return self.renderer.portfolio(report)
 
     # Simple alerts with personality
     def poll_alerts(self, checks: List[Tuple[str, float, str]], interval: int = 30, rounds: int = 5):
         """Poll a set of alerts with personality"""
-        resolved_checks = []
-        for q, tgt, direction in checks:
-            cid = self.resolve(q)
-            if cid:
-                resolved_checks.append((cid, tgt, direction))
-
-        if not resolved_checks:
-            print("❌ No valid coins found for alerts! Check those tickers! 🔍")
+        engine = self._alert_engine(checks, rounds)
+        if engine is None:
             return
-
-        print(f"🔔 Starting alert watch! I'll check {len(resolved_checks)} coins for {rounds} rounds...")
         
         for r in range(rounds):
             print(f"🔄 Round {r+1}/{rounds}...")
-            for cid, tgt, direction in resolved_checks:
-                d = self.fetch_market(cid)
-                if not d:
-                    continue
-                price = safe_float(d.get('market_data', {}).get('current_price', {}).get('usd', 0))
-                name = d.get('name')
-                if (direction == 'above' and price >= tgt) or (direction == 'below' and price <= tgt):
-                    if direction == 'above':
-                        print(f"🚀 ALERT: {name} pumped to {price}! Target {tgt} reached! TO THE MOON! 🌕")
-                    else:
-                        print(f"📉 ALERT: {name} dipped to {price}! Target {tgt} hit! Buying opportunity? 🛒")
+            try:
+                engine.tick()
+            except Exception as e:
+                logger.warning("Alert round failed: %s", e)
             if r < rounds - 1:  # Don't sleep after last round
                 time.sleep(interval)
         
         print("✅ Alert watch complete! Hope you made some gains! 💰")
 
+    async def poll_alerts_async(self, checks: List[Tuple[str, float, str]], interval: int = 30, rounds: int = 5):
+        """poll_alerts without blocking the event loop"""
+        engine = self._alert_engine(checks, rounds)
+        if engine is None:
+            return
+
+        for r in range(rounds):
+            print(f"🔄 Round {r+1}/{rounds}...")
+            try:
+                await engine.tick_async(self.async_client)
+            except Exception as e:
+                logger.warning("Alert round failed: %s", e)
+            if r < rounds - 1:  # Don't sleep after last round
+                await asyncio.sleep(interval)
+
+        print("✅ Alert watch complete! Hope you made some gains! 💰")
+
+    def _alert_engine(self, checks: List[Tuple[str, float, str]], rounds: int) -> Optional[AlertEngine]:
+        engine = AlertEngine(self.client, sinks=[self.print_alert], price_ttl=min(10, self.client.cache_ttl))
+        for q, tgt, direction in checks:
+            cid = self.resolve(q)
+            if cid:
+                engine.add_rule(cid, tgt, direction, label=q)
+
+        if not len(engine):
+            print("❌ No valid coins found for alerts! Check those tickers! 🔍")
+            return None
+
+        print(f"🔔 Starting alert watch! I'll check {len(engine.watched_ids())} coins for {rounds} rounds...")
+        return engine
+
+    def coin_name(self, coin_id: str) -> str:
+        """Display name for a coin id, without forcing a registry load."""
+        meta = self._registry.get(coin_id) if self._registry is not None else None
+        return meta["name"] if meta else coin_id
+
+    def print_alert(self, event: AlertEvent):
+        """Alert sink that prints with personality"""
+        rule = event.rule
+        name = self.coin_name(rule.coin_id)
+        if rule.direction == 'above':
+            print(f"🚀 ALERT: {name} pumped to {event.price}! Target {rule.threshold} reached! TO THE MOON! 🌕")
+        else:
+            print(f"📉 ALERT: {name} dipped to {event.price}! Target {rule.threshold} hit! Buying opportunity? 🛒")
+
     # Export portfolio/watchlist to CSV
     def export_watchlist_csv(self, path: str) -> str:
         if not self.watchlist:
             return "❌ Watchlist is empty! Nothing to export but regrets! 😅"
-            
-        rows = []
-        for cid in self.watchlist:
-            d = self.fetch_market(cid)
-            if not d:
-                continue
-            md = d.get('market_data', {})
-            rows.append({
-                'id': cid,
-                'symbol': d.get('symbol','').upper(),
-                'name': d.get('name',''),
-                'price_usd': safe_float(md.get('current_price', {}).get('usd', 0)),
-                'change_24h_pct': safe_float(md.get('price_change_percentage_24h', 0)),
-                'market_cap_usd': safe_float(md.get('market_cap', {}).get('usd', 0)),
-            })
-        
+        return self._write_watchlist_csv(path, self.watchlist_report())
+
+    async def export_watchlist_csv_async(self, path: str) -> str:
+        if not self.watchlist:
+            return "❌ Watchlist is empty! Nothing to export but regrets! 😅"
+        return self._write_watchlist_csv(path, await self.watchlist_report_async())
+
+    def _write_watchlist_csv(self, path: str, quotes: Dict[str, Optional[Quote]]) -> str:
+        rows = [q for q in quotes.values() if q is not None]
         if not rows:
             return "❌ Couldn't fetch any data for export! API might be rekt! 📡"
             
+        import csv
         keys = ['id','symbol','name','price_usd','change_24h_pct','market_cap_usd']
         with open(path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=keys)
-            writer.writeheader()
-            for r in rows:
-                writer.writerow(r)
+            writer = csv.writer(f)
+            writer.writerow(keys)
+            for q in rows:
+                writer.writerow([q.id, q.symbol, q.name, q.price, q.change_24h, q.market_cap])
         
         return f"✅ Watchlist exported to {path}! Your portfolio is now officially organized! 📊"
 
     # Assignment-specific methods
     def get_profitability_recommendations(self) -> str:
         """Assignment-style profitability recommendation with personality"""
-        coins = self.rank_coins_internal(['bitcoin', 'ethereum', 'cardano', 'solana', 'polkadot'])
-        profitable = [c for c in coins if c['change_24h'] > 0]
+        coins = self._score_coins(['bitcoin', 'ethereum', 'cardano', 'solana', 'polkadot'])
+        profitable = [c for c in coins if c.change_24h > 0]
         
         if profitable:
             response = ["📈 **Based Profit Picks** - These are looking green! 💚", ""]
             for coin in profitable[:3]:
-                trend = "🚀 rising" if coin['change_24h'] > 5 else "📈 rising" if coin['change_24h'] > 2 else "↗️ stable"
-                response.append(f"• **{coin['name']}**: {trend} trend, {format_currency(coin['market_cap'])} market cap")
+                trend = "🚀 rising" if coin.change_24h > 5 else "📈 rising" if coin.change_24h > 2 else "↗️ stable"
+                response.append(f"• **{coin.name}**: {trend} trend, {format_currency(coin.market_cap)} market cap")
             response.append("")
             response.append("🎯 **CryptoBuddy says**: Invest in these for potential gains! 🌕")
             response.append("⚠️  **But remember**: Crypto is risky—always do your own research! 📚")
@@ -760,59 +4268,410 @@ class CryptoAdvisor:
 
     def get_sustainability_recommendations(self) -> str:
         """Assignment-style sustainability recommendation with personality"""
-        coins = self.rank_coins_internal(['bitcoin', 'ethereum', 'cardano', 'solana', 'polkadot', 'stellar'])
-        sustainable = [c for c in coins if c['sustainability'] >= 0.6]
+        picks = ['bitcoin', 'ethereum', 'cardano', 'solana', 'polkadot', 'stellar']
+        # This report is about sustainability, so score the few picks properly instead of the neutral default
+        self.precompute_sustainability(picks)
+        coins = self._score_coins(picks)
+        sustainable = [c for c in coins if c.sustainability >= 0.6]
         
         if sustainable:
             response = ["🌱 **Eco-Friendly Champions** - Good for your portfolio AND the planet! 🌍", ""]
             for coin in sustainable[:3]:
-                score_percent = int(coin['sustainability'] * 100)
+                score_percent = int(coin.sustainability * 100)
                 earth_emoji = "🌍" if score_percent >= 80 else "🌱" if score_percent >= 60 else "✅"
-                response.append(f"• **{coin['name']}**: {score_percent}% sustainability {earth_emoji}")
+                response.append(f"• **{coin.name}**: {score_percent}% sustainability {earth_emoji}")
             response.append("")
             response.append("🎯 **CryptoBuddy says**: These coins are eco-friendly and have long-term potential! ✨")
             response.append("⚠️  **But remember**: Crypto is risky—always do your own research! 📚")
             return "\n".join(response)
         return "🌵 No highly sustainable cryptocurrencies found. Maybe stick to trees? 🌳"
 
-    def rank_coins_internal(self, queries: List[str]) -> List[dict]:
-        """Internal method for ranking without personality formatting"""
-        resolved = []
-        for q in queries:
-            cid = self.resolve(q)
-            if cid:
-                resolved.append(cid)
-        results = []
-        for cid in resolved:
-            d = self.fetch_market(cid)
-            if not d:
-                continue
-            md = d.get('market_data', {})
-            price = safe_float(md.get('current_price', {}).get('usd', 0))
-            change = safe_float(md.get('price_change_percentage_24h', 0))
-            mcap = safe_float(md.get('market_cap', {}).get('usd', 0))
-            sustain = heuristic_sustainability(d)
-            risk = compute_risk_score(d)
-            combined = sustain * 0.4 + (max(-10, change) / 100.0) * 0.3 - risk * 0.3
-            results.append({
-                'id': cid,
-                'symbol': d.get('symbol','').upper(),
-                'name': d.get('name',''),
-                'price': price,
-                'change_24h': change,
-                'market_cap': mcap,
-                'sustainability': sustain,
-                'risk': risk,
-                'combined_score': combined,
-            })
-        results.sort(key=lambda x: x['combined_score'], reverse=True)
+    def _score_coins(self, coin_ids: List[str], progress: bool = False, top: Optional[int] = None) -> List[CoinScore]:
+        """Score coins from one batched /coins/markets fetch, best first."""
+        return self._score_records(coin_ids, self.fetch_markets(coin_ids), progress, top)
+
+    async def _score_coins_async(self, coin_ids: List[str], top: Optional[int] = None) -> List[CoinScore]:
+        markets = await self.fetch_markets_async(coin_ids)
+        history = None
+        if self.risk_window:
+            # history sync is blocking I/O; keep it off the event loop
+            history = await asyncio.get_running_loop().run_in_executor(
+                None, self.risk_metrics, [cid for cid in coin_ids if cid in markets])
+        return self._score_records(coin_ids, markets, top=top, history=history)
+
+    def _score_records(self, coin_ids: List[str], markets: Dict[str, dict],
+                       progress: bool = False, top: Optional[int] = None,
+                       history: Optional[Dict[str, RiskMetrics]] = None) -> List[CoinScore]:
+        if history is None and self.risk_window:
+            history = self.risk_metrics([cid for cid in coin_ids if cid in markets])
+        iterator = coin_ids
+        tqdm = optional_import("tqdm") if progress else None
+        if tqdm is not None:
+            iterator = tqdm.tqdm(coin_ids, desc="🔄 Crunching numbers")
+
+        with metrics.span("score"):
+            quotes, sustain = [], []
+            for cid in iterator:
+                d = markets.get(cid)
+                if d:
+                    quotes.append(quote_from_market(cid, d))
+                    sustain.append(self.sustainability(cid, d))
+            results = score_quotes(quotes, sustain, top, history)
+        self.fill_sustainability_in_background()
         return results
 
+    def screen(self, filters: ScreenFilters = ScreenFilters(), top: int = 10,
+               max_coins: int = 5000) -> List[CoinScore]:
+        """Screen the ``max_coins`` largest coins and return the best ``top``.
+
+        Sustainability needs a full coin document per coin, which is far too
+        many requests for a market-wide scan, so coins not yet scored use
+        the heuristic's neutral 0.5 (see precompute_sustainability).
+        """
+        if top <= 0:
+            raise AdvisorError("🤔 Need at least one coin in the top list, fren!", 400)
+        with metrics.span("score"):
+            return screen_markets(self.client.iter_market_pages(max_coins),
+                                  lambda cid: self._sustainability.score(cid, 0.5), filters, top)
+
+
+# -----------------------------
+# Daemon mode
+# -----------------------------
+
+class Job:
+    """A periodic coroutine job owned by a Scheduler."""
+
+    __slots__ = ("name", "fn", "interval", "jitter", "delay", "task", "runs", "failures", "skipped", "last_duration")
+
+    def __init__(self, name: str, fn: Callable[[], Any], interval: float, jitter: float = 0.0, delay: float = 0.0):
+        self.name = name
+        self.fn = fn  # async callable taking no arguments
+        self.interval = interval
+        self.jitter = jitter  # up to this many seconds added to each delay
+        self.delay = delay  # seconds after start before the first run
+        self.task = None
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_duration = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"runs": self.runs, "failures": self.failures, "skipped": self.skipped,
+                "last_duration": round(self.last_duration, 3)}
+
+
+class Scheduler:
+    """Run periodic jobs on one event loop.
+
+    Due times live in a heap, so a single loop sleeps until the next job is
+    due. A job never overlaps itself: if its previous run is still going
+    when it comes due again, that tick is skipped and counted. Failures are
+    logged and the job keeps its schedule.
+    """
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.jobs: Dict[str, Job] = {}
+        self._rng = rng or random.Random()
+        self._stop = None
+
+    def add_job(self, name: str, fn: Callable[[], Any], interval: float, jitter: float = 0.0,
+                delay: float = 0.0) -> Job:
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        job = Job(name, fn, interval, jitter, delay)
+        self.jobs[name] = job
+        return job
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: job.stats() for name, job in self.jobs.items()}
+
+    async def run(self, duration: Optional[float] = None):
+        """Run until stop() is called (or ``duration`` seconds pass)."""
+        loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        start = loop.time()
+        deadline = start + duration if duration is not None else None
+        # Jobs run once at start unless delayed; jitter spreads out the later ticks
+        heap = [(start + job.delay, i, job) for i, job in enumerate(self.jobs.values())]
+        heapq.heapify(heap)
+        seq = len(heap)
+        try:
+            while heap and not self._stop.is_set():
+                due, _, job = heap[0]
+                wake = due if deadline is None else min(due, deadline)
+                delay = wake - loop.time()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._stop.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    if deadline is not None and loop.time() >= deadline:
+                        break
+                    continue
+                heapq.heappop(heap)
+                if job.task is not None and not job.task.done():
+                    job.skipped += 1
+                else:
+                    job.task = loop.create_task(self._run_job(job))
+                nxt = max(due + job.interval, loop.time())
+                if job.jitter:
+                    nxt += self._rng.uniform(0, job.jitter)
+                heapq.heappush(heap, (nxt, seq, job))
+                seq += 1
+        finally:
+            running = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+    async def _run_job(self, job: Job):
+        started = time.perf_counter()
+        try:
+            await job.fn()
+            job.runs += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failures += 1
+            logger.warning("Job %s failed: %s", job.name, e)
+        finally:
+            job.last_duration = time.perf_counter() - started
+
+
+def parse_alert_spec(spec: str) -> Tuple[str, float, str]:
+    """Parse a ``coin:price:above|below`` alert spec."""
+    parts = spec.rsplit(":", 2)
+    if len(parts) != 3 or parts[2].lower() not in ("above", "below"):
+        raise ValueError(f"Alert must look like coin:price:above|below, got {spec!r}")
+    return parts[0], float(parts[1]), parts[2].lower()
+
+
+def run_daemon(advisor: CryptoAdvisor, alerts: List[Tuple[str, float, str]],
+               alert_interval: float = 30, watch_interval: float = 300,
+               registry_interval: float = 24 * 3600, jitter: float = 0.1,
+               duration: Optional[float] = None, portfolio_interval: float = 30) -> Scheduler:
+    """Keep one warm advisor and run alert, watchlist, portfolio and registry jobs until interrupted.
+
+    ``jitter`` is a fraction of each job's interval. Jobs share the
+    advisor's client, so their requests share its caches and in-flight
+    deduplication.
+    """
+    scheduler = Scheduler()
+    engine = AlertEngine(advisor.client, sinks=[advisor.print_alert, log_alert_sink],
+                         price_ttl=min(alert_interval, advisor.client.cache_ttl))
+    for q, tgt, direction in alerts:
+        cid = advisor.resolve(q)
+        if cid:
+            engine.add_rule(cid, tgt, direction, label=q)
+        else:
+            print(f"❌ Couldn't find '{q}' for an alert! Skipping it! 🔍")
+
+    async def check_alerts():
+        await engine.tick_async(advisor.async_client)
+
+    async def refresh_watchlist():
+        print(await advisor.show_watchlist_async())
+
+    async def revalue_portfolio():
+        v = await advisor.portfolio_report_async()
+        print(f"💼 Portfolio {format_currency(v.value)} | P&L {v.pnl:+,.2f} USD ({v.pnl_pct:+.1f}%) | "
+              f"24h {v.change_24h:+,.2f} | {v.repriced}/{len(advisor.portfolio)} repriced")
+
+    async def refresh_registry():
+        # Loading the registry and refreshing it both block (HTTP + snapshot), so neither runs on the loop
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: advisor.registry.refresh_if_stale(registry_interval))
+
+    if len(engine):
+        scheduler.add_job("alerts", check_alerts, alert_interval, jitter * alert_interval)
+    if advisor.watchlist:
+        scheduler.add_job("watchlist", refresh_watchlist, watch_interval, jitter * watch_interval)
+    if len(advisor.portfolio) and portfolio_interval > 0:
+        scheduler.add_job("portfolio", revalue_portfolio, portfolio_interval, jitter * portfolio_interval)
+    # Checking is free, so check a few times per interval: a list fetched just before a check
+    # is otherwise skipped and left to go stale for nearly two intervals. Not at start: a fresh
+    # snapshot needs no download, and a stale one already refreshes in the background on load.
+    registry_check = registry_interval / 4
+    scheduler.add_job("registry", refresh_registry, registry_check, jitter * registry_check, delay=registry_check)
+
+    async def main():
+        try:
+            await scheduler.run(duration)
+        finally:
+            if advisor._async_client is not None:
+                await advisor._async_client.close()
+
+    print(f"😈 Daemon mode! Watching {len(advisor.watchlist)} coins, {len(engine)} alerts "
+          f"and {len(advisor.portfolio)} holdings. Ctrl+C to stop.")
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    print("👋 Daemon stopped. Jobs: " + ", ".join(
+        f"{name} {s['runs']} runs/{s['failures']} failed/{s['skipped']} skipped"
+        for name, s in scheduler.stats().items()))
+    return scheduler
+
+
+# -----------------------------
+# HTTP API
+# -----------------------------
+
+class AdvisorAPI:
+    """JSON endpoints over one long-lived CryptoAdvisor.
+
+    Each route maps query parameters to an advisor ``*_report`` call, so
+    concurrent requests share the advisor's warm registry and the client's
+    caches and in-flight deduplication. ``dispatch`` is transport-free;
+    ``serve_api`` puts it behind a ThreadingHTTPServer.
+    """
+
+    def __init__(self, advisor: CryptoAdvisor):
+        self.advisor = advisor
+        self._watch_lock = threading.Lock()
+        self.routes: Dict[Tuple[str, str], Callable[[Dict[str, str]], Any]] = {
+            ("GET", "/health"): lambda q: {"status": "ok"},
+            ("GET", "/stats"): lambda q: self.advisor.client.stats(),
+            ("GET", "/metrics"): lambda q: metrics.snapshot() if q.get("format") == "json" else metrics.to_prometheus(),
+            ("GET", "/summary"): lambda q: self.advisor.coin_report(self._param(q, "coin")),
+            ("GET", "/compare"): lambda q: self.advisor.compare_report(self._param(q, "a"), self._param(q, "b")),
+            ("GET", "/rank"): lambda q: self.advisor.rank_report(self._list_param(q, "coins")),
+            ("GET", "/correlations"): lambda q: self.advisor.correlation_report(
+                self._list_param(q, "coins"), self._number_param(q, "window", 0, int) or None),
+            ("GET", "/price"): lambda q: self.advisor.price_report(self._list_param(q, "coins")),
+            ("GET", "/screen"): self._screen,
+            ("GET", "/watchlist"): lambda q: self.advisor.watchlist_report(),
+            ("POST", "/watchlist"): self._add_watch,
+            ("DELETE", "/watchlist"): self._remove_watch,
+            ("GET", "/portfolio"): lambda q: self.advisor.portfolio_report(),
+            ("POST", "/portfolio"): self._buy,
+            ("DELETE", "/portfolio"): self._sell,
+        }
+
+    @staticmethod
+    def _param(query: Dict[str, str], name: str) -> str:
+        value = query.get(name, "").strip()
+        if not value:
+            raise AdvisorError(f"Missing query parameter '{name}'", 400)
+        return value
+
+    @classmethod
+    def _list_param(cls, query: Dict[str, str], name: str) -> List[str]:
+        return [v.strip() for v in cls._param(query, name).split(",") if v.strip()]
+
+    @staticmethod
+    def _number_param(query: Dict[str, str], name: str, default: float, cast: Callable[[str], Any] = float):
+        value = query.get(name)
+        if value is None or value == "":
+            return default
+        try:
+            return cast(value)
+        except ValueError:
+            raise AdvisorError(f"Query parameter '{name}' must be a number", 400)
+
+    def _screen(self, query: Dict[str, str]) -> List[CoinScore]:
+        filters = ScreenFilters(*(self._number_param(query, name, default)
+                                  for name, default in ScreenFilters._field_defaults.items()))
+        return self.advisor.screen(filters, top=self._number_param(query, "top", 10, int),
+                                   max_coins=self._number_param(query, "max_coins", 5000, int))
+
+    def _add_watch(self, query: Dict[str, str]) -> List[str]:
+        q = self._param(query, "coin")
+        cid = self.advisor.resolve(q)
+        if not cid:
+            raise AdvisorError(f"Unknown coin '{q}'", 404)
+        with self._watch_lock:
+            if cid not in self.advisor.watchlist:
+                self.advisor.watchlist.append(cid)
+            return list(self.advisor.watchlist)
+
+    def _remove_watch(self, query: Dict[str, str]) -> List[str]:
+        cid = self.advisor.resolve(self._param(query, "coin"))
+        with self._watch_lock:
+            if cid in self.advisor.watchlist:
+                self.advisor.watchlist.remove(cid)
+            return list(self.advisor.watchlist)
+
+    def _buy(self, query: Dict[str, str]) -> PortfolioValuation:
+        price = self._number_param(query, "price", None)
+        self.advisor.buy(self._param(query, "coin"), self._number_param(query, "amount", 0.0), price)
+        return self.advisor.portfolio_report()
+
+    def _sell(self, query: Dict[str, str]) -> PortfolioValuation:
+        amount, price = self._number_param(query, "amount", None), self._number_param(query, "price", None)
+        self.advisor.sell(self._param(query, "coin"), amount, price)
+        return self.advisor.portfolio_report()
+
+    def dispatch(self, method: str, path: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        """Return (HTTP status, JSON-serializable body) for one request; /metrics may return text."""
+        handler = self.routes.get((method, path.rstrip("/") or "/"))
+        if handler is None:
+            allowed = any(p == path.rstrip("/") for _, p in self.routes)
+            return (405 if allowed else 404), {"error": f"No route for {method} {path}"}
+        try:
+            return 200, record_to_dict(handler(query))
+        except AdvisorError as e:
+            return e.status, {"error": e.message}
+        except Exception as e:
+            logger.exception("API request %s %s failed", method, path)
+            return 500, {"error": str(e)}
+
+
+def serve_api(advisor: CryptoAdvisor, host: str = "127.0.0.1", port: int = 8765):
+    """Serve AdvisorAPI over HTTP until interrupted (one thread per request)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qsl, urlsplit
+
+    api = AdvisorAPI(advisor)
+    metrics.enabled = True  # for GET /metrics
+
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "CryptoBuddy/1"
+
+        def _handle(self):
+            url = urlsplit(self.path)
+            status, body = api.dispatch(self.command, url.path, dict(parse_qsl(url.query)))
+            if isinstance(body, str):  # Prometheus exposition from /metrics
+                payload, content_type = body.encode("utf-8"), "text/plain; version=0.0.4"
+            else:
+                payload, content_type = json.dumps(body).encode("utf-8"), "application/json"
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_POST = do_DELETE = _handle
+
+        def log_message(self, fmt, *args):
+            logger.debug("%s %s", self.address_string(), fmt % args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    print(f"🌐 CryptoBuddy API listening on http://{host}:{server.server_address[1]} - Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return api
+
 
 # -----------------------------
 # CLI / Interactive with Personality
 # -----------------------------
 
+# One-shot commands whose output --format controls (keep in step with emit() and --history below)
+FORMATTED_COMMANDS = ('--summary', '--price', '--compare', '--rank', '--screen', '--portfolio', '--correlate', '--history')
+
+
 def interactive_mode(advisor: CryptoAdvisor):
     print(f"\n{advisor.personality.get_greeting()}")
     print("\n" + "="*60)
@@ -868,12 +4727,17 @@ def interactive_mode(advisor: CryptoAdvisor):
   summary <coin>            - Detailed coin analysis
   compare <coin1> <coin2>   - Head-to-head comparison
   rank <coin1> <coin2> ...  - Rank multiple coins
+  history <coin> [days]     - Price history (default 365 days)
+  corr [coin1 coin2 ...]    - Correlation, volatility & drawdown (default: watchlist)
 
 📊 **Portfolio Tools**:
   watch add <coin>          - Add coin to watchlist
   watch remove <coin>       - Remove from watchlist  
   watch show                - Show your watchlist
   export watch <filename>   - Export watchlist to CSV
+  buy <coin> <amount> [price]  - Add to your portfolio (default: current price)
+  sell <coin> [amount] [price] - Sell some or all of a holding
+  portfolio                 - Value your bags: P&L and weights
 
 🔔 **Alerts**:
   alerts <coin> <price> <above|below> - Price alert example
@@ -912,8 +4776,8 @@ def interactive_mode(advisor: CryptoAdvisor):
                 if not d:
                     print("🤖 ❌ Couldn't fetch data! API might be taking a coffee break! ☕")
                     continue
-                p = safe_float(d.get('market_data', {}).get('current_price',{}).get('usd',0))
-                change = safe_float(d.get('market_data', {}).get('price_change_percentage_24h',0))
+                fields = market_fields(d)
+                p, change = fields['price'], fields['change_24h']
                 trend = "🚀" if change > 5 else "📈" if change > 0 else "📉" if change < 0 else "➡️"
                 print(f"🤖 💰 {d.get('name')} ({d.get('symbol','').upper()}): {format_currency(p)} {trend} ({change:+.2f}%)")
                 continue
@@ -925,6 +4789,15 @@ def interactive_mode(advisor: CryptoAdvisor):
             if parts[0].lower() == 'compare' and len(parts) >= 3:
                 print(f"🤖 {advisor.compare(parts[1], parts[2])}")
                 continue
+
+            if parts[0].lower() in ('corr', 'correlate'):
+                print(f"🤖 {advisor.correlations(parts[1:] or advisor.watchlist)}")
+                continue
+
+            if parts[0].lower() == 'history' and len(parts) >= 2:
+                days = safe_float(parts[2], 365) if len(parts) >= 3 else 365
+                print(f"🤖 {advisor.history_summary(parts[1], days)}")
+                continue
                 
             if parts[0].lower() == 'watch' and len(parts) >= 2:
                 if parts[1].lower() == 'add' and len(parts) >= 3:
@@ -940,6 +4813,21 @@ def interactive_mode(advisor: CryptoAdvisor):
             if parts[0].lower() == 'rank' and len(parts) >= 2:
                 print(f"🤖 {advisor.rank_coins(parts[1:])}")
                 continue
+
+            if parts[0].lower() == 'buy' and len(parts) >= 3:
+                price = safe_float(parts[3], -1.0) if len(parts) >= 4 else None
+                print(f"🤖 {advisor.add_holding(parts[1], safe_float(parts[2]), price)}")
+                continue
+
+            if parts[0].lower() == 'sell' and len(parts) >= 2:
+                amount = safe_float(parts[2]) if len(parts) >= 3 and parts[2].lower() != 'all' else None
+                price = safe_float(parts[3], -1.0) if len(parts) >= 4 else None
+                print(f"🤖 {advisor.remove_holding(parts[1], amount, price)}")
+                continue
+
+            if parts[0].lower() in ('portfolio', 'bags'):
+                print(f"🤖 {advisor.show_portfolio()}")
+                continue
                 
             if parts[0].lower() == 'export' and len(parts) >= 3 and parts[1].lower() == 'watch':
                 path = advisor.export_watchlist_csv(parts[2])
@@ -972,6 +4860,8 @@ def interactive_mode(advisor: CryptoAdvisor):
 # -----------------------------
 
 if __name__ == '__main__':
+    startup = PhaseTimer(_IMPORT_STARTED)
+    startup.mark("import")
     import argparse
 
     parser = argparse.ArgumentParser(description="CryptoBuddy Pro+ v3 — Your based crypto advisor with personality! 🚀")
@@ -980,37 +4870,224 @@ if __name__ == '__main__':
     parser.add_argument('--price', nargs=1, help='Show price for a coin')
     parser.add_argument('--summary', nargs=1, help='Show summary for a coin')
     parser.add_argument('--rank', nargs='+', help='Rank given coins')
+    parser.add_argument('--history', nargs='+', metavar='COIN', help='Sync and show daily price history (json/csv formats print every row)')
+    parser.add_argument('--history-days', type=float, default=365, help='Days of history for --history (default: 365)')
+    parser.add_argument('--portfolio', action='store_true', help='Value your holdings: P&L against cost basis and weights')
+    trades = parser.add_mutually_exclusive_group()
+    trades.add_argument('--buy', nargs=2, metavar=('COIN', 'AMOUNT'), help='Add to a portfolio holding (at --price-paid, default: current price)')
+    trades.add_argument('--sell', nargs=2, metavar=('COIN', 'AMOUNT'), help="Sell from a portfolio holding (AMOUNT 'all' closes it)")
+    parser.add_argument('--price-paid', type=float, metavar='USD', help='Price per coin for --buy/--sell instead of the current price')
+    parser.add_argument('--portfolio-file', help='Where holdings are kept (default: portfolio.sqlite3 in the cache dir, even with --no-cache)')
+    parser.add_argument('--correlate', nargs='+', metavar='COIN', help='Correlation matrix, volatility, drawdown and beta vs BTC from daily closes')
+    parser.add_argument('--risk-window', type=int, metavar='DAYS', help='Score risk from DAYS of daily-close volatility instead of the 24h change (summary/compare/rank)')
     parser.add_argument('--profit', action='store_true', help='Get profitability recommendations')
     parser.add_argument('--sustainable', action='store_true', help='Get sustainability recommendations')
+    parser.add_argument('--format', choices=RENDER_FORMATS, default='personality', help=f"Output format for {'/'.join(FORMATTED_COMMANDS)} (default: personality)")
+    parser.add_argument('--no-cache', action='store_true', help='Disable the on-disk response cache')
+    parser.add_argument('--cache-dir', help='Directory for the on-disk cache (default: $CRYPTOBUDDY_HOME or ~/.cache/cryptobuddy)')
+    parser.add_argument('--cache-ttl', type=int, default=60, help='Seconds to cache market data (default: 60)')
+    parser.add_argument('--rate-limit', type=float, default=30, help='Max CoinGecko requests per minute (0 disables; default: 30)')
+    parser.add_argument('--stats', action='store_true', help='Log cache and rate-limiter counters on exit')
+    parser.add_argument('--profile', action='store_true', help='Print time per phase (HTTP, waits, decoding, resolve, scoring, rendering) and counters on exit')
+    parser.add_argument('--metrics-out', metavar='FILE', help='Write spans and counters on exit: JSON for *.json, else Prometheus text format')
+    parser.add_argument('--stale-while-revalidate', action='store_true', help='Serve expired cache entries instantly and refresh them in the background')
+    parser.add_argument('--max-stale', type=float, default=600, help='Max seconds past TTL that stale data may be served (default: 600)')
+    parser.add_argument('--screen', action='store_true', help='Screen the whole market and show the top coins')
+    parser.add_argument('--top', type=int, default=10, help='How many coins --screen returns (default: 10)')
+    parser.add_argument('--max-coins', type=int, default=5000, help='How many of the largest coins --screen scans (default: 5000)')
+    parser.add_argument('--min-cap', type=float, default=0.0, help='--screen: minimum market cap in USD')
+    parser.add_argument('--max-risk', type=float, default=1.0, help='--screen: maximum risk score (0-1)')
+    parser.add_argument('--min-sustainability', type=float, default=0.0, help='--screen: minimum sustainability (0-1)')
+    parser.add_argument('--min-volume-ratio', type=float, default=0.0, help='--screen: minimum 24h volume / market cap')
+    parser.add_argument('--precompute-sustainability', type=int, metavar='N', help='Score the N largest coins (plus well-known ones) for the sustainability cache and exit')
+    parser.add_argument('--daemon', action='store_true', help='Run alerts and watchlist refresh as a long-running service')
+    parser.add_argument('--alert', action='append', default=[], metavar='COIN:PRICE:DIR',
+                        help='Daemon price alert, e.g. btc:50000:above (repeatable)')
+    parser.add_argument('--watch', action='append', default=[], metavar='COIN', help='Daemon watchlist coin (repeatable)')
+    parser.add_argument('--alert-interval', type=float, default=30, help='Seconds between daemon alert checks (default: 30)')
+    parser.add_argument('--watch-interval', type=float, default=300, help='Seconds between daemon watchlist refreshes (default: 300)')
+    parser.add_argument('--portfolio-interval', type=float, default=30, help='Seconds between daemon portfolio revaluations (0 disables; default: 30)')
+    parser.add_argument('--registry-interval', type=float, default=24 * 3600, help='Daemon: re-download the coin registry once it is this many seconds old (default: 86400)')
+    parser.add_argument('--jitter', type=float, default=0.1, help='Random delay added to each job, as a fraction of its interval (default: 0.1)')
+    parser.add_argument('--serve', action='store_true', help='Serve a local JSON API (summary, compare, rank, price, watchlist)')
+    parser.add_argument('--host', default='127.0.0.1', help='API server bind address (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='API server port (default: 8765)')
+    parser.add_argument('--base-url', help='API base URL, e.g. a --fixture-server (default: $CRYPTOBUDDY_BASE_URL or CoinGecko)')
+    fixtures = parser.add_mutually_exclusive_group()
+    fixtures.add_argument('--record', metavar='DIR', help='Save every API response to DIR as a replayable fixture (bypasses the cache)')
+    fixtures.add_argument('--replay', metavar='DIR', help='Answer API calls from fixtures in DIR, fully offline (bypasses the cache)')
+    fixtures.add_argument('--fixture-server', metavar='DIR', help='Serve fixtures from DIR as a local CoinGecko stand-in on --host/--port')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='--fixture-server: added latency per request')
+    parser.add_argument('--latency-jitter-ms', type=float, default=0.0, help='--fixture-server: extra random latency, up to this much')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='--fixture-server: fraction of requests answered with 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='--fixture-server: fraction of requests answered with 429')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='--fixture-server: Retry-After seconds sent with 429s (default: 1)')
+    parser.add_argument('--seed', type=int, help='--fixture-server: RNG seed for reproducible latency and faults')
+    parser.add_argument('--startup-probe', action='store_true', help=argparse.SUPPRESS)
     args = parser.parse_args()
+    startup.mark("argparse")
+
+    if args.fixture_server:
+        server = FixtureServer(args.fixture_server, args.host, args.port,
+                               latency=args.latency_ms / 1e3, jitter=args.latency_jitter_ms / 1e3,
+                               error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                               retry_after=args.retry_after, seed=args.seed)
+        print(f"🧪 Serving fixtures from {args.fixture_server} at {server.base_url} - Ctrl+C to stop")
+        server.serve_forever()
+        print(f"🧪 Fixture server stopped: {server.stats()}")
+        sys.exit(0)
+
+    if args.profile or args.metrics_out:
+        import atexit
+        metrics.enabled = True
+        metrics.reset()  # measure from here, not from interpreter start
 
-    print("🚀 Initializing CryptoBuddy Pro+ v1...")
-    print("💎 Loading coin data...")
+        def report_metrics():
+            if args.metrics_out:
+                with open(args.metrics_out, 'w', encoding='utf-8') as f:
+                    f.write(metrics.to_json() if args.metrics_out.endswith('.json') else metrics.to_prometheus())
+            if args.profile:
+                print(metrics.breakdown(), file=sys.stderr)
+        atexit.register(report_metrics)
+
+    if not args.startup_probe:
+        print("🚀 Initializing CryptoBuddy Pro+ v1...")
     
-    client = DataClient()
-    advisor = CryptoAdvisor(client)
+    disk_cache = None
+    registry_snapshot = None
+    sustainability_cache = None
+    history_root = None
+    session = None
+    if args.replay:
+        session = ReplaySession(args.replay)
+    elif args.record:
+        session = RecordingSession(args.record)
+    # Cached answers would hide requests from the recorder and mix live data into replays
+    if not args.no_cache and session is None:
+        cache_dir = args.cache_dir or default_cache_dir()
+        disk_cache = DiskCache(os.path.join(cache_dir, "http_cache.sqlite3"))
+        registry_snapshot = os.path.join(cache_dir, "coin_registry.bin")
+        sustainability_cache = SustainabilityCache(os.path.join(cache_dir, "sustainability.sqlite3"))
+        history_root = os.path.join(cache_dir, "history")
+    client = DataClient(session=session, cache_ttl=args.cache_ttl, disk_cache=disk_cache,
+                        requests_per_minute=None if args.replay else (args.rate_limit or None),
+                        stale_while_revalidate=args.stale_while_revalidate,
+                        max_stale=args.max_stale, base_url=args.base_url)
+    advisor = CryptoAdvisor(client, registry_snapshot=registry_snapshot,
+                            sustainability_cache=sustainability_cache,
+                            history=PriceHistoryStore(history_root, client),
+                            portfolio=Portfolio(args.portfolio_file or os.path.join(args.cache_dir or default_cache_dir(),
+                                                                                    "portfolio.sqlite3"),
+                                                client, price_ttl=min(10, args.cache_ttl)))
+    advisor.risk_window = args.risk_window
+    startup.mark("client_init")
+    if args.stats:
+        import atexit
+        atexit.register(lambda: logger.info("Client stats: %s", client.stats()))
+
+    if args.startup_probe:
+        # Phases of a warm-cache query, timed by bench_cryptobuddy.py startup
+        advisor.resolve("btc")
+        startup.mark("resolve_known")
+        advisor.fetch_market("bitcoin")
+        startup.mark("cached_fetch")
+        advisor.registry
+        startup.mark("registry_load")
+        advisor.resolve("Cardano")
+        startup.mark("resolve_indexed")
+        print(json.dumps(startup.phases))
+        sys.exit(0)
 
     if args.interactive:
         interactive_mode(advisor)
         sys.exit(0)
 
-    if args.compare:
-        a, b = args.compare
-        print(advisor.compare(a, b))
+    if args.serve:
+        serve_api(advisor, args.host, args.port)
         sys.exit(0)
 
-    if args.price:
-        print(advisor.summarize_coin(args.price[0]))
+    if args.daemon:
+        try:
+            alerts = [parse_alert_spec(spec) for spec in args.alert]
+        except ValueError as e:
+            parser.error(str(e))
+        for query in args.watch:
+            print(advisor.add_watch(query))
+        run_daemon(advisor, alerts, alert_interval=args.alert_interval, watch_interval=args.watch_interval,
+                   registry_interval=args.registry_interval, jitter=args.jitter,
+                   portfolio_interval=args.portfolio_interval)
         sys.exit(0)
 
+    def emit(view: str, report: Callable[..., Any], *report_args):
+        try:
+            print(render_result(view, report(*report_args), args.format, advisor.personality))
+        except AdvisorError as e:
+            print(e.message)
+            sys.exit(1)
+        sys.exit(0)
+
+    if args.compare:
+        emit('comparison', advisor.compare_report, *args.compare)
+
+    if args.price:
+        emit('summary', advisor.coin_report, args.price[0])
+
     if args.summary:
-        print(advisor.summarize_coin(args.summary[0]))
+        emit('summary', advisor.coin_report, args.summary[0])
+
+    if args.buy or args.sell:
+        if args.buy:
+            print(advisor.add_holding(args.buy[0], safe_float(args.buy[1]), args.price_paid))
+        else:
+            amount = None if args.sell[1].lower() == 'all' else safe_float(args.sell[1])
+            print(advisor.remove_holding(args.sell[0], amount, args.price_paid))
+        if not args.portfolio:
+            sys.exit(0)
+
+    if args.portfolio:
+        emit('portfolio', advisor.portfolio_report)
+
+    if args.correlate:
+        emit('correlations', advisor.correlation_report, args.correlate)
+
+    if args.history:
+        if args.format == 'personality' or args.format == 'plain':
+            for query in args.history:
+                print(advisor.history_summary(query, args.history_days))
+            sys.exit(0)
+        try:
+            histories = dict(advisor.history_series(q, args.history_days) for q in args.history)
+        except AdvisorError as e:
+            print(e.message)
+            sys.exit(1)
+        if args.format == 'json':
+            print(json.dumps({cid: {field: list(column) for field, column in zip(PriceSeries._fields, series)}
+                              for cid, series in histories.items()}, indent=2))
+        else:
+            import csv
+            writer = csv.writer(sys.stdout)
+            writer.writerow(("id",) + PriceSeries._fields)
+            for cid, series in histories.items():
+                writer.writerows((cid, int(row[0])) + row[1:] for row in zip(*series))
         sys.exit(0)
 
     if args.rank:
-        print(advisor.rank_coins(args.rank))
+        personality = args.format == 'personality'
+        # The personality view shows the top 10, as in interactive mode; tables and exports list every coin
+        emit('rankings', lambda q: advisor.rank_report(q, progress=personality, top=10 if personality else None), args.rank)
+
+    if args.precompute_sustainability is not None:
+        ids = list(advisor.KNOWN_COINS.values())
+        for records in client.iter_market_pages(args.precompute_sustainability):
+            ids.extend(d["id"] for d in records if d.get("id"))
+        fetched = advisor.precompute_sustainability(ids)
+        print(f"🌱 Sustainability cache ready! Scored {fetched} new coins! 🌍")
         sys.exit(0)
 
+    if args.screen:
+        filters = ScreenFilters(args.min_cap, args.max_risk, args.min_sustainability, args.min_volume_ratio)
+        emit('rankings', advisor.screen, filters, args.top, args.max_coins)
+
     if args.profit:
         print(advisor.get_profitability_recommendations())
         sys.exit(0)
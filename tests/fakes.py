@@ -0,0 +1,114 @@
+"""In-memory CoinGecko stand-in shared by the test modules."""
+import json
+import math
+import threading
+from urllib.parse import urlsplit
+
+import cryptobuddy_pro_plus_v1 as cb
+
+COINS = {
+    # id: (symbol, name, price, market cap, 24h volume, 24h change %, description, hashing algorithm)
+    "bitcoin": ("btc", "Bitcoin", 60000.0, 1.2e12, 3.0e10, 2.5, "Bitcoin is secured by proof-of-work mining.", "SHA-256"),
+    "ethereum": ("eth", "Ethereum", 3000.0, 3.6e11, 1.5e10, -1.5, "Ethereum moved to proof-of-stake.", None),
+    "cardano": ("ada", "Cardano", 0.5, 1.8e10, 4.0e8, 4.0, "Cardano is a proof of stake blockchain.", None),
+    "solana": ("sol", "Solana", 150.0, 6.5e10, 2.0e9, -6.0, "A fast chain run by the Solana Foundation.", None),
+    "polkadot": ("dot", "Polkadot", 7.0, 9.0e9, 2.5e8, 1.0, "Sharded multichain network.", None),
+    "stellar": ("xlm", "Stellar", 0.1, 3.0e9, 9.0e7, 0.2, "Payments network run by a non-profit.", None),
+    "wrapped-bitcoin": ("wbtc", "Wrapped Bitcoin", 60000.0, 9.0e9, 2.0e8, 2.4, "Bitcoin as an ERC-20 token.", None),
+}
+
+
+def chart_price(coin_id: str, t: int) -> float:
+    """Deterministic price of a coin at unix time ``t`` (depends only on t)."""
+    base = COINS[coin_id][2] if coin_id in COINS else 1.0
+    return base * (1.0 + 0.2 * math.sin(t / 86400.0 + len(coin_id)))
+
+
+class FakeSession:
+    """Session-like object answering the CoinGecko endpoints the advisor calls.
+
+    ``prices`` overrides current prices, ``status`` maps a path to an
+    error status code, and ``calls`` records every (path, params) served.
+    """
+
+    def __init__(self, coins=None):
+        self.headers = {}
+        self.coins = dict(COINS if coins is None else coins)
+        self.prices = {}
+        self.status = {}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def paths(self, prefix=""):
+        return [path for path, _ in self.calls if path.startswith(prefix)]
+
+    def price(self, coin_id):
+        return self.prices.get(coin_id, self.coins[coin_id][2])
+
+    def market(self, coin_id):
+        symbol, name, _, cap, vol, change = self.coins[coin_id][:6]
+        return {"id": coin_id, "symbol": symbol, "name": name, "current_price": self.price(coin_id),
+                "market_cap": cap, "total_volume": vol, "price_change_percentage_24h": change}
+
+    def document(self, coin_id):
+        symbol, name, _, cap, vol, change, desc, hashing = self.coins[coin_id]
+        return {"id": coin_id, "symbol": symbol, "name": name, "hashing_algorithm": hashing,
+                "description": {"en": desc},
+                "market_data": {"current_price": {"usd": self.price(coin_id)}, "market_cap": {"usd": cap},
+                                "total_volume": {"usd": vol}, "price_change_percentage_24h": change}}
+
+    @staticmethod
+    def chart(coin_id, start, end):
+        """CoinGecko's granularity for the span: 5-minutely within a day, hourly to 90 days, else daily."""
+        span = end - start
+        step = 300 if span <= 86400 else 3600 if span <= 90 * 86400 else 86400
+        points = []
+        t = -(-start // step) * step
+        while t <= end:
+            points.append([t * 1000, chart_price(coin_id, t)])
+            t += step
+        return {"prices": points,
+                "market_caps": [[ms, p * 1e6] for ms, p in points],
+                "total_volumes": [[ms, p * 1e4] for ms, p in points]}
+
+    def get(self, url, params=None, timeout=None, stream=False, **kwargs):
+        path = urlsplit(url).path.split("/api/v3", 1)[-1]
+        params = dict(params or {})
+        with self._lock:
+            self.calls.append((path, params))
+        if path in self.status:
+            return cb.FixtureResponse(b'{"error": "injected"}', self.status[path])
+        body = self._route(path, params)
+        if body is None:
+            return cb.FixtureResponse(b'{"error": "coin not found"}', 404)
+        return cb.FixtureResponse(json.dumps(body).encode("utf-8"))
+
+    def _route(self, path, params):
+        if path == "/coins/list":
+            return [{"id": cid, "symbol": c[0], "name": c[1]} for cid, c in self.coins.items()]
+        if path == "/coins/markets":
+            if params.get("ids"):
+                return [self.market(cid) for cid in params["ids"].split(",") if cid in self.coins]
+            per_page, page = int(params["per_page"]), int(params["page"])
+            ranked = sorted(self.coins, key=lambda cid: -self.coins[cid][3])
+            return [self.market(cid) for cid in ranked[(page - 1) * per_page:page * per_page]]
+        if path == "/simple/price":
+            return {cid: {"usd": self.price(cid), "usd_24h_change": self.coins[cid][5]}
+                    for cid in params["ids"].split(",") if cid in self.coins}
+        parts = path.strip("/").split("/")
+        if len(parts) >= 2 and parts[0] == "coins" and parts[1] in self.coins:
+            if parts[2:] == ["market_chart", "range"]:
+                return self.chart(parts[1], int(params["from"]), int(params["to"]))
+            if len(parts) == 2:
+                return self.document(parts[1])
+        return None
+
+
+def make_advisor(session=None, **kwargs):
+    """CryptoAdvisor over a FakeSession with no rate limiting and nothing persisted."""
+    session = session if session is not None else FakeSession()
+    client = cb.DataClient(session=session, requests_per_minute=None)
+    return cb.CryptoAdvisor(client, **kwargs), session
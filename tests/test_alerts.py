@@ -0,0 +1,108 @@
+"""AlertEngine: edge-triggered price alerts."""
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cryptobuddy_pro_plus_v1 as cb
+from tests.fakes import FakeSession
+
+
+def fired(events):
+    return [e.rule.rule_id for e in events]
+
+
+class AlertEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.session = FakeSession()
+        self.engine = cb.AlertEngine(cb.DataClient(session=self.session, requests_per_minute=None), price_ttl=0)
+
+    def test_fires_once_per_crossing(self):
+        rule = self.engine.add_rule("bitcoin", 100.0, "above")
+        prices = [90, 95, 101, 120, 105, 99, 98, 100, 130]
+        events = [fired(self.engine.evaluate({"bitcoin": p})) for p in prices]
+        # Up through 100 at 101, back below at 99, up again at exactly 100
+        self.assertEqual(events, [[], [], [rule.rule_id], [], [], [], [], [rule.rule_id], []])
+
+    def test_below_rules(self):
+        rule = self.engine.add_rule("ethereum", 2000.0, "below")
+        events = [fired(self.engine.evaluate({"ethereum": p})) for p in (2100, 2000, 1900, 2050, 1999)]
+        # Reaching the threshold counts, as for above rules
+        self.assertEqual(events, [[], [rule.rule_id], [], [], [rule.rule_id]])
+
+    def test_first_observation_fires_rules_already_past(self):
+        above = self.engine.add_rule("bitcoin", 50.0, "above")
+        self.engine.add_rule("bitcoin", 500.0, "above")
+        below = self.engine.add_rule("bitcoin", 200.0, "below")
+        events = self.engine.evaluate({"bitcoin": 100.0})
+        self.assertEqual(sorted(fired(events)), sorted([above.rule_id, below.rule_id]))
+        self.assertTrue(all(e.previous is None for e in events))
+        self.assertEqual(self.engine.evaluate({"bitcoin": 100.0}), [])
+
+    def test_one_jump_fires_every_threshold_crossed(self):
+        rules = [self.engine.add_rule("bitcoin", t, "above") for t in (30.0, 10.0, 20.0, 40.0)]
+        self.engine.evaluate({"bitcoin": 5.0})
+        events = self.engine.evaluate({"bitcoin": 35.0})
+        self.assertEqual(sorted(fired(events)), sorted(r.rule_id for r in rules[:3]))
+
+    def test_matches_a_naive_crossing_check(self):
+        rng = random.Random(4)
+        rules = [self.engine.add_rule("c", rng.uniform(80, 120), rng.choice(("above", "below")))
+                 for _ in range(40)]
+        prev = None
+        for _ in range(500):
+            price = prev * rng.uniform(0.95, 1.05) if prev is not None else 100.0
+            expected = sorted(r.rule_id for r in rules if (
+                (r.direction == "above" and (prev is None or prev < r.threshold) and price >= r.threshold) or
+                (r.direction == "below" and (prev is None or prev > r.threshold) and price <= r.threshold)))
+            self.assertEqual(sorted(fired(self.engine.evaluate({"c": price}))), expected)
+            prev = price
+
+    def test_removed_rules_stop_firing(self):
+        keep = self.engine.add_rule("bitcoin", 100.0, "above")
+        drop = self.engine.add_rule("bitcoin", 100.0, "above")
+        self.assertTrue(self.engine.remove_rule(drop.rule_id))
+        self.assertFalse(self.engine.remove_rule(drop.rule_id))
+        self.assertEqual(fired(self.engine.evaluate({"bitcoin": 150.0})), [keep.rule_id])
+        self.engine.remove_rule(keep.rule_id)
+        self.assertEqual(self.engine.watched_ids(), [])
+
+    def test_rejects_unknown_direction(self):
+        with self.assertRaises(ValueError):
+            self.engine.add_rule("bitcoin", 1.0, "sideways")
+
+    def test_tick_is_one_batched_request(self):
+        self.engine.add_rule("bitcoin", 50000.0, "above")
+        self.engine.add_rule("ethereum", 5000.0, "above")
+        self.engine.add_rule("cardano", 1.0, "below")
+        self.assertEqual(len(self.engine.tick()), 2)
+        self.assertEqual(self.session.paths(), ["/simple/price"])
+        self.assertEqual(self.session.calls[0][1]["ids"], "bitcoin,cardano,ethereum")
+        self.session.prices["ethereum"] = 5100.0
+        self.assertEqual([e.rule.coin_id for e in self.engine.tick()], ["ethereum"])
+
+    def test_sinks_get_every_event_and_failures_are_contained(self):
+        seen = []
+
+        def broken(event):
+            raise RuntimeError("sink down")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "alerts.jsonl")
+            self.engine.sinks = [broken, seen.append, cb.JsonLinesAlertSink(path)]
+            self.engine.add_rule("bitcoin", 10.0, "above", label="btc")
+            with self.assertLogs("CryptoBuddyProPlus", "WARNING"):
+                self.engine.evaluate({"bitcoin": 11.0}, now=123.0)
+            with open(path, encoding="utf-8") as f:
+                record = json.loads(f.readline())
+        self.assertEqual(len(seen), 1)
+        self.assertEqual((record["coin_id"], record["label"], record["price"], record["timestamp"]),
+                         ("bitcoin", "btc", 11.0, 123.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""AdvisorAPI: routes, parameters and status codes."""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cryptobuddy_pro_plus_v1 as cb
+from tests.fakes import make_advisor
+
+
+class AdvisorAPITest(unittest.TestCase):
+    def setUp(self):
+        self.advisor, self.session = make_advisor()
+        self.api = cb.AdvisorAPI(self.advisor)
+
+    def get(self, path, **query):
+        return self.api.dispatch("GET", path, query)
+
+    def test_health(self):
+        self.assertEqual(self.get("/health"), (200, {"status": "ok"}))
+        self.assertEqual(self.get("/health/")[0], 200)
+
+    def test_summary(self):
+        status, body = self.get("/summary", coin="btc")
+        self.assertEqual(status, 200)
+        self.assertEqual((body["id"], body["price"]), ("bitcoin", 60000.0))
+
+    def test_compare_and_rank(self):
+        status, body = self.get("/compare", a="eth", b="ada")
+        self.assertEqual(status, 200)
+        self.assertEqual({body["a"]["id"], body["b"]["id"]}, {"ethereum", "cardano"})
+        status, body = self.get("/rank", coins="btc, eth,,ada")
+        self.assertEqual(status, 200)
+        self.assertEqual(sorted(r["id"] for r in body), ["bitcoin", "cardano", "ethereum"])
+        scores = [r["combined_score"] for r in body]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_price_and_screen(self):
+        status, body = self.get("/price", coins="btc,eth")
+        self.assertEqual(status, 200)
+        self.assertEqual(body["btc"]["price"], 60000.0)
+        status, body = self.get("/screen", top="2")
+        self.assertEqual((status, len(body)), (200, 2))
+
+    def test_missing_and_bad_parameters_are_400(self):
+        self.assertEqual(self.get("/summary")[0], 400)
+        self.assertEqual(self.get("/rank", coins=" , ")[0], 400)
+        self.assertEqual(self.get("/screen", max_risk="high")[0], 400)
+        self.assertEqual(self.get("/correlations", coins="btc,eth", window="abc")[0], 400)
+
+    def test_unknown_coins_are_404(self):
+        self.assertEqual(self.get("/summary", coin="no-such-coin")[0], 404)
+        self.assertEqual(self.get("/compare", a="eth", b="no-such-coin")[0], 404)
+        self.assertEqual(self.api.dispatch("POST", "/watchlist", {"coin": "no-such-coin"})[0], 404)
+
+    def test_unknown_route_and_method(self):
+        self.assertEqual(self.get("/nope")[0], 404)
+        status, body = self.api.dispatch("PUT", "/health", {})
+        self.assertEqual(status, 405)
+        self.assertIn("error", body)
+
+    def test_upstream_failure_is_502(self):
+        with mock.patch.object(self.advisor, "fetch_market", return_value=None):
+            self.assertEqual(self.get("/summary", coin="btc")[0], 502)
+            self.assertEqual(self.get("/compare", a="eth", b="ada")[0], 502)
+
+    def test_unexpected_errors_are_500(self):
+        with mock.patch.object(self.advisor, "coin_report", side_effect=RuntimeError("bug")), \
+                self.assertLogs("CryptoBuddyProPlus", "ERROR"):
+            self.assertEqual(self.get("/summary", coin="btc"), (500, {"error": "bug"}))
+
+    def test_watchlist_round_trip(self):
+        self.assertEqual(self.api.dispatch("POST", "/watchlist", {"coin": "sol"}), (200, ["solana"]))
+        self.assertEqual(self.api.dispatch("POST", "/watchlist", {"coin": "solana"}), (200, ["solana"]))
+        status, body = self.get("/watchlist")
+        self.assertEqual((status, body["solana"]["price"]), (200, 150.0))
+        self.assertEqual(self.api.dispatch("DELETE", "/watchlist", {"coin": "sol"}), (200, []))
+
+    def test_portfolio_buy_and_sell(self):
+        status, body = self.api.dispatch("POST", "/portfolio", {"coin": "btc", "amount": "2", "price": "50000"})
+        self.assertEqual(status, 200)
+        self.assertEqual((body["value"], body["cost"], body["pnl"]), (120000.0, 100000.0, 20000.0))
+        status, body = self.api.dispatch("DELETE", "/portfolio", {"coin": "btc", "amount": "1"})
+        self.assertEqual((status, body["positions"][0]["amount"]), (200, 1.0))
+        self.assertEqual(self.api.dispatch("POST", "/portfolio", {"coin": "btc", "amount": "0"})[0], 400)
+        self.assertEqual(self.api.dispatch("DELETE", "/portfolio", {"coin": "eth"})[0], 404)
+
+    def test_metrics_formats(self):
+        status, text = self.get("/metrics")
+        self.assertEqual(status, 200)
+        self.assertIsInstance(text, str)
+        status, snapshot = self.get("/metrics", format="json")
+        self.assertEqual(status, 200)
+        self.assertIsInstance(snapshot, dict)
+
+    def test_requests_share_the_advisor_caches(self):
+        for _ in range(3):
+            self.get("/rank", coins="btc,eth")
+        self.assertEqual(len(self.session.paths("/coins/markets")), 1)
+        self.assertGreater(self.get("/stats")[1]["cache"]["hits"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
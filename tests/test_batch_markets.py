@@ -0,0 +1,72 @@
+"""Ranking from one batched /coins/markets fetch, without per-coin documents."""
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cryptobuddy_pro_plus_v1 as cb
+from tests.fakes import make_advisor
+
+COINS = ["btc", "eth", "ada", "sol", "dot", "xlm"]
+
+
+class BatchRankingTest(unittest.TestCase):
+    def setUp(self):
+        self.advisor, self.session = make_advisor()
+
+    def wait_for_fill(self):
+        if self.advisor._fill_thread is not None:
+            self.advisor._fill_thread.join(5)
+
+    def test_cold_rank_is_one_request(self):
+        scores = self.advisor.rank_report(COINS)
+        markets = self.session.paths("/coins/markets")
+        self.assertEqual(len(markets), 1)
+        self.assertEqual(len(scores), len(COINS))
+        # Unscored coins rank with the neutral default
+        self.assertEqual({s.sustainability for s in scores}, {0.5})
+        self.assertEqual(self.session.calls[0][0], "/coins/markets")
+
+    def test_unscored_coins_fill_in_background(self):
+        self.advisor.rank_report(COINS)
+        self.wait_for_fill()
+        documents = [p for p in self.session.paths("/coins/") if p != "/coins/markets"]
+        self.assertEqual(len(documents), len(COINS))
+        self.assertEqual(self.advisor.fill_sustainability(), 0)
+
+        scores = {s.id: s.sustainability for s in self.advisor.rank_report(COINS)}
+        self.assertEqual(scores["bitcoin"], 0.2)
+        self.assertEqual(scores["ethereum"], 0.8)
+        self.assertEqual(scores["solana"], 0.75)
+        self.assertEqual(len(self.session.calls), 1 + len(COINS))  # second rank served from cache
+
+    def test_async_rank_skips_documents(self):
+        scores = asyncio.run(self.advisor.rank_report_async(COINS))
+        self.assertEqual(len(scores), len(COINS))
+        self.assertEqual(self.session.paths()[0], "/coins/markets")
+        self.wait_for_fill()
+        self.assertEqual(len(self.session.paths("/coins/markets")), 1)
+
+    def test_fill_sustainability_limit(self):
+        self.advisor._unscored.update(dict.fromkeys(["bitcoin", "ethereum", "cardano"]))
+        self.assertEqual(self.advisor.fill_sustainability(limit=2), 2)
+        self.assertEqual(list(self.advisor._unscored), ["cardano"])
+        self.assertIn("bitcoin", self.advisor._sustainability)
+
+    def test_sustainability_report_scores_its_picks(self):
+        text = self.advisor.get_sustainability_recommendations()
+        self.assertIn("Ethereum", text)
+        self.assertIn("Cardano", text)
+        self.assertNotIn("Bitcoin", text)
+
+    def test_market_fields_read_both_shapes(self):
+        lean = self.session.market("cardano")
+        full = cb.project_coin(self.session.document("cardano"))
+        self.assertEqual(cb.market_fields(lean), cb.market_fields(full))
+        self.assertEqual(cb.compute_risk_score(lean), cb.compute_risk_score(full))
+
+
+if __name__ == "__main__":
+    unittest.main()
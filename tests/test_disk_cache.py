@@ -0,0 +1,78 @@
+"""DiskCache: the SQLite response tier shared between runs."""
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cryptobuddy_pro_plus_v1 as cb
+from tests.fakes import FakeSession
+
+
+class DiskCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "http_cache.sqlite3")
+
+    def test_round_trip_between_instances(self):
+        now = time.time()
+        cb.DiskCache(self.path).set("k", {"price": 1.5, "ids": ["a", "b"]}, now, 60)
+        hit = cb.DiskCache(self.path).get("k", 60)
+        self.assertIsNotNone(hit)
+        ts, value, size = hit
+        self.assertEqual(ts, now)
+        self.assertEqual(value, {"price": 1.5, "ids": ["a", "b"]})
+        self.assertEqual(size, len(cb.json_codec().dumps(value)))
+
+    def test_ttl_is_applied_on_read(self):
+        cache = cb.DiskCache(self.path)
+        cache.set("k", [1, 2, 3], time.time() - 30, 3600)
+        self.assertIsNotNone(cache.get("k", 60))
+        self.assertIsNone(cache.get("k", 10))
+        self.assertIsNone(cache.get("missing", 60))
+
+    def test_evict_drops_expired_entries(self):
+        cache = cb.DiskCache(self.path)
+        now = time.time()
+        cache.set("old", "x", now - 120, 60)
+        cache.set("new", "y", now, 60)
+        cache.evict()
+        self.assertIsNone(cache.get("old", 1e9))
+        self.assertEqual(cache.get("new", 60)[1], "y")
+
+    def test_evict_least_recently_read_over_max_bytes(self):
+        cache = cb.DiskCache(self.path, max_bytes=10 ** 6)
+        clock = iter(range(1000, 2000))
+        with mock.patch.object(cb.time, "time", side_effect=lambda: float(next(clock))):
+            for key in ("a", "b", "c"):
+                cache.set(key, "v" * 100, 1000.0, 1e6)
+            cache.get("a", 1e6)  # a is now the most recently read
+            cache.max_bytes = 250
+            cache.evict()
+            self.assertIsNone(cache.get("b", 1e6))
+            self.assertIsNotNone(cache.get("a", 1e6))
+            self.assertIsNotNone(cache.get("c", 1e6))
+
+    def test_oversized_values_are_not_stored(self):
+        cache = cb.DiskCache(self.path, max_bytes=50)
+        cache.set("big", "v" * 100, time.time(), 60)
+        self.assertIsNone(cache.get("big", 60))
+
+    def test_client_reads_through_disk_tier(self):
+        first = FakeSession()
+        cb.DataClient(session=first, requests_per_minute=None,
+                      disk_cache=cb.DiskCache(self.path)).coins_markets(["bitcoin"])
+        second = FakeSession()
+        client = cb.DataClient(session=second, requests_per_minute=None, disk_cache=cb.DiskCache(self.path))
+        records = client.coins_markets(["bitcoin"])
+        self.assertEqual(records[0]["id"], "bitcoin")
+        self.assertEqual(len(first.calls), 1)
+        self.assertEqual(second.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""MemoryCache: the bounded LRU response tier."""
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cryptobuddy_pro_plus_v1 as cb
+from tests.fakes import FakeSession
+
+
+class MemoryCacheTest(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = cb.MemoryCache(max_entries=3)
+        now = time.time()
+        for key in ("a", "b", "c"):
+            cache.set(key, key.upper(), now, 60)
+        cache.get("a", 60)  # a becomes the most recently used
+        cache.set("d", "D", now, 60)
+        self.assertNotIn("b", cache)
+        self.assertEqual(list(cache._data), ["c", "a", "d"])
+        cache.set("e", "E", now, 60)
+        self.assertNotIn("c", cache)
+        self.assertEqual(cache.stats()["evictions"], 2)
+
+    def test_byte_budget(self):
+        cache = cb.MemoryCache(max_entries=100, max_bytes=250)
+        now = time.time()
+        for key in ("a", "b", "c"):
+            cache.set(key, key, now, 60, size=100)
+        self.assertEqual(list(cache._data), ["b", "c"])
+        self.assertEqual(cache.bytes, 200)
+        cache.set("huge", "x", now, 60, size=1000)
+        self.assertNotIn("huge", cache)
+        self.assertEqual(cache.bytes, 200)
+
+    def test_replacing_a_key_keeps_byte_count(self):
+        cache = cb.MemoryCache()
+        now = time.time()
+        cache.set("a", 1, now, 60, size=10)
+        cache.set("a", 2, now, 60, size=30)
+        self.assertEqual((len(cache), cache.bytes), (1, 30))
+        self.assertEqual(cache.get("a", 60), (now, 2))
+
+    def test_expiry_and_stats(self):
+        cache = cb.MemoryCache()
+        now = time.time()
+        cache.set("fresh", 1, now, 60)
+        cache.set("old", 2, now - 120, 60)
+        self.assertIsNotNone(cache.get("fresh", 60))
+        self.assertIsNone(cache.get("old", 60))
+        self.assertIsNone(cache.get("missing", 60))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["expirations"]), (1, 2, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 1 / 3)
+        self.assertNotIn("old", cache)
+
+    def test_stale_grace_keeps_entries(self):
+        cache = cb.MemoryCache(stale_grace=600)
+        cache.set("k", "v", time.time() - 120, 60)
+        self.assertIsNone(cache.get("k", 60))
+        self.assertEqual(cache.get("k", 60 + 600)[1], "v")
+        self.assertEqual(cache.sweep(), 0)
+
+    def test_sweep_drops_expired(self):
+        cache = cb.MemoryCache()
+        now = time.time()
+        cache.set("a", 1, now - 120, 60)
+        cache.set("b", 2, now, 60)
+        self.assertEqual(cache.sweep(), 1)
+        self.assertEqual(list(cache._data), ["b"])
+
+    def test_client_serves_repeats_from_memory(self):
+        session = FakeSession()
+        client = cb.DataClient(session=session, requests_per_minute=None)
+        for _ in range(3):
+            client.coins_markets(["bitcoin", "ethereum"])
+        self.assertEqual(len(session.calls), 1)
+        self.assertEqual(client.cache_stats()["hits"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
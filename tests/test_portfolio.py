@@ -0,0 +1,155 @@
+"""Portfolio: average-cost basis, persistence and incremental revaluation."""
+import os
+import random
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cryptobuddy_pro_plus_v1 as cb
+from tests.fakes import FakeSession
+
+COINS = ["bitcoin", "ethereum", "cardano", "solana", "polkadot", "stellar"]
+
+
+def quote(price, change=0.0):
+    return {"usd": price, "usd_24h_change": change}
+
+
+def full_revalue(portfolio, payload):
+    """A fresh portfolio holding the same coins, valued in one pass."""
+    fresh = cb.Portfolio()
+    for holding in portfolio.holdings():
+        fresh._store(holding)
+    fresh.revalue(payload)
+    return fresh.valuation()
+
+
+class CostBasisTest(unittest.TestCase):
+    def test_buys_average_and_sells_keep_the_average(self):
+        portfolio = cb.Portfolio()
+        portfolio.add("bitcoin", 1, 40000)
+        self.assertEqual(portfolio.add("bitcoin", 3, 60000), cb.Holding("bitcoin", 4.0, 220000.0))
+        holding, realized = portfolio.remove("bitcoin", 1, 70000)
+        self.assertEqual(holding, cb.Holding("bitcoin", 3.0, 165000.0))
+        self.assertEqual(realized, 70000 - 55000)
+        holding, realized = portfolio.remove("bitcoin", 10, 50000)
+        self.assertIsNone(holding)
+        self.assertEqual(realized, 3 * 50000 - 165000)
+        self.assertNotIn("bitcoin", portfolio)
+
+    def test_sell_without_price_uses_the_last_mark(self):
+        portfolio = cb.Portfolio()
+        portfolio.add("ethereum", 2, 1000)
+        self.assertEqual(portfolio.remove("ethereum", 1)[1], 0.0)  # never valued
+        portfolio.revalue({"ethereum": quote(3000.0)})
+        self.assertEqual(portfolio.remove("ethereum", 1)[1], 2000.0)
+
+    def test_invalid_trades(self):
+        portfolio = cb.Portfolio()
+        for amount, price in ((0, 1), (-1, 1), (1, -1), (float("nan"), 1)):
+            with self.assertRaises(ValueError):
+                portfolio.add("bitcoin", amount, price)
+        with self.assertRaises(KeyError):
+            portfolio.remove("bitcoin")
+        portfolio.add("bitcoin", 1, 1)
+        with self.assertRaises(ValueError):
+            portfolio.remove("bitcoin", 0)
+
+    def test_persists_between_instances(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "portfolio.sqlite3")
+            portfolio = cb.Portfolio(path)
+            portfolio.add("bitcoin", 2, 50000)
+            portfolio.add("cardano", 100, 0.4)
+            portfolio.remove("cardano")
+            reloaded = cb.Portfolio(path)
+            self.assertEqual(reloaded.holdings(), [cb.Holding("bitcoin", 2.0, 100000.0)])
+            portfolio._conn.close()
+            reloaded._conn.close()
+
+
+class RevalueTest(unittest.TestCase):
+    def assertSameValuation(self, got, want):
+        self.assertEqual([p.id for p in got.positions], [p.id for p in want.positions])
+        for a, b in zip(got.positions, want.positions):
+            for field in cb.Position._fields:
+                if isinstance(getattr(a, field), float):
+                    self.assertAlmostEqual(getattr(a, field), getattr(b, field), places=6, msg=(a.id, field))
+                else:
+                    self.assertEqual(getattr(a, field), getattr(b, field))
+        for field in ("value", "cost", "pnl", "pnl_pct", "change_24h"):
+            self.assertAlmostEqual(getattr(got, field), getattr(want, field), places=6, msg=field)
+
+    def test_incremental_matches_full_revalue(self):
+        rng = random.Random(3)
+        portfolio = cb.Portfolio()
+        prices = {cid: rng.uniform(0.1, 50000) for cid in COINS}
+        for cid in COINS[:4]:
+            portfolio.add(cid, rng.uniform(0.1, 10), prices[cid])
+        payload = {cid: quote(prices[cid]) for cid in COINS}
+        for tick in range(300):
+            payload = dict(payload)
+            for cid in rng.sample(COINS, 2):  # a few prices move per tick; the rest repeat their quote object
+                payload[cid] = quote(payload[cid]["usd"] * rng.uniform(0.95, 1.05), rng.uniform(-20, 20))
+            if tick % 37 == 0:
+                cid = rng.choice(COINS)
+                if cid in portfolio and rng.random() < 0.5:
+                    portfolio.remove(cid, rng.uniform(0, portfolio.get(cid).amount * 1.2))
+                else:
+                    portfolio.add(cid, rng.uniform(0.1, 5), payload[cid]["usd"])
+            portfolio.revalue(payload)
+            self.assertSameValuation(portfolio.valuation(), full_revalue(portfolio, payload))
+
+    def test_only_changed_positions_are_repriced(self):
+        portfolio = cb.Portfolio()
+        for cid in COINS:
+            portfolio.add(cid, 1, 1)
+        payload = {cid: quote(10.0) for cid in COINS}
+        self.assertEqual(portfolio.revalue(payload), len(COINS))
+        self.assertEqual(portfolio.revalue(payload), 0)  # same quote objects
+        self.assertEqual(portfolio.revalue({cid: quote(10.0) for cid in COINS}), 0)  # equal quotes
+        payload = dict(payload, bitcoin=quote(11.0))
+        self.assertEqual(portfolio.revalue(payload), 1)
+        portfolio.add("ethereum", 1, 10)
+        self.assertEqual(portfolio.revalue(payload), 1)
+
+    def test_missing_quote_keeps_the_last_price(self):
+        portfolio = cb.Portfolio()
+        portfolio.add("bitcoin", 1, 50000)
+        portfolio.add("ethereum", 1, 2000)
+        portfolio.revalue({"bitcoin": quote(60000.0), "ethereum": quote(3000.0)})
+        portfolio.revalue({"bitcoin": quote(61000.0)})
+        valuation = portfolio.valuation()
+        self.assertEqual(valuation.missing, ["ethereum"])
+        self.assertEqual(valuation.value, 64000.0)
+        portfolio.add("solana", 1, 100)
+        portfolio.revalue({})
+        self.assertEqual(sorted(portfolio.valuation().missing), ["bitcoin", "ethereum", "solana"])
+        self.assertNotIn("solana", [p.id for p in portfolio.valuation().positions])
+
+    def test_resync_resums_totals(self):
+        portfolio = cb.Portfolio()
+        portfolio.add("bitcoin", 1, 1)
+        with mock.patch.object(cb.Portfolio, "RESYNC", 2):
+            portfolio.revalue({"bitcoin": quote(5.0)})
+            portfolio._totals = [0.0, 0.0, 0.0]
+            portfolio.revalue({"bitcoin": quote(5.0)})
+        self.assertEqual(portfolio.valuation().value, 5.0)
+
+    def test_tick_batches_one_price_request(self):
+        session = FakeSession()
+        portfolio = cb.Portfolio(client=cb.DataClient(session, requests_per_minute=None))
+        portfolio.add("bitcoin", 2, 50000)
+        portfolio.add("ethereum", 1, 2000)
+        valuation = portfolio.tick(names=str.upper)
+        self.assertEqual(session.paths(), ["/simple/price"])
+        self.assertEqual([(p.name, p.value) for p in valuation.positions], [("BITCOIN", 120000.0), ("ETHEREUM", 3000.0)])
+        self.assertEqual(valuation.pnl, 21000.0)
+        self.assertAlmostEqual(sum(p.weight for p in valuation.positions), 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
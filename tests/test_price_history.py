@@ -0,0 +1,149 @@
+"""PriceHistoryStore: bucket closes, incremental sync and the on-disk format."""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cryptobuddy_pro_plus_v1 as cb
+from tests.fakes import FakeSession, chart_price, make_advisor
+
+DAY = 86400
+NOW = 1_700_000_000 // DAY * DAY + 5 * 3600  # 05:00 UTC, mid-bucket
+
+
+def make_store(root=None, step=DAY):
+    session = FakeSession()
+    return cb.PriceHistoryStore(root, cb.DataClient(session, requests_per_minute=None), step=step), session
+
+
+class BucketPointsTest(unittest.TestCase):
+    def test_close_is_the_next_buckets_first_point(self):
+        start = NOW // DAY * DAY - 3 * DAY
+        end = start + 3 * DAY
+        rows = cb.bucket_points(FakeSession.chart("bitcoin", start, end + DAY), DAY, start, end)
+        self.assertEqual(list(rows.ts), [start, start + DAY, start + 2 * DAY])
+        self.assertEqual(list(rows.price), [chart_price("bitcoin", t + DAY) for t in rows.ts])
+        self.assertEqual(list(rows.market_cap), [p * 1e6 for p in rows.price])
+
+    def test_daily_and_hourly_payloads_store_the_same_close(self):
+        start = NOW // DAY * DAY - 2 * DAY
+        end = start + 2 * DAY
+        daily = cb.bucket_points(FakeSession.chart("ethereum", start - 200 * DAY, end + DAY), DAY, start, end)
+        hourly = cb.bucket_points(FakeSession.chart("ethereum", start, end + DAY), DAY, start, end)
+        fine = cb.bucket_points(FakeSession.chart("ethereum", start + DAY, end + 3600), DAY, start + DAY, end)
+        self.assertEqual(list(daily.ts), list(hourly.ts))
+        self.assertEqual(list(daily.price), list(hourly.price))
+        self.assertEqual(list(fine.price), list(hourly.price[1:]))
+
+    def test_unclosed_and_out_of_range_buckets_are_dropped(self):
+        start = NOW // DAY * DAY - 2 * DAY
+        payload = {"prices": [[(start - DAY) * 1000, 1.0],  # closes a bucket before start
+                              [(start + DAY) * 1000, None],  # the first bucket's close is missing
+                              [(start + 2 * DAY + 60) * 1000, 2.0],  # late, but still closes the second
+                              [(start + 3 * DAY) * 1000, 3.0]]}  # closes a bucket past end
+        rows = cb.bucket_points(payload, DAY, start, start + 2 * DAY)
+        self.assertEqual((list(rows.ts), list(rows.price)), ([start + DAY], [2.0]))
+        self.assertEqual(list(rows.volume), [0.0])
+
+
+class PriceHistoryStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_incremental_sync_matches_a_cold_sync(self):
+        warm, session = make_store(self.tmp.name)
+        self.assertEqual(warm.sync("bitcoin", 365, now=NOW - 10 * DAY), 365)
+        self.assertEqual(warm.sync("bitcoin", 365, now=NOW), 10)
+        self.assertEqual(len(session.paths("/coins/bitcoin/market_chart")), 2)
+        cold, _ = make_store()
+        cold.sync("bitcoin", 375, now=NOW)
+        self.assertEqual(warm.series("bitcoin"), cold.series("bitcoin"))
+        self.assertEqual(warm.coverage("bitcoin"), (NOW // DAY * DAY - 375 * DAY, NOW // DAY * DAY))
+
+    def test_resync_within_the_bucket_makes_no_request(self):
+        store, session = make_store()
+        store.sync("ethereum", 30, now=NOW)
+        store.sync("ethereum", 30, now=NOW + 3600)
+        self.assertEqual(len(session.calls), 1)
+
+    def test_backfill_merges_in_order(self):
+        store, session = make_store(self.tmp.name)
+        store.sync("cardano", 5, now=NOW)
+        self.assertEqual(store.sync("cardano", 8, now=NOW), 3)
+        ts = list(store.series("cardano").ts)
+        self.assertEqual(ts, sorted(ts))
+        self.assertEqual(len(ts), 8)
+        self.assertEqual(len(set(ts)), 8)
+
+    def test_reload_from_disk(self):
+        store, _ = make_store(self.tmp.name)
+        store.sync("solana", 40, now=NOW)
+        store.sync("solana", 42, now=NOW + 2 * DAY)
+        reloaded, session = make_store(self.tmp.name)
+        self.assertEqual(reloaded.series("solana"), store.series("solana"))
+        self.assertEqual(reloaded.coverage("solana"), store.coverage("solana"))
+        self.assertEqual(reloaded.sync("solana", 42, now=NOW + 2 * DAY), 0)
+        self.assertEqual(session.calls, [])
+
+    def test_torn_trailing_row_is_ignored(self):
+        store, _ = make_store(self.tmp.name)
+        store.sync("bitcoin", 10, now=NOW)
+        with open(store._path("bitcoin", "usd"), "ab") as f:
+            f.write(b"\x00" * 12)
+        reloaded, _ = make_store(self.tmp.name)
+        self.assertEqual(reloaded.series("bitcoin"), store.series("bitcoin"))
+
+    def test_unreadable_file_is_ignored(self):
+        store, _ = make_store(self.tmp.name)
+        path = store._path("bitcoin", "usd")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as f:
+            f.write(b"garbage")
+        with self.assertLogs("CryptoBuddyProPlus", "WARNING"):
+            self.assertEqual(len(store.series("bitcoin").ts), 0)
+        self.assertIsNone(store.coverage("bitcoin"))
+
+    def test_hourly_steps_chunk_requests(self):
+        store, session = make_store(step=3600)
+        self.assertEqual(store.sync("bitcoin", 100, now=NOW), 100 * 24)
+        self.assertEqual(len(session.calls), 2)
+        ts = store.series("bitcoin").ts
+        self.assertEqual(list(store.series("bitcoin").price[:3]), [chart_price("bitcoin", t + 3600) for t in ts[:3]])
+
+    def test_range(self):
+        store, _ = make_store()
+        store.sync("bitcoin", 10, now=NOW)
+        ts = store.series("bitcoin").ts
+        rows = store.range("bitcoin", ts[2], ts[5])
+        self.assertEqual(list(rows.ts), list(ts[2:5]))
+        self.assertEqual(len(store.range("bitcoin").ts), 10)
+
+    def test_sync_without_client_raises(self):
+        with self.assertRaises(RuntimeError):
+            cb.PriceHistoryStore(None).sync("bitcoin")
+
+
+class HistorySeriesTest(unittest.TestCase):
+    def test_returns_the_requested_days(self):
+        advisor, _ = make_advisor()
+        cid, series = advisor.history_series("btc", 30)
+        self.assertEqual(cid, "bitcoin")
+        self.assertEqual(len(series.ts), 30)
+
+    def test_unknown_coin_and_failed_sync(self):
+        advisor, session = make_advisor()
+        with self.assertRaises(cb.AdvisorError) as cm:
+            advisor.history_series("no-such-coin")
+        self.assertEqual(cm.exception.status, 404)
+        session.status["/coins/bitcoin/market_chart/range"] = 500
+        with mock.patch.object(cb.time, "sleep"), self.assertRaises(cb.AdvisorError) as cm:  # skip retry backoff
+            advisor.history_series("btc", 30)
+        self.assertEqual(cm.exception.status, 502)
+
+
+if __name__ == "__main__":
+    unittest.main()
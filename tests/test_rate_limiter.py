@@ -0,0 +1,83 @@
+"""TokenBucket: the client-side rate limiter."""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cryptobuddy_pro_plus_v1 as cb
+from tests.fakes import FakeSession
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucketTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(cb.time, "monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_queue(self):
+        bucket = cb.TokenBucket(rate=2.0, capacity=3)
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.0])
+        # Later callers queue in arrival order, half a second apart
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.5, 1.0, 1.5])
+        self.assertEqual(bucket.stats()["throttled"], 3)
+        self.assertEqual(bucket.stats()["max_wait_sec"], 1.5)
+
+    def test_refill_is_capped_at_capacity(self):
+        bucket = cb.TokenBucket(rate=1.0, capacity=2)
+        bucket.reserve()
+        bucket.reserve()
+        self.clock.now += 1.0
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 1.0)
+        self.clock.now += 100.0
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0.0, 0.0, 1.0])
+
+    def test_pause_holds_every_caller(self):
+        bucket = cb.TokenBucket(rate=1.0, capacity=5)
+        bucket.pause(10.0)
+        # The bucket resumes empty, so even the first caller waits a token interval past the pause
+        self.assertEqual(bucket.reserve(), 11.0)
+        self.assertEqual(bucket.reserve(), 12.0)
+        self.clock.now += 20.0
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.stats()["pauses"], 1)
+
+    def test_shorter_pause_does_not_shorten_a_longer_one(self):
+        bucket = cb.TokenBucket(rate=1.0, capacity=5)
+        bucket.pause(10.0)
+        bucket.pause(2.0)
+        self.assertEqual(bucket.reserve(), 11.0)
+
+    def test_acquire_sleeps_for_the_reservation(self):
+        bucket = cb.TokenBucket(rate=4.0, capacity=1)
+        with mock.patch.object(cb.time, "sleep") as sleep:
+            self.assertEqual(bucket.acquire(), 0.0)
+            self.assertEqual(bucket.acquire(), 0.25)
+        sleep.assert_called_once_with(0.25)
+
+    def test_429_pauses_the_client_limiter(self):
+        session = FakeSession()
+        client = cb.DataClient(session=session, requests_per_minute=6000, burst=5)
+        responses = [cb.FixtureResponse(b"{}", 429, {"Retry-After": "7"}), cb.FixtureResponse(b"[]")]
+        with mock.patch.object(session, "get", side_effect=responses), \
+                mock.patch.object(cb.time, "sleep") as sleep:
+            self.assertEqual(client.coins_markets(["bitcoin"]), [])
+        self.assertEqual(client.rate_limiter.pauses, 1)
+        # Retry-After plus one token interval at 100 requests/s
+        self.assertAlmostEqual(sleep.call_args[0][0], 7.01)
+        self.assertEqual(sleep.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""CoinRegistry lookups over the RegistryIndex: exact, prefix, trigram and fuzzy."""
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cryptobuddy_pro_plus_v1 as cb
+
+COINS = [
+    {"id": "bitcoin", "symbol": "btc", "name": "Bitcoin"},
+    {"id": "bitcoin-cash", "symbol": "bch", "name": "Bitcoin Cash"},
+    {"id": "wrapped-bitcoin", "symbol": "wbtc", "name": "Wrapped Bitcoin"},
+    {"id": "ethereum", "symbol": "eth", "name": "Ethereum"},
+    {"id": "ethereum-classic", "symbol": "etc", "name": "Ethereum Classic"},
+    {"id": "cardano", "symbol": "ada", "name": "Cardano"},
+    {"id": "ada-peg", "symbol": "ada", "name": "Binance-Peg Cardano"},
+    {"id": "polkadot", "symbol": "dot", "name": "Polkadot"},
+]
+
+
+def random_coins(n=3000, seed=8):
+    rng = random.Random(seed)
+    parts = ["bit", "coin", "moon", "doge", "swap", "chain", "link", "fi", "lu", "na", "sol", "ar"]
+    coins = []
+    for i in range(n):
+        name = "".join(rng.choice(parts) for _ in range(rng.randint(2, 3))).capitalize()
+        coins.append({"id": f"{name.lower()}-{i}", "symbol": name[:rng.randint(2, 4)].lower(), "name": name})
+    return coins
+
+
+class RegistryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = cb.CoinRegistry(None, coins=COINS)
+
+    def ids(self, query, **kwargs):
+        return [cid for cid, _ in self.registry.search(query, **kwargs)]
+
+    def test_exact_id_symbol_and_name(self):
+        self.assertEqual(self.registry.find_id("ethereum"), "ethereum")
+        self.assertEqual(self.registry.find_id("ETH"), "ethereum")
+        self.assertEqual(self.registry.find_id("  Bitcoin Cash "), "bitcoin-cash")
+        self.assertIsNone(self.registry.find_id("nothing-like-it"))
+
+    def test_shared_symbol_prefers_market_cap(self):
+        self.assertEqual(self.registry.find_id("ada"), "cardano")  # list order without caps
+        self.registry.note_market_caps({"ada-peg": 2e10, "cardano": 1e10})
+        self.assertEqual(self.registry.find_id("ada"), "ada-peg")
+
+    def test_prefix_matches(self):
+        self.assertEqual(self.ids("ethere", fuzzy=False), ["ethereum", "ethereum-classic"])
+        self.assertEqual(self.registry.search("ethere", limit=1)[0], ("ethereum", 0.8))
+
+    def test_substring_through_trigrams(self):
+        self.assertEqual(set(self.ids("coin", fuzzy=False, limit=10)),
+                         {"bitcoin", "bitcoin-cash", "wrapped-bitcoin"})
+        self.assertEqual(self.registry.find_id("classic"), "ethereum-classic")
+        self.assertEqual(self.registry.search("peg cardano", limit=1)[0], ("ada-peg", 0.6))
+
+    def test_short_queries_scan_names(self):
+        self.assertEqual(self.ids("ot", fuzzy=False), ["polkadot"])
+
+    def test_fuzzy_tolerates_typos(self):
+        cid, score = self.registry.search("etherium", limit=1)[0]
+        self.assertEqual(cid, "ethereum")
+        self.assertLess(score, 0.5)
+        self.assertEqual(self.ids("etherium", fuzzy=False), [])
+
+    def test_tiers_rank_best_first(self):
+        scores = [score for _, score in self.registry.search("bitcoin", limit=5)]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(scores[:2], [1.0, 0.8])
+
+    def test_substring_matches_a_linear_scan(self):
+        coins = random_coins()
+        registry = cb.CoinRegistry(None, coins=coins)
+        for query in ("moon", "coinfi", "swapsol", "linklu", "arna", "zzz"):
+            expected = {c["id"] for c in coins if query in c["name"].lower()}
+            found = {cid for cid, score in registry.search(query, limit=len(coins), fuzzy=False)}
+            with self.subTest(query=query):
+                self.assertEqual(found, expected)
+
+    def test_duplicate_and_incomplete_rows_are_dropped(self):
+        index = cb.RegistryIndex.from_coins(COINS + [{"id": "bitcoin", "symbol": "xbt", "name": "Dup"},
+                                                     {"id": "nosymbol", "name": "No Symbol"}])
+        self.assertEqual(len(index), len(COINS))
+        self.assertEqual(index.coin(index.row_by_id["bitcoin"])["symbol"], "btc")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""CoinRegistry snapshots: the binary coin list loaded at startup."""
+import os
+import struct
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cryptobuddy_pro_plus_v1 as cb
+from tests.fakes import FakeSession
+from tests.test_registry_index import COINS, random_coins
+
+
+class RegistrySnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "coin_registry.bin")
+
+    def test_bytes_round_trip(self):
+        index = cb.RegistryIndex.from_coins(random_coins(500) + COINS)
+        loaded = cb.RegistryIndex.from_bytes(index.to_bytes())
+        self.assertTrue(loaded.same_coins(index))
+        self.assertEqual(loaded.created, index.created)
+        for attr in ("sorted_names", "name_rows", "sorted_symbols", "symbol_rows", "row_by_id"):
+            self.assertEqual(getattr(loaded, attr), getattr(index, attr), attr)
+
+    def test_empty_index_round_trips(self):
+        loaded = cb.RegistryIndex.from_bytes(cb.RegistryIndex([], [], []).to_bytes())
+        self.assertEqual(len(loaded), 0)
+
+    def test_loaded_snapshot_answers_like_the_original(self):
+        coins = random_coins(800) + COINS
+        original = cb.CoinRegistry(None, coins=coins, snapshot_path=self.path)
+        original._save_snapshot()
+        loaded = cb.CoinRegistry(None, snapshot_path=self.path)  # no client: must not refresh
+        for query in ("btc", "ethereum", "bitcoin cash", "moon", "etherium", "chainlu", "zz"):
+            with self.subTest(query=query):
+                self.assertEqual(loaded.search(query), original.search(query))
+                self.assertEqual(loaded.find_id(query), original.find_id(query))
+
+    def test_rejects_foreign_and_truncated_data(self):
+        blob = cb.RegistryIndex.from_coins(COINS).to_bytes()
+        with self.assertRaises(ValueError):
+            cb.RegistryIndex.from_bytes(b"XXXX" + blob[4:])
+        with self.assertRaises((ValueError, struct.error)):
+            cb.RegistryIndex.from_bytes(blob[:len(blob) // 2])
+
+    def test_unreadable_snapshot_falls_back_to_the_api(self):
+        with open(self.path, "wb") as f:
+            f.write(b"garbage")
+        session = FakeSession()
+        registry = cb.CoinRegistry(cb.DataClient(session=session, requests_per_minute=None), snapshot_path=self.path)
+        self.assertEqual(registry.find_id("eth"), "ethereum")
+        self.assertEqual(session.paths(), ["/coins/list"])
+        # The refreshed list replaced the bad file
+        with open(self.path, "rb") as f:
+            self.assertTrue(cb.RegistryIndex.from_bytes(f.read()).same_coins(registry._data))
+
+    def test_fresh_snapshot_skips_the_api(self):
+        cb.CoinRegistry(None, coins=COINS, snapshot_path=self.path)._save_snapshot()
+        session = FakeSession()
+        registry = cb.CoinRegistry(cb.DataClient(session=session, requests_per_minute=None), snapshot_path=self.path)
+        self.assertEqual(registry.find_id("dot"), "polkadot")
+        self.assertEqual(session.calls, [])
+        self.assertLess(registry.age, 60)
+
+    def test_stale_snapshot_refreshes_in_background(self):
+        index = cb.RegistryIndex.from_coins(COINS)
+        index.created = time.time() - 2 * cb.CoinRegistry.SNAPSHOT_TTL
+        with open(self.path, "wb") as f:
+            f.write(index.to_bytes())
+        session = FakeSession()
+        registry = cb.CoinRegistry(cb.DataClient(session=session, requests_per_minute=None), snapshot_path=self.path)
+        self.assertEqual(registry.find_id("ada"), "cardano")  # served from the stale snapshot
+        registry._refresh_thread.join(5)
+        self.assertEqual(session.paths(), ["/coins/list"])
+        self.assertLess(registry.age, 60)
+        self.assertEqual(registry.find_id("sol"), "solana")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""Structured result records and the errors behind them."""
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cryptobuddy_pro_plus_v1 as cb
+from tests.fakes import make_advisor
+
+
+class CompareReportTest(unittest.TestCase):
+    def setUp(self):
+        self.advisor, self.session = make_advisor()
+
+    def test_resolves_each_coin_once(self):
+        with mock.patch.object(self.advisor, "resolve", wraps=self.advisor.resolve) as resolve:
+            report = self.advisor.compare_report("eth", "wbtc")
+        self.assertEqual(resolve.call_count, 2)
+        self.assertEqual({report.a.id, report.b.id}, {"ethereum", "wrapped-bitcoin"})
+        self.assertIn(report.winner, ("ethereum", "wrapped-bitcoin"))
+
+    def test_unknown_coin_is_404(self):
+        with self.assertRaises(cb.AdvisorError) as ctx:
+            self.advisor.compare_report("eth", "no-such-coin")
+        self.assertEqual(ctx.exception.status, 404)
+
+    def test_fetch_failure_is_502(self):
+        with mock.patch.object(self.advisor, "fetch_market", return_value=None):
+            with self.assertRaises(cb.AdvisorError) as ctx:
+                self.advisor.compare_report("eth", "ada")
+        self.assertEqual(ctx.exception.status, 502)
+
+    def test_other_errors_keep_their_status(self):
+        error = cb.AdvisorError("gone", 404)
+        with mock.patch.object(self.advisor, "_coin_score", side_effect=error):
+            with self.assertRaises(cb.AdvisorError) as ctx:
+                self.advisor.compare_report("eth", "ada")
+        self.assertIs(ctx.exception, error)
+
+    def test_coin_report_fields(self):
+        report = self.advisor.coin_report("btc")
+        self.assertEqual((report.id, report.symbol, report.price), ("bitcoin", "BTC", 60000.0))
+        self.assertEqual(report.sustainability, 0.2)
+        self.assertTrue(0.0 <= report.risk <= 1.0)
+
+
+class RenderResultTest(unittest.TestCase):
+    def setUp(self):
+        advisor, _ = make_advisor()
+        self.views = {
+            "summary": advisor.coin_report("btc"),
+            "comparison": advisor.compare_report("eth", "ada"),
+            "rankings": advisor.rank_report(["btc", "eth", "ada"]),
+        }
+
+    def test_every_format(self):
+        for view, result in self.views.items():
+            for fmt in cb.RENDER_FORMATS:
+                with self.subTest(view=view, fmt=fmt):
+                    self.assertTrue(cb.render_result(view, result, fmt).strip())
+
+    def test_json_round_trips_records(self):
+        ranked = json.loads(cb.render_result("rankings", self.views["rankings"], "json"))
+        self.assertEqual([r["id"] for r in ranked], [r.id for r in self.views["rankings"]])
+        summary = json.loads(cb.render_result("summary", self.views["summary"], "json"))
+        self.assertEqual(summary["price"], 60000.0)
+
+    def test_csv_has_header_and_rows(self):
+        lines = cb.render_result("rankings", self.views["rankings"], "csv").splitlines()
+        self.assertEqual(lines[0].split(",")[:2], ["id", "symbol"])
+        self.assertEqual(len(lines), 4)
+
+    def test_plain_has_no_emoji(self):
+        text = cb.render_result("summary", self.views["summary"], "plain")
+        self.assertTrue(text.isascii())
+
+
+if __name__ == "__main__":
+    unittest.main()
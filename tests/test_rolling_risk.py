@@ -0,0 +1,126 @@
+"""RollingRisk: windowed volatility, drawdown, beta and correlation."""
+import math
+import os
+import random
+import statistics
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cryptobuddy_pro_plus_v1 as cb
+
+IDS = ["bitcoin", "ethereum", "cardano"]
+
+
+def random_rows(n, seed=7):
+    rng = random.Random(seed)
+    prices = [60000.0, 3000.0, 0.5]
+    rows = []
+    for _ in range(n):
+        prices = [p * math.exp(rng.gauss(0, 0.04)) for p in prices]
+        rows.append(list(prices))
+    return rows
+
+
+def recompute(rows, window, benchmark="bitcoin"):
+    """Every metric computed from scratch over the last ``window`` returns."""
+    returns = [[math.log(c / p) for c, p in zip(row, prev)] for prev, row in zip(rows, rows[1:])][-window:]
+    columns = list(zip(*returns))
+    b = IDS.index(benchmark)
+    out = {}
+    for i, cid in enumerate(IDS):
+        closes = [row[i] for row in rows]
+        peak, max_dd = 0.0, 0.0
+        for c in closes:
+            peak = max(peak, c)
+            max_dd = max(max_dd, 1.0 - c / peak)
+        cov = statistics.covariance(columns[i], columns[b])
+        var_b = statistics.variance(columns[b])
+        out[cid] = cb.RiskMetrics(cid, len(returns), statistics.stdev(columns[i]) * 100,
+                                  1.0 - closes[-1] / max(closes[-(window + 1):]), max_dd, cov / var_b,
+                                  statistics.correlation(columns[i], columns[b]))
+    return out
+
+
+class DrawdownTest(unittest.TestCase):
+    def test_drawdown_from_window_high(self):
+        risk = cb.RollingRisk(["a"], window=10)
+        for close in (100.0, 120.0, 90.0):
+            risk.push([close])
+        self.assertAlmostEqual(risk.drawdown("a"), 0.25)
+        self.assertAlmostEqual(risk.metrics("a").max_drawdown, 0.25)
+
+    def test_zero_priced_coin(self):
+        risk = cb.RollingRisk(["dead", "bitcoin"], window=5, benchmark="bitcoin")
+        for row in ([0.0, 100.0], [0.0, 110.0], [0.0, 99.0]):
+            risk.push(row)
+        metrics = risk.metrics("dead")
+        self.assertEqual(metrics.drawdown, 0.0)
+        self.assertEqual(metrics.max_drawdown, 0.0)
+        self.assertEqual(metrics.volatility, 0.0)
+        self.assertIsNone(metrics.correlation)
+        self.assertAlmostEqual(risk.drawdown("bitcoin"), 0.1)
+
+
+class IncrementalTest(unittest.TestCase):
+    def assertMatches(self, risk, rows):
+        expected = recompute(rows, risk.window)
+        for cid in IDS:
+            got, want = risk.metrics(cid), expected[cid]
+            self.assertEqual(got.observations, want.observations)
+            for field in ("volatility", "drawdown", "max_drawdown", "beta", "correlation"):
+                self.assertAlmostEqual(getattr(got, field), getattr(want, field), places=9, msg=(cid, field))
+        matrix = risk.correlation_matrix()
+        for i, a in enumerate(IDS):
+            for j, b in enumerate(IDS):
+                self.assertAlmostEqual(matrix[i][j], risk.correlation(a, b), places=9)
+
+    def test_push_matches_recompute(self):
+        rows = random_rows(200)
+        risk = cb.RollingRisk(IDS, window=30, benchmark="bitcoin")
+        for n, row in enumerate(rows, 1):
+            risk.push(row)
+            if n in (5, 31, 32, 200):
+                self.assertMatches(risk, rows[:n])
+
+    def test_push_across_resync(self):
+        rows = random_rows(60)
+        with mock.patch.object(cb.RollingRisk, "RESYNC", 7):
+            risk = cb.RollingRisk(IDS, window=10, benchmark="bitcoin")
+            for row in rows:
+                risk.push(row)
+        self.assertMatches(risk, rows)
+
+    def test_extend_matches_push(self):
+        rows = random_rows(120)
+        pushed = cb.RollingRisk(IDS, window=30, benchmark="bitcoin")
+        for row in rows:
+            pushed.push(row)
+        for numpy in (True, False):
+            importer = cb.optional_import if numpy else (lambda name: None)
+            with self.subTest(numpy=numpy), mock.patch.object(cb, "optional_import", importer):
+                risk = cb.RollingRisk(IDS, window=30, benchmark="bitcoin")
+                risk.extend(rows[:50], list(range(50)))  # longer than the window: one rebuild at the end
+                risk.extend(rows[50:60])  # shorter: running sums
+                for row in rows[60:]:
+                    risk.push(row)
+                self.assertEqual(risk.last_ts, 49)
+                self.assertMatches(risk, rows)
+                for cid in IDS:
+                    self.assertAlmostEqual(risk.volatility(cid), pushed.volatility(cid), places=9)
+
+    def test_too_few_observations(self):
+        risk = cb.RollingRisk(IDS, window=30, benchmark="bitcoin")
+        risk.push([1.0, 2.0, 3.0])
+        risk.push([1.1, 2.0, 3.0])
+        metrics = risk.metrics("ethereum")
+        self.assertEqual(metrics.observations, 1)
+        self.assertEqual(metrics.volatility, 0.0)
+        self.assertIsNone(metrics.beta)
+        self.assertIsNone(risk.correlation("bitcoin", "cardano"))
+
+
+if __name__ == "__main__":
+    unittest.main()
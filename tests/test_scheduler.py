@@ -0,0 +1,127 @@
+"""Scheduler and the daemon's job setup."""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cryptobuddy_pro_plus_v1 as cb
+from tests.fakes import make_advisor
+from tests.test_registry_index import COINS
+
+
+def run(scheduler, duration):
+    asyncio.run(scheduler.run(duration))
+
+
+class SchedulerTest(unittest.TestCase):
+    def test_slow_job_never_overlaps_itself(self):
+        scheduler = cb.Scheduler()
+        running, peak = [0], [0]
+
+        async def slow():
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.12)
+            running[0] -= 1
+
+        job = scheduler.add_job("slow", slow, 0.03)
+        run(scheduler, 0.4)
+        self.assertEqual(peak[0], 1)
+        self.assertGreater(job.skipped, 0)
+        self.assertGreaterEqual(job.runs, 2)
+
+    def test_first_run_waits_for_delay(self):
+        scheduler = cb.Scheduler()
+        started = {}
+        loop_start = []
+
+        def job(name):
+            async def fn():
+                started.setdefault(name, time.perf_counter() - loop_start[0])
+            return fn
+
+        scheduler.add_job("now", job("now"), 10)
+        scheduler.add_job("later", job("later"), 10, delay=0.15)
+        scheduler.add_job("never", job("never"), 10, delay=5)
+        loop_start.append(time.perf_counter())
+        run(scheduler, 0.3)
+        self.assertLess(started["now"], 0.1)
+        self.assertGreaterEqual(started["later"], 0.14)
+        self.assertNotIn("never", started)
+        self.assertEqual(scheduler.stats()["later"]["runs"], 1)
+
+    def test_failures_are_counted_and_the_job_keeps_its_schedule(self):
+        scheduler = cb.Scheduler()
+
+        async def boom():
+            raise RuntimeError("nope")
+
+        job = scheduler.add_job("boom", boom, 0.05)
+        with self.assertLogs("CryptoBuddyProPlus", "WARNING"):
+            run(scheduler, 0.22)
+        self.assertGreaterEqual(job.failures, 3)
+        self.assertEqual(job.runs, 0)
+
+    def test_stop_ends_the_run(self):
+        scheduler = cb.Scheduler()
+
+        async def stop():
+            scheduler.stop()
+
+        scheduler.add_job("stop", stop, 0.01, delay=0.05)
+        t0 = time.perf_counter()
+        run(scheduler, 5)
+        self.assertLess(time.perf_counter() - t0, 1)
+
+    def test_rejects_non_positive_interval(self):
+        with self.assertRaises(ValueError):
+            cb.Scheduler().add_job("bad", asyncio.sleep, 0)
+
+
+class DaemonRegistryJobTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.snapshot = os.path.join(self.tmp.name, "coin_registry.bin")
+
+    def write_snapshot(self, age):
+        index = cb.RegistryIndex.from_coins(COINS)
+        index.created = time.time() - age
+        with open(self.snapshot, "wb") as f:
+            f.write(index.to_bytes())
+
+    def run_daemon(self, registry_interval=0.4, duration=0.35):
+        advisor, session = make_advisor(registry_snapshot=self.snapshot)
+        with contextlib.redirect_stdout(io.StringIO()):
+            scheduler = cb.run_daemon(advisor, [], registry_interval=registry_interval, jitter=0,
+                                      duration=duration)
+        return advisor, session, scheduler
+
+    def test_fresh_snapshot_is_not_downloaded(self):
+        self.write_snapshot(age=0)
+        advisor, session, scheduler = self.run_daemon()
+        self.assertEqual(session.paths("/coins/list"), [])
+        self.assertGreaterEqual(scheduler.stats()["registry"]["runs"], 2)
+        self.assertEqual(len(advisor.registry), len(COINS))
+
+    def test_registry_job_does_not_run_at_start(self):
+        self.write_snapshot(age=0)
+        _, _, scheduler = self.run_daemon(registry_interval=4, duration=0.3)
+        self.assertEqual(scheduler.stats()["registry"]["runs"], 0)
+
+    def test_stale_snapshot_is_refreshed_once(self):
+        self.write_snapshot(age=10)
+        advisor, session, _ = self.run_daemon()
+        if advisor.registry._refresh_thread is not None:
+            advisor.registry._refresh_thread.join(5)
+        self.assertEqual(len(session.paths("/coins/list")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
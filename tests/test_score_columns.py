@@ -0,0 +1,100 @@
+"""score_columns: the NumPy path against risk_from_fields/combined_score."""
+import math
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cryptobuddy_pro_plus_v1 as cb
+
+np = cb.optional_import("numpy")
+
+INF = float("inf")
+NAN = float("nan")
+
+# Values that hit every branch of risk_from_fields: the vol/cap fallback for
+# non-positive caps, the 0.7 fallback where log1p raises, and NaN/inf inputs
+CHANGES = [0.0, -0.0, 1.5, -3.2, 25.0, -40.0, -10.0, 1e-300, NAN, INF, -INF]
+CAPS = [0.0, -0.0, -0.5, -1.0, -2.0, 1.0, 5e5, 1.2e12, NAN, INF, -INF]
+VOLUMES = [0.0, -3.0, 2.5e4, 3.1e10, NAN, INF, -INF]
+VOLATILITIES = [None, 0.0, 1.7, 4.2, 80.0]
+
+
+def _rows(n=2000, seed=20):
+    rng = random.Random(seed)
+    change, cap, vol, sustain, sigma = [], [], [], [], []
+    for _ in range(n):
+        change.append(rng.choice(CHANGES) if rng.random() < 0.3 else rng.uniform(-60.0, 60.0))
+        cap.append(rng.choice(CAPS) if rng.random() < 0.3 else 10 ** rng.uniform(3, 13))
+        vol.append(rng.choice(VOLUMES) if rng.random() < 0.3 else 10 ** rng.uniform(2, 11))
+        sustain.append(rng.random())
+        sigma.append(rng.choice(VOLATILITIES) if rng.random() < 0.5 else rng.uniform(0.0, 30.0))
+    return change, cap, vol, sustain, sigma
+
+
+def _scalar(change, cap, vol, sustain, sigma):
+    risk = [cb.risk_from_fields(c, m, v, s) for c, m, v, s in zip(change, cap, vol, sigma)]
+    return risk, [cb.combined_score(s, c, r) for s, c, r in zip(sustain, change, risk)]
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class ScoreColumnsTest(unittest.TestCase):
+    def assertSameBits(self, got, want):
+        self.assertEqual(len(got), len(want))
+        for i, (a, b) in enumerate(zip(got.tolist(), want)):
+            if math.isnan(b):
+                self.assertTrue(math.isnan(a), "row %d: %r != %r" % (i, a, b))
+            else:
+                self.assertEqual(math.copysign(1.0, a), math.copysign(1.0, b), "row %d: %r != %r" % (i, a, b))
+                self.assertEqual(a, b, "row %d: %r != %r" % (i, a, b))
+
+    def test_exact_matches_scalar(self):
+        change, cap, vol, sustain, sigma = _rows()
+        risk, combined = _scalar(change, cap, vol, sustain, sigma)
+        cols = cb.score_columns(change, cap, vol, sustain, vectorize=True, exact=True, volatility=sigma)
+        self.assertSameBits(cols.risk, risk)
+        self.assertSameBits(cols.combined, combined)
+
+    def test_exact_matches_scalar_without_volatility(self):
+        change, cap, vol, sustain, _ = _rows(seed=21)
+        risk, combined = _scalar(change, cap, vol, sustain, [None] * len(change))
+        cols = cb.score_columns(change, cap, vol, sustain, vectorize=True, exact=True)
+        self.assertSameBits(cols.risk, risk)
+        self.assertSameBits(cols.combined, combined)
+
+    def test_edge_values(self):
+        change = [c for c in CHANGES for _ in CAPS for _ in VOLUMES]
+        cap = [m for _ in CHANGES for m in CAPS for _ in VOLUMES]
+        vol = [v for _ in CHANGES for _ in CAPS for v in VOLUMES]
+        sustain = [0.5] * len(change)
+        sigma = [VOLATILITIES[i % len(VOLATILITIES)] for i in range(len(change))]
+        risk, combined = _scalar(change, cap, vol, sustain, sigma)
+        cols = cb.score_columns(change, cap, vol, sustain, vectorize=True, exact=True, volatility=sigma)
+        self.assertSameBits(cols.risk, risk)
+        self.assertSameBits(cols.combined, combined)
+
+    def test_fast_path_within_epsilon(self):
+        change, cap, vol, sustain, sigma = _rows(seed=22)
+        risk, combined = _scalar(change, cap, vol, sustain, sigma)
+        cols = cb.score_columns(change, cap, vol, sustain, vectorize=True, exact=False, volatility=sigma)
+        for got, want in ((cols.risk.tolist(), risk), (cols.combined.tolist(), combined)):
+            for i, (a, b) in enumerate(zip(got, want)):
+                if math.isnan(b):
+                    self.assertTrue(math.isnan(a), "row %d" % i)
+                elif math.isinf(b):
+                    self.assertEqual(a, b, "row %d" % i)
+                else:
+                    self.assertLessEqual(abs(a - b), sys.float_info.epsilon, "row %d: %r vs %r" % (i, a, b))
+
+    def test_scalar_fallback(self):
+        change, cap, vol, sustain, sigma = _rows(n=50, seed=23)
+        risk, combined = _scalar(change, cap, vol, sustain, sigma)
+        cols = cb.score_columns(change, cap, vol, sustain, vectorize=False, volatility=sigma)
+        self.assertEqual(cols.risk, risk)
+        self.assertEqual(cols.combined, combined)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+"""SingleFlight: one load per key for concurrent callers."""
+import asyncio
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cryptobuddy_pro_plus_v1 as cb
+from tests.fakes import FakeSession
+
+CALLERS = 8
+
+
+class SingleFlightThreadsTest(unittest.TestCase):
+    def run_callers(self, flight, load):
+        """Start CALLERS threads calling flight.do on the same key."""
+        results, errors = [], []
+
+        def call():
+            try:
+                results.append(flight.do("k", load))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(CALLERS)]
+        for t in threads:
+            t.start()
+        return threads, results, errors
+
+    def wait_for_followers(self, flight):
+        for _ in range(1000):
+            if flight.coalesced == CALLERS - 1:
+                return
+            threading.Event().wait(0.005)
+        self.fail("callers never coalesced")
+
+    def test_one_load_for_concurrent_callers(self):
+        flight = cb.SingleFlight()
+        release, calls = threading.Event(), []
+
+        def load():
+            calls.append(1)
+            release.wait(5)
+            return {"value": 42}
+
+        threads, results, errors = self.run_callers(flight, load)
+        self.wait_for_followers(flight)
+        release.set()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), CALLERS)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(flight.stats(), {"leaders": 1, "coalesced": CALLERS - 1, "in_flight": 0})
+
+    def test_errors_reach_every_caller(self):
+        flight = cb.SingleFlight()
+        release = threading.Event()
+
+        def load():
+            release.wait(5)
+            raise RuntimeError("upstream down")
+
+        threads, results, errors = self.run_callers(flight, load)
+        self.wait_for_followers(flight)
+        release.set()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), CALLERS)
+        self.assertTrue(all(str(e) == "upstream down" for e in errors))
+
+    def test_next_call_after_a_flight_loads_again(self):
+        flight = cb.SingleFlight()
+        self.assertEqual(flight.do("k", lambda: 1), 1)
+        self.assertEqual(flight.do("k", lambda: 2), 2)
+        self.assertEqual(flight.leaders, 2)
+
+    def test_client_coalesces_identical_requests(self):
+        session = FakeSession()
+        release = threading.Event()
+        original = session.get
+
+        def slow_get(*args, **kwargs):
+            release.wait(5)
+            return original(*args, **kwargs)
+
+        session.get = slow_get
+        client = cb.DataClient(session=session, requests_per_minute=None)
+        threads = [threading.Thread(target=client.coins_markets, args=(["bitcoin"],)) for _ in range(CALLERS)]
+        for t in threads:
+            t.start()
+        for _ in range(1000):
+            if client._inflight.coalesced == CALLERS - 1:
+                break
+            threading.Event().wait(0.005)
+        release.set()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(len(session.calls), 1)
+
+
+class SingleFlightAsyncTest(unittest.TestCase):
+    def test_one_load_and_shared_error(self):
+        flight = cb.SingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError("bad payload")
+
+        async def main():
+            ok = await asyncio.gather(*(flight.do_async("a", load) for _ in range(CALLERS)))
+            bad = await asyncio.gather(*(flight.do_async("b", failing) for _ in range(CALLERS)),
+                                       return_exceptions=True)
+            return ok, bad
+
+        ok, bad = asyncio.run(main())
+        self.assertEqual(ok, ["ok"] * CALLERS)
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(isinstance(e, ValueError) for e in bad))
+        self.assertEqual(flight.stats()["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""DataClient stale-while-revalidate: serve stale entries and refresh behind the caller."""
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cryptobuddy_pro_plus_v1 as cb
+from tests.fakes import FakeSession
+
+
+class StaleWhileRevalidateTest(unittest.TestCase):
+    def setUp(self):
+        self.session = FakeSession()
+        self.client = cb.DataClient(session=self.session, requests_per_minute=None, cache_ttl=60,
+                                    stale_while_revalidate=True, max_stale=600)
+        self.assertEqual(self.price(), 60000.0)
+        self.session.prices["bitcoin"] = 65000.0
+
+    def price(self):
+        return self.client.coins_markets(["bitcoin"])[0]["current_price"]
+
+    def age_cache(self, seconds):
+        data = self.client._cache._data
+        for key, (ts, ttl, value, size) in list(data.items()):
+            data[key] = (ts - seconds, ttl, value, size)
+
+    def block_requests(self):
+        release, original = threading.Event(), self.session.get
+
+        def slow_get(*args, **kwargs):
+            release.wait(5)
+            return original(*args, **kwargs)
+
+        self.session.get = slow_get
+        return release
+
+    def wait_for_refresh(self):
+        for _ in range(1000):
+            if not self.client._refreshing:
+                return
+            threading.Event().wait(0.005)
+        self.fail("background refresh never finished")
+
+    def test_stale_value_served_with_one_refresh(self):
+        self.age_cache(120)
+        release = self.block_requests()
+        # Every read during the refresh gets the stale copy without waiting
+        self.assertEqual([self.price() for _ in range(5)], [60000.0] * 5)
+        self.assertEqual(self.client.stale_served, 5)
+        release.set()
+        self.wait_for_refresh()
+        self.assertEqual(len(self.session.calls), 2)
+        self.assertEqual(self.client.revalidations, 1)
+        self.assertEqual(self.price(), 65000.0)
+        self.assertEqual(len(self.session.calls), 2)
+
+    def test_fresh_entries_are_not_revalidated(self):
+        self.assertEqual(self.price(), 60000.0)
+        self.assertEqual(self.client.stale_served, 0)
+        self.assertEqual(len(self.session.calls), 1)
+
+    def test_past_max_stale_fetches_inline(self):
+        self.age_cache(60 + 600 + 1)
+        self.assertEqual(self.price(), 65000.0)
+        self.assertEqual(self.client.stale_served, 0)
+        self.assertEqual(len(self.session.calls), 2)
+
+    def test_failed_refresh_keeps_serving_stale(self):
+        self.age_cache(120)
+        with mock.patch.object(self.client, "_load", side_effect=RuntimeError("down")):
+            self.assertEqual(self.price(), 60000.0)
+            self.wait_for_refresh()
+            self.assertEqual(self.client.revalidation_failures, 1)
+            self.assertEqual(self.price(), 60000.0)
+
+    def test_disabled_fetches_inline(self):
+        self.client.stale_while_revalidate = False
+        self.age_cache(120)
+        self.assertEqual(self.price(), 65000.0)
+        self.assertEqual(self.client.stale_served, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()